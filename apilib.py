@@ -0,0 +1,467 @@
+#
+# api lib: a small local HTTP API to analyze tracks, w/ asyncio
+#  analyzeFile()
+#  initWorker()
+#  ResultCache
+#  readRequest()
+#  readBody()
+#  skipBody()
+#  sendResponse()
+#  TrackServer
+#  runServer()
+# <- Last updated: Tue Oct 20 06:58:44 2026 -> SGK
+#
+# the server only uses the stdlib (asyncio streams): it reads the request,
+# streams the uploaded track to a temp file while hashing it, and runs the
+# reading/processing/plotting in a pool of worker processes, so the event
+# loop is never blocked; results are cached by (content hash, request)
+#
+#   POST /stats            -> the stats, as JSON
+#   POST /plot?fig=stats   -> the stats (or route) figure, fmt=png or pdf
+#   POST /gmap             -> the mkGMap() html
+#   GET  /status           -> the server's counters, as JSON
+#
+# the body is a track file (TCX, GPX or FIT, possibly compressed),
+# the query can set velMin, velMax, grdMax, cadMin, hrMin,
+#   and for /plot: fig=stats|route fmt=png|pdf useRoad=0|1 vs=Time|Distance
+#
+import os, io, json, signal, asyncio, hashlib, tempfile, contextlib
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlsplit, parse_qsl
+#
+# the query parameters: name -> (type, default)
+procParams = {'velMin': (float,  6.0), 'velMax': (float, 100.0),
+              'grdMax': (float, 15.0), 'cadMin': (int,    10),
+              'hrMin':  (int,    50)}
+plotParams = {'fig': (str, 'stats'), 'fmt': (str, 'png'),
+              'useRoad': (int, 1),   'vs':  (str, 'Time')}
+#
+contentTypes = {'png':  'image/png', 'pdf': 'application/pdf',
+                'json': 'application/json', 'html': 'text/html'}
+#
+statusText = {200: 'OK', 400: 'Bad Request', 404: 'Not Found',
+              405: 'Method Not Allowed', 411: 'Length Required',
+              413: 'Payload Too Large', 422: 'Unprocessable Entity',
+              500: 'Internal Server Error', 503: 'Service Unavailable'}
+#
+# ------------------------------------------------------------------------
+# what a worker process does: read, process and plot a track file
+def analyzeFile(fn, what, params):
+    """
+    (contentType, body) = analyzeFile(fn, what, params)
+      fn     - the track file
+      what   - 'stats', 'plot' or 'gmap'
+      params - the query's parameters (see procParams and plotParams)
+    raises ValueError if fn is not a track file
+    """
+    from readlib   import readFile
+    from tracklib  import TrackProcessor
+    #
+    track = readFile(fn, fast = True)
+    proc  = TrackProcessor(**dict([(k, params[k]) for k in procParams]))
+    proc.update(track)
+    stats = proc.stats(final = True)
+    stats['nPoints'] = proc.nPts
+    if what == 'stats':
+        return (contentTypes['json'], json.dumps(stats).encode())
+    #
+    # the plotting functions save files (and print), so use a temp dir
+    with tempfile.TemporaryDirectory() as tmp, \
+         contextlib.redirect_stdout(io.StringIO()):
+        if what == 'gmap':
+            from mkgmap import mkGMap
+            fn = os.path.join(tmp, 'gmap.html')
+            mkGMap(proc.ride, stats, velMin = params['velMin'],
+                   htmlFile = fn)
+            ctype = contentTypes['html']
+        else:
+            from plottrack import doPlot
+            fmt = params['fmt']
+            doPlot(proc.ride, stats,
+                   plotType = fmt,
+                   noRoute  = params['fig'] != 'route',
+                   useRoad  = params['useRoad'] != 0,
+                   plotVS   = params['vs'],
+                   velMin   = params['velMin'], velMax = params['velMax'],
+                   cadMin   = params['cadMin'], outDir = tmp)
+            fn = [os.path.join(tmp, f) for f in os.listdir(tmp)
+                  if f.startswith(params['fig']+'-')][0]
+            ctype = contentTypes[fmt]
+        with open(fn, 'rb') as f:
+            return (ctype, f.read())
+#
+# ------------------------------------------------------------------------
+# start a worker process: no display, import the modules once
+def initWorker():
+    import matplotlib
+    matplotlib.use('Agg')
+    import readlib, tracklib, plottrack, mkgmap
+#
+# ------------------------------------------------------------------------
+# a least recently used cache of the results
+class ResultCache:
+    """
+    cache = ResultCache(size)
+      cache.get(key) -> the result or None, cache.put(key, result)
+      keeps the size most recently used results
+    """
+    def __init__(self, size = 128):
+        self.size  = size
+        self.items = OrderedDict()
+        self.hits  = 0
+        self.misses = 0
+    #
+    def get(self, key):
+        if key in self.items:
+            self.items.move_to_end(key)
+            self.hits += 1
+            return self.items[key]
+        self.misses += 1
+        return None
+    #
+    def put(self, key, result):
+        if self.size <= 0:
+            return
+        self.items[key] = result
+        self.items.move_to_end(key)
+        while len(self.items) > self.size:
+            self.items.popitem(last = False)
+    #
+    def __len__(self):
+        return len(self.items)
+#
+# ------------------------------------------------------------------------
+# read a request's line and headers
+async def readRequest(reader):
+    """
+    (method, path, query, version, headers) = await readRequest(reader)
+      headers' names are lower case, returns None if the client is gone
+      raises ValueError on a malformed request
+    """
+    line = await reader.readline()
+    if not line:
+        return None
+    w = line.decode('latin-1').split()
+    if len(w) != 3:
+        raise ValueError('invalid request line')
+    (method, target, version) = w
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        (name, sep, value) = line.decode('latin-1').partition(':')
+        if not sep:
+            raise ValueError('invalid header')
+        headers[name.strip().lower()] = value.strip()
+    url = urlsplit(target)
+    return (method, url.path, dict(parse_qsl(url.query)), version, headers)
+#
+# ------------------------------------------------------------------------
+# stream a request's body to a file
+async def readBody(reader, headers, f,
+                   maxSize = None,
+                   chunkSize = 64*1024):
+    """
+    (size, digest) = await readBody(reader, headers, f, maxSize)
+      copy the body (w/ a Content-Length or chunked) to f, a binary file,
+      chunk by chunk, returns its size and sha256 (hex)
+      raises OverflowError if larger than maxSize, ValueError if no
+      length is given
+    """
+    sha  = hashlib.sha256()
+    size = 0
+    #
+    def add(data):
+        nonlocal size
+        size += len(data)
+        if (maxSize is not None) and (size > maxSize):
+            raise OverflowError('upload larger than '+str(maxSize)+' bytes')
+        sha.update(data)
+        f.write(data)
+    #
+    if 'chunked' in headers.get('transfer-encoding', '').lower():
+        while True:
+            line = await reader.readline()
+            n = int(line.split(b';')[0], 16)
+            if n == 0:
+                # skip the trailers
+                while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                    pass
+                break
+            while n > 0:
+                data = await reader.readexactly(min(n, chunkSize))
+                add(data)
+                n -= len(data)
+            await reader.readline()
+    elif 'content-length' in headers:
+        rest = int(headers['content-length'])
+        if (maxSize is not None) and (rest > maxSize):
+            raise OverflowError('upload larger than '+str(maxSize)+' bytes')
+        while rest > 0:
+            data = await reader.read(min(rest, chunkSize))
+            if not data:
+                raise ValueError('truncated body')
+            add(data)
+            rest -= len(data)
+    else:
+        raise ValueError('no Content-Length')
+    return (size, sha.hexdigest())
+#
+# skip a request's body, not needed
+async def skipBody(reader, headers,
+                   maxSize = None):
+    """
+    ok = await skipBody(reader, headers, maxSize)
+      read and drop the body (if any), so the connection can go on w/ the
+      next request, False if it can't (larger than maxSize, no length, or
+      the client may be waiting for a 100 Continue to send it)
+    """
+    if ('content-length' not in headers) and \
+       ('transfer-encoding' not in headers):
+        return True
+    if 'expect' in headers:
+        return False
+    try:
+        with open(os.devnull, 'wb') as f:
+            await readBody(reader, headers, f, maxSize = maxSize)
+    except (OverflowError, ValueError):
+        return False
+    return True
+#
+# ------------------------------------------------------------------------
+# send a response
+async def sendResponse(writer, code, body,
+                       contentType = 'application/json',
+                       keepAlive = True,
+                       headers = None):
+    """
+    send the response, body (bytes, or a dict sent as JSON) w/ status code
+    """
+    if isinstance(body, dict):
+        body = json.dumps(body).encode()
+        contentType = contentTypes['json']
+    lines = ['HTTP/1.1 {} {}'.format(code, statusText.get(code, '')),
+             'Content-Type: '+contentType,
+             'Content-Length: '+str(len(body)),
+             'Connection: '+('keep-alive' if keepAlive else 'close')]
+    if headers:
+        lines += [k+': '+v for (k, v) in headers.items()]
+    writer.write(('\r\n'.join(lines)+'\r\n\r\n').encode('latin-1') + body)
+    await writer.drain()
+#
+# ------------------------------------------------------------------------
+# the server
+class TrackServer:
+    """
+    server = TrackServer(nWorkers, maxJobs, maxQueue, cacheSize, maxUpload)
+      nWorkers   no of worker processes (os.cpu_count() if None)
+      maxJobs    max no of jobs given to the workers at once (2*nWorkers)
+      maxQueue   max no of requests waiting for a worker, above it the
+                 server answers 503 (busy)
+      cacheSize  no of results kept (by content hash and request)
+      maxUpload  max size of an upload [bytes]
+    use it w/ asyncio.start_server(server.handle, host, port)
+    """
+    def __init__(self,
+                 nWorkers  = None,
+                 maxJobs   = None,
+                 maxQueue  = 64,
+                 cacheSize = 128,
+                 maxUpload = 256*1024*1024):
+        self.nWorkers  = nWorkers or os.cpu_count() or 1
+        self.maxJobs   = maxJobs or 2*self.nWorkers
+        self.maxQueue  = maxQueue
+        self.maxUpload = maxUpload
+        self.cache     = ResultCache(cacheSize)
+        self.pool      = ProcessPoolExecutor(max_workers = self.nWorkers,
+                                             initializer = initWorker)
+        self.jobs      = None   # the semaphore, made in the loop
+        self.inFlight  = {}     # key -> future, same request being done
+        self.waiting   = 0
+        self.nRequests = 0
+    #
+    async def warmUp(self):
+        """
+        start all the workers, so the 1st requests do not pay for it
+        """
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*[loop.run_in_executor(self.pool, initWorker)
+                               for i in range(self.nWorkers)])
+    #
+    def close(self):
+        self.pool.shutdown(cancel_futures = True)
+    #
+    def status(self):
+        return {'workers': self.nWorkers, 'maxJobs': self.maxJobs,
+                'waiting': self.waiting, 'requests': self.nRequests,
+                'cached': len(self.cache), 'hits': self.cache.hits,
+                'misses': self.cache.misses}
+    #
+    async def analyze(self, key, fn, what, params):
+        """
+        run analyzeFile() in a worker, at most maxJobs at once,
+          a request identical to one being done waits for its result
+        """
+        if key in self.inFlight:
+            return await asyncio.shield(self.inFlight[key])
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.inFlight[key] = future
+        try:
+            async with self.jobs:
+                result = await loop.run_in_executor(self.pool, analyzeFile,
+                                                    fn, what, params)
+            self.cache.put(key, result)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            # retrieved, so it is not reported as never retrieved
+            future.exception()
+            raise
+        finally:
+            del self.inFlight[key]
+    #
+    async def handle(self, reader, writer):
+        """
+        handle a connection, w/ possibly several requests (keep-alive)
+        """
+        if self.jobs is None:
+            self.jobs = asyncio.Semaphore(self.maxJobs)
+        try:
+            while True:
+                try:
+                    req = await readRequest(reader)
+                except (ValueError, asyncio.LimitOverrunError):
+                    await sendResponse(writer, 400,
+                                       {'error': 'malformed request'},
+                                       keepAlive = False)
+                    break
+                if req is None:
+                    break
+                (method, path, query, version, headers) = req
+                conn = headers.get('connection', '').lower()
+                keepAlive = (conn != 'close') if version == 'HTTP/1.1' \
+                    else (conn == 'keep-alive')
+                self.nRequests += 1
+                (code, body, ctype, extra, skip) = \
+                    await self.dispatch(reader, method, path, query, headers)
+                # the body was not read, it is skipped or else its bytes
+                #  would be read as the next request; partly read (411,
+                #  413): can't go on w/ this connection
+                if skip:
+                    keepAlive = keepAlive and \
+                        await skipBody(reader, headers, self.maxUpload)
+                if code in (411, 413):
+                    keepAlive = False
+                await sendResponse(writer, code, body, ctype,
+                                   keepAlive = keepAlive, headers = extra)
+                if not keepAlive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+    #
+    async def dispatch(self, reader, method, path, query, headers):
+        """
+        (code, body, contentType, headers, skip) = await dispatch(...)
+          skip is True when the request's body was not read
+        """
+        jsonType = contentTypes['json']
+        what = path.strip('/')
+        if what == 'status':
+            return (200, self.status(), jsonType, None, True)
+        if what not in ('stats', 'plot', 'gmap'):
+            return (404, {'error': 'no such endpoint: '+path}, jsonType, None,
+                    True)
+        if method != 'POST':
+            return (405, {'error': 'use POST /'+what}, jsonType, None, True)
+        #
+        # the parameters, w/ their defaults
+        params = {}
+        types = dict(procParams, **plotParams) if what == 'plot' \
+            else procParams
+        try:
+            for (k, v) in query.items():
+                if k not in types:
+                    raise ValueError('unknown parameter "'+k+'"')
+            for (k, (typ, default)) in types.items():
+                params[k] = typ(query[k]) if k in query else default
+            if (what == 'plot') and ((params['fmt'] not in ('png', 'pdf')) or
+                                     (params['fig'] not in ('stats', 'route'))):
+                raise ValueError('fmt must be png|pdf and fig stats|route')
+        except ValueError as e:
+            return (400, {'error': str(e)}, jsonType, None, True)
+        #
+        # stream the upload to a temp file, hashing it
+        f = tempfile.NamedTemporaryFile(prefix = 'track-', delete = False)
+        try:
+            try:
+                (size, digest) = await readBody(reader, headers, f,
+                                                maxSize = self.maxUpload)
+            except OverflowError as e:
+                return (413, {'error': str(e)}, jsonType, None, False)
+            except ValueError as e:
+                return (411, {'error': str(e)}, jsonType, None, False)
+            finally:
+                f.close()
+            #
+            key = digest+' '+what+' '+' '.join(['{}={}'.format(k, params[k])
+                                                for k in sorted(params)])
+            result = self.cache.get(key)
+            if result is not None:
+                return (200, result[1], result[0], {'X-Cache': 'hit'}, False)
+            #
+            if (key not in self.inFlight) and (self.waiting >= self.maxQueue):
+                return (503, {'error': 'busy, try again'}, jsonType,
+                        {'Retry-After': '1'}, False)
+            self.waiting += 1
+            try:
+                result = await self.analyze(key, f.name, what, params)
+            except ValueError as e:
+                return (422, {'error': str(e).replace(f.name, 'upload')},
+                        jsonType, None, False)
+            except Exception as e:
+                return (500, {'error': type(e).__name__+': '+str(e)},
+                        jsonType, None, False)
+            finally:
+                self.waiting -= 1
+            return (200, result[1], result[0], {'X-Cache': 'miss'}, False)
+        finally:
+            os.remove(f.name)
+#
+# ------------------------------------------------------------------------
+# run the server until interrupted
+def runServer(host = '127.0.0.1',
+              port = 8080,
+              silent = False,
+              **kwargs):
+    """
+    run a TrackServer on host:port, kwargs are passed to TrackServer()
+      until interrupted (^C or kill), then stop the workers
+    """
+    server = TrackServer(**kwargs)
+    #
+    async def main():
+        await server.warmUp()
+        srv = await asyncio.start_server(server.handle, host, port)
+        if not silent:
+            print('serving on http://{}:{} w/ {} workers'.format(
+                host, port, server.nWorkers), flush = True)
+        async with srv:
+            await srv.serve_forever()
+    #
+    # stop the same way on a kill (TERM) as on a ^C
+    def stop(signum, frame):
+        raise KeyboardInterrupt
+    signal.signal(signal.SIGTERM, stop)
+    #
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
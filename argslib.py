@@ -2,13 +2,13 @@
 # initialize options and parse the arguments
 #  initOpts()
 #  parseArgs()
-# <- Last updated: Sat May  1 17:28:17 2021 -> SGK
+# <- Last updated: Tue Oct 20 07:08:36 2026 -> SGK
 #
 import sys
 #
 # ------------------------------------------------------------------------
 # initialize all the options to default values
-def initOpts(plotType =   '-',    # -|x|w|pdf|png|gmap
+def initOpts(plotType =   '-',    # -|x|w|pdf|png|gmap|view
              velMin   =   6.0,    # 10.0
              velMax   = 100.0,    # 50.0
              grdMax   =  15.0,    # reject when abs(grade) > grdMax
@@ -18,6 +18,29 @@ def initOpts(plotType =   '-',    # -|x|w|pdf|png|gmap
              noRoute  = False,    # don't show route figure
              useTable = False,    # print stats as table
              useRoad  = True,     # False
+             fast     = False,    # fast TCX scan
+             nProcs   = 1,        # no of procs for the fast scan
+             follow   = False,    # follow a growing TCX file
+             idle     = 60.0,     # stop following after idle sec
+             watch    = False,    # watch a directory
+             poll     = 2.0,      #   how often to look [s]
+             once     = False,    #   process what's there and exit
+             outDir   = '',       # where to put the outputs
+             zones    = '',       # log of the time in zones
+             hrZones  = (110, 130, 150, 165), # HR zones' edges [bpm]
+             splits   = '',       # lap|mi|km splits
+             climbs   = False,    # list the climbs
+             clean    = False,    # clean the GPS pts
+             kalman   = False,    #   and smooth them
+             store    = '',       # corpus directory
+             batch    = '',       # batch directory
+             dedup    = '',       # index of the rides seen
+             replay   = '',       # type of replay video (mp4...)
+             tz       = '',       # time zone, '' -> where the ride started
+             timeout  = 300.0,    # batch: max time per file or ride [s]
+             maxMem   = 4096,     #        max memory per worker [MB]
+             report   = '',       # season report file (.pdf or .html)
+             model    = 0,        # velocity vs grade model, window [rides]
              plotSize = (12, 8)):
     """
     Initialize the options:
@@ -30,6 +53,37 @@ def initOpts(plotType =   '-',    # -|x|w|pdf|png|gmap
       noRoute: won't plot route on map if True
       useTable: print stats in a tabular form if True
       useRoad: plot route on map of road (True) or satello=ite (False)
+      fast: read TCX files w/ the fast byte scanner (scanlib.py)
+      nProcs: no of processes for the fast scanner, for big files
+      follow: follow a TCX file as it is written, update the stats
+      idle: stop following after idle seconds w/out new points
+      watch: watch a directory, process the track files dropped in it
+      poll: how often to look at that directory (sec)
+      once: process the files in that directory and exit
+      outDir: directory where the plots, html and stats are saved
+      zones: JSON file where the time in zones is logged, see zonelib.py
+      hrZones: the HR zones' edges [bpm], increasing
+      splits: print the per lap, mile or km splits (lap, mi or km)
+      climbs: print the climbs, see elevlib.py
+      clean: remove or correct the bad GPS pts, see cleanlib.py
+      kalman: also smooth the positions w/ a Kalman filter
+      store: directory where the processed rides are saved, see storelib.py
+      batch: directory where the batch manifest and cache are kept, the
+             stale rides are processed, see batchlib.py
+      dedup: index of the rides' fingerprints, the rides already in it
+             (from another file) are skipped, see duplib.py
+      replay: type of the replay video (mp4, ... or rgba for raw frames),
+              saved as replay-<ride>.<type>, see replaylib.py
+      tz: the rides' time zone (ie America/Chicago), by default the zone
+          where each ride started, see tzlib.py
+      timeout, maxMem: w/ batch, each file is parsed and each ride is
+          processed in a worker killed after timeout [s] or failing over
+          maxMem [MB] of memory (0 for no limit), see workerlib.py
+      report: the season report of the rides in the batch or store
+          corpus, a .pdf or .html file, see reportlib.py
+      model: the velocity vs grade fits and profiles of each ride, and of
+          the rolling windows of model rides, in the batch or store
+          corpus, 0 for none, see modellib.py
       plotSize: size of the plotting window
     """
     #
@@ -44,6 +98,29 @@ def initOpts(plotType =   '-',    # -|x|w|pdf|png|gmap
     opts['noRoute']  =  noRoute
     opts['useRoad']  =  useRoad 
     opts['useTable'] =  useTable
+    opts['fast']     =  fast
+    opts['nProcs']   =  nProcs
+    opts['follow']   =  follow
+    opts['idle']     =  idle
+    opts['watch']    =  watch
+    opts['poll']     =  poll
+    opts['once']     =  once
+    opts['outDir']   =  outDir
+    opts['zones']    =  zones
+    opts['hrZones']  =  hrZones
+    opts['splits']   =  splits
+    opts['climbs']   =  climbs
+    opts['clean']    =  clean
+    opts['kalman']   =  kalman
+    opts['store']    =  store
+    opts['batch']    =  batch
+    opts['dedup']    =  dedup
+    opts['replay']   =  replay
+    opts['tz']       =  tz
+    opts['timeout']  =  timeout
+    opts['maxMem']   =  maxMem
+    opts['report']   =  report
+    opts['model']    =  model
     opts['plotSize'] = plotSize
     #
     return opts
@@ -62,11 +139,35 @@ def parseArgs(o):
       -vsTime|-vsDistance      type of plot
       -useSatellite|-useRoad   type of route bgd map
       -noRoute                 no route figure
+      -fast                    fast TCX reader
+      -nprocs n                use n processes for the fast reader
+      -follow [-idle s]        follow a growing TCX file, stop after s idle secs
+      -watch [-poll s] [-once] filename is a directory to watch, poll every s secs
+      -outdir d                save the outputs in d
+      -zones f                 print the time in zones, log it in f
+      -hrzones e1,e2,...       set the HR zones' edges to e1,e2,... [bpm]
+      -splits lap|mi|km        print the splits per lap, mile or km
+      -climbs                  print the climbs
+      -clean [-kalman]         clean the GPS pts [and smooth them]
+      -store d                 save the processed rides in the corpus d
+      -batch d                 process only the changed rides, cache in d
+                               (not w/ -zones, -splits, -climbs, -replay)
+      -dedup f                 skip the rides already seen, indexed in f
+      -replay t                render a replay video of type t (mp4...)
+      -tz z                    use the time zone z, not where the rides start
+      -timeout s               w/ -batch, max time to parse a file or
+                               process a ride [s]
+      -maxmem m                w/ -batch, max memory of a worker [MB]
+      -report f                w/ -batch or -store, season report in f
+                               (.pdf or .html)
+      -model n                 w/ -batch or -store, velocity vs grade fits
+                               of each ride and of windows of n rides
       -vmin v                  set velMin to v
       -vmax v                  set velMax to v
       -hrmin h                 set hrMin to h
       -cmin                    c set cadMin to c
       -|gmap|-pdf|-png|-x|-w   type of plot (none, gmap, pdf, png, X, or Windows
+      -view                    interactive viewer (linked cursors, zoom)
     or
       python process-tcx.py
     and answer prompts
@@ -104,9 +205,11 @@ def parseArgs(o):
                 o['useRoad'] = True
             elif a == 'noRoute':
                 o['noRoute'] = True
+            elif a == 'fast':
+                o['fast'] = True
             else:
                 print('Invalid, use\n '+\
-                      'vsTime vsDistance useTable noRoute useSatellite useRoad')
+                      'vsTime vsDistance useTable noRoute useSatellite useRoad fast')
     #
     # pass the args
     else:
@@ -128,11 +231,28 @@ def parseArgs(o):
                 o['useTable'] = True
             elif a == '-noRoute':
                 o['noRoute'] = True
+            elif a == '-fast':
+                o['fast'] = True
+            elif a == '-follow':
+                o['follow'] = True
+            elif a == '-watch':
+                o['watch'] = True
+            elif a == '-once':
+                o['once'] = True
+            elif a == '-climbs':
+                o['climbs'] = True
+            elif a == '-clean':
+                o['clean'] = True
+            elif a == '-kalman':
+                o['kalman'] = True
+                o['clean']  = True
             #
             elif a == '-gmap':
                 o['plotType'] = 'gmap'
             elif a == '-x' or a == 'w':
                 o['plotType'] = 'x'
+            elif a == '-view':
+                o['plotType'] = 'view'
             elif a == '-pdf':
                 o['plotType'] = 'pdf'
             elif a == '-png':
@@ -155,6 +275,73 @@ def parseArgs(o):
                 i += 1
                 o['cadMin'] = int(sys.argv[i])
             #
+            elif a == '-nprocs':
+                i += 1
+                o['nProcs'] = int(sys.argv[i])
+                o['fast']   = True
+            #
+            elif a == '-idle':
+                i += 1
+                o['idle'] = float(sys.argv[i])
+            #
+            elif a == '-poll':
+                i += 1
+                o['poll'] = float(sys.argv[i])
+            #
+            elif a == '-outdir':
+                i += 1
+                o['outDir'] = sys.argv[i]
+            #
+            elif a == '-store':
+                i += 1
+                o['store'] = sys.argv[i]
+            #
+            elif a == '-batch':
+                i += 1
+                o['batch'] = sys.argv[i]
+            #
+            elif a == '-dedup':
+                i += 1
+                o['dedup'] = sys.argv[i]
+            #
+            elif a == '-replay':
+                i += 1
+                o['replay'] = sys.argv[i]
+            #
+            elif a == '-tz':
+                i += 1
+                o['tz'] = sys.argv[i]
+            #
+            elif a == '-timeout':
+                i += 1
+                o['timeout'] = float(sys.argv[i])
+            elif a == '-maxmem':
+                i += 1
+                o['maxMem'] = int(sys.argv[i])
+            elif a == '-report':
+                i += 1
+                o['report'] = sys.argv[i]
+            elif a == '-model':
+                i += 1
+                o['model'] = int(sys.argv[i])
+            #
+            elif a == '-zones':
+                i += 1
+                o['zones'] = sys.argv[i]
+            elif a == '-hrzones':
+                i += 1
+                o['hrZones'] = tuple([float(e) for e in sys.argv[i].split(',')])
+                if list(o['hrZones']) != sorted(set(o['hrZones'])):
+                    print('Invalid HR zones "'+sys.argv[i]+'", use increasing edges')
+                    return 1
+            #
+            elif a == '-splits':
+                i += 1
+                o['splits'] = sys.argv[i]
+                if o['splits'] not in ('lap', 'mi', 'km'):
+                    print('Invalid split "'+o['splits']+'", use lap, mi or km')
+                    return 1
+            #
             else:
                 #
                 # last arg must be the TCX file name
@@ -168,9 +355,17 @@ def parseArgs(o):
                               ' options:\n'                          + \
                               ' [-useTable]'           + \
                               ' [-vsTime|-vsDistance]' + \
-                              ' [-useSatellite|-useRoad] [-noRoute]\n'      + \
+                              ' [-useSatellite|-useRoad] [-noRoute] [-fast]\n' + \
                               ' [-vmin v] [-vmax v] [-hrmin h] [-cmin c]\n' + \
-                              ' [-|gmap|-pdf|-png|-x|-w]')
+                              ' [-nprocs n] [-follow [-idle s]]\n'          + \
+                              ' [-watch [-poll s] [-once]] [-outdir d]\n'   + \
+                              ' [-zones f] [-hrzones e1,e2,...]\n'         + \
+                              ' [-splits lap|mi|km] [-climbs]\n'            + \
+                              ' [-clean [-kalman]] [-store d] [-batch d]\n' + \
+                              ' [-dedup f] [-replay t] [-tz z]\n'             + \
+                              ' [-timeout s] [-maxmem m] [-report f]\n'      + \
+                              ' [-model n]\n'                                + \
+                              ' [-|gmap|-pdf|-png|-x|-w|-view]')
                     else:
                         print('Invalid or too many arguments')
                     return 1
@@ -183,5 +378,13 @@ def parseArgs(o):
                  print('filename missing')
                  return 1
     #
+    # the outputs made per ride, that -batch does not make
+    if o['batch'] != '':
+        for (key, opt) in (('zones',  '-zones'),  ('splits', '-splits'),
+                           ('climbs', '-climbs'), ('replay', '-replay')):
+            if o[key]:
+                print(opt+' is not supported w/ -batch')
+                return 1
+    #
     # normal exit         
     return 0
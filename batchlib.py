@@ -0,0 +1,452 @@
+#
+# batch lib: process a corpus of track files, redo only what changed
+#  stageParams
+#  fileHash()
+#  rideName()
+#  Manifest
+#  parseFile()
+#  runStages()
+#  runBatch()
+# <- Last updated: Tue Oct 20 06:15:48 2026 -> SGK
+#
+# the manifest records, for each input file, its size, mtime and hash,
+# the rides it holds, and for each ride and stage (parse, process, plot,
+# gmap) the options it was run w/ and its outputs; a stage is stale when
+# the file changed (same size and mtime -> unchanged, w/out reading it;
+# otherwise the hash decides), an earlier stage was redone, its options
+# changed or an output is missing, and only the stale stages are run
+#
+# w/ opts['dedup'], a ride found in that index (see duplib.py) under
+# another name is marked as a duplicate when parsed, and is neither
+# processed nor counted in the summary
+#
+# the parsed tracks and the processed rides are kept as storelib corpora
+# (tracks/ and rides/ in the batch directory), so changing velMin only
+# reprocesses the tracks, w/out parsing the files again, and the summary
+# table is printed from the stats kept in the manifest
+#
+# each file is parsed, and each ride's stages are run, in a worker process
+# (see workerlib.py) w/ a timeout and a memory limit: a worker that
+# timed out or died is retried, then the file (or ride) is quarantined,
+# like one whose parsing or processing raised an exception, w/ the error
+# recorded in the manifest; it is skipped until it changes (or the
+# options of the stage that failed change). Each file done is appended
+# to a journal, the manifest is rewritten at the end, so an interrupted
+# run resumes where it stopped
+#
+import os, json, hashlib
+#
+from watchlib  import scanDir
+from readlib   import iterTracks
+from tracklib  import TrackProcessor, printStats
+from storelib  import storeRide, indexCorpus, loadRide, toJSON, writeFile
+from cleanlib  import cleanTrack
+from duplib    import fingerprint, DupIndex
+from workerlib import runWorker
+from reportlib import rideSummary
+from modellib  import rideHist, storeHist
+#
+# the options each stage depends on
+stageParams = {'parse':   ('fast', ),
+               'process': ('velMin', 'velMax', 'grdMax', 'cadMin', 'hrMin',
+                           'clean', 'kalman', 'tz', 'hrZones'),
+               'plot':    ('plotType', 'plotVS', 'useRoad', 'noRoute',
+                           'plotSize', 'velMin', 'velMax', 'cadMin',
+                           'outDir'),
+               'gmap':    ('velMin', 'outDir')}
+#
+# how many times a worker is run, when it times out or dies
+maxTries = 2
+#
+# ------------------------------------------------------------------------
+# hash a file's content
+def fileHash(fn,
+             blockSize = 1 << 20):
+    """
+    hex = fileHash(fn)
+      the SHA-1 of the file's content
+    """
+    h = hashlib.sha1()
+    with open(fn, 'rb') as f:
+        for block in iter(lambda: f.read(blockSize), b''):
+            h.update(block)
+    return h.hexdigest()
+#
+# ------------------------------------------------------------------------
+# the name of a ride in the batch
+def rideName(relName, trackName, fn):
+    """
+    name = rideName(relName, trackName, fn)
+      relName   - the input file, relative to the batch's input
+      trackName - track.meta['fileName'], fn or fn/member for an archive
+      name      - relName w/out its extension(s), and the member's name
+                  for an archive, safe as a file name
+    """
+    name = relName.split('.')[0]
+    if trackName.startswith(fn+'/'):
+        name += '-'+os.path.basename(trackName).split('.')[0]
+    return name.replace(os.sep, '_').replace('/', '_')
+#
+# ------------------------------------------------------------------------
+# the record of what was done
+class Manifest:
+    """
+    manifest = Manifest('batch/manifest.json')
+    manifest.files      {relName: {'size', 'mtime', 'hash', 'rides'}}
+                        rides is {name: {'fileName', 'stages'}}, stages
+                        is {stage: {'params', 'outputs', ...}}; 'failed'
+                        is set for a file or ride that failed
+    manifest.checkpoint(relName)
+                        append the file's entry to the journal, flushed
+                        to disk, so it is kept if the run is interrupted
+    manifest.save()     if anything changed (manifest.dirty), and remove
+                        the journal
+    manifest.resumed    the files read from the journal, ie from an
+                        interrupted run
+    """
+    #
+    def __init__(self, fileName):
+        self.fileName = fileName
+        self.journal = os.path.splitext(fileName)[0]+'.journal'
+        self.files = {}
+        self.dirty = False
+        self.resumed = []
+        if os.path.exists(fileName):
+            with open(fileName) as f:
+                self.files = json.load(f)['files']
+        #
+        # the files done by an interrupted run, a partly written last
+        # line is ignored
+        if os.path.exists(self.journal):
+            with open(self.journal) as f:
+                for line in f:
+                    try:
+                        (relName, entry) = json.loads(line)
+                    except ValueError:
+                        break
+                    self.files[relName] = entry
+                    self.resumed.append(relName)
+            self.dirty = True
+    #
+    def checkpoint(self, relName):
+        """
+        append a file's entry to the journal
+        """
+        with open(self.journal, 'a') as f:
+            f.write(json.dumps([relName, self.files[relName]],
+                               default = toJSON)+'\n')
+            f.flush()
+            os.fsync(f.fileno())
+        self.dirty = True
+    #
+    def save(self):
+        """
+        write the manifest, to a temp file renamed when complete
+        """
+        if self.dirty:
+            writeFile(self.fileName,
+                      lambda f: json.dump({'files': self.files}, f,
+                                          default = toJSON))
+            self.dirty = False
+        if os.path.exists(self.journal):
+            os.remove(self.journal)
+#
+# ------------------------------------------------------------------------
+# the options of a stage, as saved in the manifest
+def getParams(opts, stage):
+    return json.loads(json.dumps(dict([(k, opts[k])
+                                       for k in stageParams[stage]])))
+#
+# ------------------------------------------------------------------------
+# the file names doPlot() and mkGMap() save to
+def plotOutputs(name, opts):
+    user = os.environ.get('USER', 'nobody')
+    figs = ['stats'] if opts['noRoute'] else ['route', 'stats']
+    return [os.path.join(opts['outDir'], fig+'-'+name+'-'+user+'.' +
+                         opts['plotType']) for fig in figs]
+#
+def gmapOutputs(name, opts):
+    return [os.path.join(opts['outDir'], 'gmap-'+name+'.html')]
+#
+# ------------------------------------------------------------------------
+# parse a file, in a worker
+def parseFile(fn, relName, tracksDir, params, fast, dedup):
+    """
+    rides = parseFile(fn, relName, tracksDir, params, fast, dedup)
+      store the file's tracks in tracksDir, returns the entry of each ride
+      for the manifest, w/ its fingerprint if dedup
+    """
+    rides = {}
+    for track in iterTracks(fn, fast = fast):
+        name = rideName(relName, track.meta['fileName'], fn)
+        storeRide(track, {}, tracksDir, name = name, update = False)
+        rides[name] = {'fileName': track.meta['fileName'],
+                       'stages': {'parse': {'params': params}}}
+        if dedup:
+            rides[name]['fingerprint'] = fingerprint(track)
+    return rides
+#
+# ------------------------------------------------------------------------
+# run a ride's stages, in a worker
+def runStages(name, ride, todo, opts, params, tracksDir, ridesDir):
+    """
+    done = runStages(name, ride, todo, opts, params, tracksDir, ridesDir)
+      run the stages in todo (process, plot, gmap) of the ride name,
+      returns {stage: its entry for the manifest}
+    """
+    done = {}
+    proc = None
+    for stage in todo:
+        if stage == 'process':
+            track = loadRide(tracksDir, name)
+            if opts['clean']:
+                (track, report) = cleanTrack(track, maxSpeed = opts['velMax'],
+                                             kalman = opts['kalman'])
+            proc = TrackProcessor(velMin = opts['velMin'],
+                                  velMax = opts['velMax'],
+                                  grdMax = opts['grdMax'],
+                                  cadMin = opts['cadMin'],
+                                  hrMin  = opts['hrMin'],
+                                  zone   = opts['tz'] or None)
+            proc.update(track)
+            stats = proc.stats(final = True)
+            stats['fileName'] = ride['fileName']
+            stats['summary'] = rideSummary(proc.ride, opts)
+            storeRide(proc.ride, stats, ridesDir, name = name, update = False)
+            storeHist(rideHist(proc.ride, opts), ridesDir, name)
+            done['process'] = {'params': params['process'], 'stats': stats}
+            continue
+        #
+        rideData = proc.ride if proc is not None else \
+            loadRide(ridesDir, name)
+        stats = done.get('process', ride['stages'].get('process'))['stats']
+        if stage == 'plot':
+            from plottrack import doPlot
+            doPlot(rideData, stats,
+                   plotType = opts['plotType'],
+                   useRoad  = opts['useRoad'],
+                   noRoute  = opts['noRoute'],
+                   plotSize = opts['plotSize'],
+                   plotVS   = opts['plotVS'],
+                   velMin   = opts['velMin'],
+                   velMax   = opts['velMax'],
+                   cadMin   = opts['cadMin'],
+                   tag      = '-'+name,
+                   outDir   = opts['outDir'])
+            outputs = plotOutputs(name, opts)
+        else:
+            from mkgmap import mkGMap
+            outputs = gmapOutputs(name, opts)
+            mkGMap(rideData, stats, velMin = opts['velMin'],
+                   htmlFile = outputs[0])
+        done[stage] = {'params': params[stage], 'outputs': outputs}
+    return done
+#
+# ------------------------------------------------------------------------
+# what a failure is recorded w/: the stage's options and the limits,
+#  it is tried again if they change
+def failedParams(params, stage, opts):
+    return dict(params[stage], timeout = opts['timeout'],
+                maxMem = opts['maxMem'])
+#
+# ------------------------------------------------------------------------
+# run a worker, try again if it timed out or died
+def tryWorker(fcn, args, opts):
+    for tries in range(1, maxTries+1):
+        (status, value) = runWorker(fcn, args, timeout = opts['timeout'],
+                                    memLimit = opts['maxMem'])
+        if status in ('ok', 'error'):
+            break
+    return (status, value, tries)
+#
+# ------------------------------------------------------------------------
+# process the track files in a directory, redo only what changed
+def runBatch(path, opts):
+    """
+    counts = runBatch(path, opts)
+      path - a directory (its track files, see watchlib.scanDir()) or a
+             track file
+      opts - the options (see argslib.py), opts['batch'] is the batch
+             directory (manifest and cached tracks and rides), and
+             opts['timeout'] [s] and opts['maxMem'] [MB] limit each worker
+      the stale stages are run, and the stats of all the rides are printed
+      as a table, sorted by start time; returns the no. of files, the
+      no. of times each stage was run, the no. of duplicates skipped and
+      the no. of files and rides that failed (or were quarantined)
+    the plots are only made if opts['plotType'] is not '-' (nor 'view'),
+    and are saved in opts['outDir'], tagged w/ the ride's name
+    """
+    batchDir = opts['batch']
+    (tracksDir, ridesDir) = (os.path.join(batchDir, 'tracks'),
+                             os.path.join(batchDir, 'rides'))
+    os.makedirs(batchDir, exist_ok = True)
+    manifest = Manifest(os.path.join(batchDir, 'manifest.json'))
+    counts = dict([(stage, 0) for stage in stageParams])
+    counts['dups'] = 0
+    counts['failed'] = 0
+    dups = DupIndex(opts['dedup']) if opts['dedup'] != '' else None
+    #
+    # the rides of an interrupted run are not in the dups index yet
+    if dups is not None:
+        for relName in manifest.resumed:
+            for ride in manifest.files[relName]['rides'].values():
+                if ('fingerprint' in ride) and ('duplicateOf' not in ride):
+                    dups.add(ride['fileName'], ride['fingerprint'])
+    #
+    if os.path.isdir(path):
+        files = scanDir(path)
+        base = path
+    else:
+        st = os.stat(path)
+        files = {path: (st.st_size, st.st_mtime_ns)}
+        base = os.path.dirname(path)
+    #
+    # the stages to run, and their options
+    wanted = ['parse', 'process']
+    if opts['plotType'] == 'gmap':
+        wanted.append('gmap')
+    elif opts['plotType'] not in ('-', 'view'):
+        wanted.append('plot')
+    params = dict([(stage, getParams(opts, stage)) for stage in wanted])
+    #
+    # imported here once, not by each worker
+    if 'plot' in wanted:
+        import plottrack
+    if 'gmap' in wanted:
+        import mkgmap
+    #
+    # forget the files removed
+    relNames = dict([(os.path.relpath(fn, base), fn) for fn in files])
+    for relName in list(manifest.files):
+        if relName not in relNames:
+            del manifest.files[relName]
+            manifest.dirty = True
+    #
+    for (relName, fn) in sorted(relNames.items()):
+        (size, mtime) = files[fn]
+        entry = manifest.files.get(relName)
+        modified = False
+        #
+        # has the file changed?
+        changed = (entry is None)
+        h = None
+        if (entry is not None) and ((entry['size'], entry['mtime']) !=
+                                    (size, mtime)):
+            h = fileHash(fn)
+            changed = (h != entry['hash'])
+            entry.update({'size': size, 'mtime': mtime, 'hash': h})
+            modified = True
+        failed = None if changed else entry.get('failed')
+        parsed = changed or ((failed is not None) and
+                             (failed['params'] !=
+                              failedParams(params, 'parse', opts))) or \
+            not all([os.path.isdir(os.path.join(tracksDir, name)) and
+                     (ride['stages']['parse']['params'] == params['parse'])
+                     for (name, ride) in entry['rides'].items()])
+        #
+        # a file that failed, and has not changed
+        if (failed is not None) and not parsed:
+            counts['failed'] += 1
+            if modified:
+                manifest.checkpoint(relName)
+            continue
+        #
+        # parse it
+        if parsed:
+            entry = {'size': size, 'mtime': mtime, 'hash': h or fileHash(fn),
+                     'rides': {}}
+            (status, value, tries) = tryWorker(
+                parseFile, (fn, relName, tracksDir, params['parse'],
+                            opts['fast'], dups is not None), opts)
+            counts['parse'] += 1
+            manifest.files[relName] = entry
+            if status != 'ok':
+                entry['failed'] = {'stage': 'parse', 'error': value,
+                                   'tries': tries,
+                                   'params': failedParams(params, 'parse',
+                                                          opts)}
+                print('failed:', relName, '(parse)', value)
+                counts['failed'] += 1
+                manifest.checkpoint(relName)
+                continue
+            entry['rides'] = value
+            if dups is not None:
+                for ride in value.values():
+                    fp = ride['fingerprint']
+                    same = dups.check(fp, ride['fileName'])
+                    if same:
+                        ride['duplicateOf'] = same[0]
+                    else:
+                        dups.add(ride['fileName'], fp)
+            modified = True
+        #
+        for (name, ride) in entry['rides'].items():
+            if 'duplicateOf' in ride:
+                counts['dups'] += 1
+                continue
+            #
+            # the 1st stale stage, and all the ones after it
+            stages = ride['stages']
+            todo = []
+            for stage in wanted[1:]:
+                done = stages.get(stage)
+                outputs = plotOutputs(name, opts) if stage == 'plot' else \
+                    gmapOutputs(name, opts) if stage == 'gmap' else \
+                    [os.path.join(ridesDir, name)]
+                if todo or parsed or (done is None) or \
+                   (done['params'] != params[stage]) or \
+                   not all([os.path.exists(o) for o in outputs]):
+                    todo.append(stage)
+            #
+            # a ride that failed, w/ the same options
+            failed = ride.get('failed')
+            if (failed is not None) and (failed['stage'] in todo) and \
+               (failed['params'] == failedParams(params, failed['stage'],
+                                                 opts)):
+                counts['failed'] += 1
+                continue
+            if not todo:
+                continue
+            #
+            (status, value, tries) = tryWorker(
+                runStages, (name, ride, todo, opts, params,
+                            tracksDir, ridesDir), opts)
+            ride.pop('failed', None)
+            if status == 'ok':
+                stages.update(value)
+                for stage in value:
+                    counts[stage] += 1
+            else:
+                # the stages before the one that failed were not kept
+                ride['failed'] = {'stage': todo[0], 'error': value,
+                                  'tries': tries,
+                                  'params': failedParams(params, todo[0],
+                                                         opts)}
+                print('failed:', name, '('+'/'.join(todo)+')', value)
+                counts['failed'] += 1
+            modified = True
+        if modified:
+            manifest.checkpoint(relName)
+    #
+    # keep the corpora's index up to date, if anything was stored
+    if (counts['parse'] > 0) or manifest.resumed:
+        indexCorpus(tracksDir)
+    if (counts['process'] > 0) or manifest.resumed:
+        indexCorpus(ridesDir)
+    if (dups is not None) and ((counts['parse'] > 0) or manifest.resumed):
+        dups.save()
+    manifest.save()
+    #
+    # the summary, from the stats kept, in the order the rides started
+    # (the start times are local, and may not be in the same zone)
+    allStats = [ride['stages']['process']['stats']
+                for entry in manifest.files.values()
+                for ride in entry['rides'].values()
+                if ('process' in ride['stages']) and
+                ('duplicateOf' not in ride)]
+    for stats in sorted(allStats, key = lambda s: (s.get('startEpoch', 0),
+                                                   s['startTime'])):
+        printStats(stats, useTable = True)
+    #
+    counts['files'] = len(files)
+    return counts
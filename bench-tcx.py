@@ -0,0 +1,646 @@
+#!/usr/bin/env python
+#
+# benchmarks and cross checks, run on the sample TCX files
+#
+#   python bench-tcx.py [what] [files]
+#     what: geodesy readers scan
+#           parallel [sizeMB]  (on a synthetic TCX file)
+#           follow lazy
+#           store [nRides]     (a corpus of nRides copies of the files)
+#           model [nRides]     (velocity vs grade fits of such a corpus)
+#           server [nReqs]     (load test of serve-tcx.py)
+#
+# <- Last updated: Tue Oct 20 07:04:12 2026 -> SGK
+#
+import sys, os, glob, time, tempfile, threading
+import json, signal, socket, subprocess, http.client
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+import numpy as np
+from math import cos, atan, pi
+#
+from tracklib import readTrack, TrackProcessor
+from geolib   import stepDist
+from readlib  import readTCX, readGPX, readFile
+from fitlib   import readFIT, writeFIT
+from scanlib  import scanTCX, scanTCXParallel, tailTCX
+from storelib import storeRide, indexCorpus, Corpus
+from statslib import MaskCache
+from dlsq_fit import dlsq_fit
+from argslib  import initOpts
+#
+# ------------------------------------------------------------------------
+# time a function, return best of n runs in sec and its result
+def timeIt(fcn, *args, n = 3, **kwargs):
+    """
+    (dt, result) = timeIt(fcn, *args, n=3, **kwargs)
+      best elapsed time [s] over n calls of fcn(*args, **kwargs)
+    """
+    best = None
+    for i in range(n):
+        t0 = time.perf_counter()
+        result = fcn(*args, **kwargs)
+        dt = time.perf_counter() - t0
+        if (best is None) or (dt < best):
+            best = dt
+    return (best, result)
+#
+# ------------------------------------------------------------------------
+# the per point atan() method used before geolib
+def oldStepDist(lon, lat):
+    """
+    what processTrack() used to do, one point at a time:
+      rdx fixed at the 1st point's latitude, atan() of the lon/lat steps
+    """
+    earthRad = 6367.449 # km
+    deg2rad  = pi/180.0
+    dd = np.zeros(lon.size)
+    rdx = earthRad*cos(lat[0]*deg2rad)
+    for i in range(1, lon.size):
+        dx = rdx * atan( (lon[i]-lon[i-1])*deg2rad )
+        dy = earthRad * atan( (lat[i]-lat[i-1])*deg2rad )
+        dd[i] = (dx**2+dy**2)**0.5
+    return dd
+#
+# ------------------------------------------------------------------------
+# get the lon/lat of a ride
+def getLonLat(fn):
+    """
+    return lon/lat arrays for a TCX file
+    """
+    track = readTrack(fn, silent = True)
+    lon = track['Longitude']
+    lat = track['Latitude']
+    m = np.isfinite(lon) & np.isfinite(lat)
+    return (lon[m], lat[m])
+#
+# ------------------------------------------------------------------------
+# geodesy: accuracy and throughput of the distance methods
+def benchGeodesy(files):
+    """
+    compare the old atan() method, haversine, equirect and vincenty
+      accuracy is wrt vincenty (WGS84 ellipsoid)
+    """
+    print('== geodesy: total distance [km], error wrt vincenty, ' +
+          'throughput [Mpts/s]')
+    fmtStr = '{:22s} {:>9.4f} {:>+9.4f}% {:>8.3f}'
+    rides = [(fn, ) + getLonLat(fn) for fn in files]
+    #
+    # add a synthetic long north-south ride, 1000 km, one pt every 10 m
+    n = 100000
+    lat = np.linspace(40.0, 49.0, n)
+    lon = np.linspace(-71.0, -70.0, n)
+    rides.append(('synthetic N-S 1000 km', lon, lat))
+    #
+    for (fn, lon, lat) in rides:
+        print('--', fn, lon.size, 'pts')
+        (dt, ref) = timeIt(stepDist, lon, lat, 'vincenty')
+        ref = ref.sum()
+        print(fmtStr.format('vincenty', ref, 0.0, lon.size/dt/1e6))
+        for method in ('haversine', 'equirect'):
+            (dt, dd) = timeIt(stepDist, lon, lat, method)
+            dd = dd.sum()
+            print(fmtStr.format(method, dd, (dd/ref-1)*100, lon.size/dt/1e6))
+        (dt, dd) = timeIt(oldStepDist, lon, lat, n = 1)
+        dd = dd.sum()
+        print(fmtStr.format('old atan() loop', dd, (dd/ref-1)*100,
+                            lon.size/dt/1e6))
+#
+# ------------------------------------------------------------------------
+# write a track as a GPX file, to test readGPX()
+def writeGPX(track, fn):
+    """
+    write the raw columns of track as a GPX file, w/ the Garmin
+      TrackPointExtension for HR and cadence
+    """
+    with open(fn, 'w') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n' +
+                '<gpx version="1.1" creator="bench-tcx" ' +
+                'xmlns="http://www.topografix.com/GPX/1/1" ' +
+                'xmlns:gpxtpx="http://www.garmin.com/xmlschemas/' +
+                'TrackPointExtension/v1">\n<trk><trkseg>\n')
+        for i in range(len(track)):
+            t = datetime.fromtimestamp(track['Time'][i], timezone.utc)
+            f.write('<trkpt lat="{:.7f}" lon="{:.7f}">'.format(
+                track['Latitude'][i], track['Longitude'][i]) +
+                    '<ele>{:.2f}</ele>'.format(track['Altitude'][i]) +
+                    '<time>'+t.strftime('%Y-%m-%dT%H:%M:%SZ')+'</time>' +
+                    '<extensions><gpxtpx:TrackPointExtension>' +
+                    '<gpxtpx:hr>{}</gpxtpx:hr>'.format(track['HeartRate'][i]) +
+                    '<gpxtpx:cad>{}</gpxtpx:cad>'.format(track['Cadence'][i]) +
+                    '</gpxtpx:TrackPointExtension></extensions></trkpt>\n')
+        f.write('</trkseg></trk></gpx>\n')
+#
+# ------------------------------------------------------------------------
+# max abs difference between the columns of two tracks
+def maxDiff(track1, track2):
+    """
+    return {col: max(abs(diff))} of the raw columns, ignoring NaNs
+    """
+    diff = {}
+    for name in track1.names:
+        d = np.abs(np.asarray(track1[name], dtype=float) -
+                   np.asarray(track2[name], dtype=float))
+        diff[name] = np.nanmax(d) if np.isfinite(d).any() else 0.0
+    return diff
+#
+# ------------------------------------------------------------------------
+# readers: TCX vs GPX vs FIT, same ride
+def benchReaders(files):
+    """
+    convert each TCX to GPX and FIT, check they read back the same,
+      and compare the reading speed [kpts/s]
+    """
+    print('== readers: size [kB], time [ms], throughput [kpts/s]')
+    fmtStr = '{:5s} {:>8.1f} {:>8.2f} {:>9.1f}  {}'
+    tmpDir = tempfile.mkdtemp()
+    for fn in files:
+        track = readFile(fn)
+        print('--', fn, len(track), 'pts')
+        gpxFn = os.path.join(tmpDir, 'ride.gpx')
+        fitFn = os.path.join(tmpDir, 'ride.fit')
+        writeGPX(track, gpxFn)
+        writeFIT(track, fitFn)
+        for (fmt, f, fcn) in (('tcx', fn, readTCX),
+                              ('gpx', gpxFn, readGPX),
+                              ('fit', fitFn, readFIT)):
+            (dt, tr) = timeIt(fcn, f)
+            diff = maxDiff(track, tr)
+            diffStr = 'max diff: ' + ' '.join(['{}={:.1e}'.format(k, v)
+                                               for (k, v) in diff.items()])
+            print(fmtStr.format(fmt, os.path.getsize(f)/1024, dt*1e3,
+                                len(tr)/dt/1e3, diffStr))
+        os.remove(gpxFn)
+        os.remove(fitFn)
+    os.rmdir(tmpDir)
+#
+# ------------------------------------------------------------------------
+# scan: fast byte scanner vs XML reader
+def benchScan(files):
+    """
+    check that scanTCX() returns the same columns as readTCX(),
+      and compare their speed [kpts/s]; also check the fallback
+    """
+    print('== scan: time [ms], throughput [kpts/s], xml vs scan')
+    fmtStr = '{:5s} {:>8.2f} {:>9.1f}'
+    for fn in files:
+        (dt1, track1) = timeIt(readTCX, fn)
+        (dt2, track2) = timeIt(scanTCX, fn)
+        print('--', fn, len(track1), 'pts')
+        print(fmtStr.format('xml',  dt1*1e3, len(track1)/dt1/1e3))
+        if track2 is None:
+            print('scan: layout not recognized')
+            continue
+        print(fmtStr.format('scan', dt2*1e3, len(track2)/dt2/1e3),
+              ' x{:.1f}'.format(dt1/dt2))
+        diff = maxDiff(track1, track2)
+        same = (len(track1) == len(track2)) and \
+            all([v == 0 for v in diff.values()])
+        print('same columns:', same)
+    #
+    # an unusual layout must be rejected
+    tmpFn = os.path.join(tempfile.mkdtemp(), 'odd.tcx')
+    with open(files[0], 'rb') as f:
+        buf = f.read().replace(b'<Trackpoint>', b'<!-- pt --><Trackpoint>', 1)
+    with open(tmpFn, 'wb') as f:
+        f.write(buf)
+    print('-- w/ a comment, scanTCX() returns', scanTCX(tmpFn),
+          '-> readTrack(fast=True) reads',
+          len(readTrack(tmpFn, silent = True, fast = True)), 'pts')
+    os.remove(tmpFn)
+    os.rmdir(os.path.dirname(tmpFn))
+#
+# ------------------------------------------------------------------------
+# write a big synthetic TCX file, w/ several activities and laps
+def writeBigTCX(fn, sizeMB,
+                nActs = 2, lapPts = 5000):
+    """
+    write a TCX file of about sizeMB, a ride looping around, w/ nActs
+      activities and a lap every lapPts trackpoints
+    """
+    tpFmt = '''          <Trackpoint>
+            <Time>{}</Time>
+            <Position>
+              <LatitudeDegrees>{:.7f}</LatitudeDegrees>
+              <LongitudeDegrees>{:.7f}</LongitudeDegrees>
+            </Position>
+            <AltitudeMeters>{:.1f}</AltitudeMeters>
+            <HeartRateBpm>
+              <Value>{}</Value>
+            </HeartRateBpm>
+            <Cadence>{}</Cadence>
+          </Trackpoint>
+'''
+    lapFmt = '      <Lap StartTime="{}">\n' + \
+        '        <TotalTimeSeconds>{}</TotalTimeSeconds>\n' + \
+        '        <Cadence>80</Cadence>\n        <Track>\n'
+    t0 = 1619882013
+    nPts = int(sizeMB*1024*1024/len(tpFmt.format('2021-05-01T15:13:33Z',
+                                                  42.0, -71.0, 10.0, 100, 80)))
+    nPerAct = -(-nPts//nActs)
+    with open(fn, 'w') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n' +
+                '<TrainingCenterDatabase xmlns="http://www.garmin.com/' +
+                'xmlschemas/TrainingCenterDatabase/v2">\n  <Activities>\n')
+        i = 0
+        while i < nPts:
+            f.write('    <Activity Sport="Biking">\n')
+            iEnd = min(i+nPerAct, nPts)
+            while i < iEnd:
+                j = min(i+lapPts, iEnd)
+                ts = datetime.fromtimestamp(t0+i, timezone.utc)
+                f.write(lapFmt.format(ts.strftime('%Y-%m-%dT%H:%M:%SZ'), j-i))
+                ii = np.arange(i, j)
+                ang = ii*2e-4
+                tt = np.datetime_as_string((t0+ii).astype('datetime64[s]'))
+                f.write(''.join([tpFmt.format(tt[k]+'Z',
+                                              42.4+0.05*np.sin(ang[k]),
+                                              -71.3+0.07*np.cos(ang[k]),
+                                              50+20*np.sin(ang[k]*7),
+                                              100+(ii[k] % 60),
+                                              60+(ii[k] % 40))
+                                 for k in range(j-i)]))
+                f.write('        </Track>\n      </Lap>\n')
+                i = j
+            f.write('    </Activity>\n')
+        f.write('  </Activities>\n</TrainingCenterDatabase>\n')
+    return nPts
+#
+# ------------------------------------------------------------------------
+# parallel: scan a big TCX in parallel
+def benchParallel(sizeMB):
+    """
+    scan a synthetic sizeMB TCX file w/ 1, 2, 4, ... processes,
+      check the result is the same as scanTCX(), incl. laps
+    """
+    fn = os.path.join(tempfile.mkdtemp(), 'big.tcx')
+    t0 = time.perf_counter()
+    nPts = writeBigTCX(fn, sizeMB)
+    print('== parallel: wrote {} ({:.0f} MB, {} pts) in {:.1f} s'.format(
+        fn, os.path.getsize(fn)/1024**2, nPts, time.perf_counter()-t0))
+    print('cpu count:', os.cpu_count())
+    #
+    (dt1, ref) = timeIt(scanTCX, fn, n = 1)
+    print('{:>8s} {:>8.2f} s {:>8.1f} MB/s {:>8.1f} kpts/s'.format(
+        'serial', dt1, os.path.getsize(fn)/1024**2/dt1, len(ref)/dt1/1e3))
+    nProcs = 1
+    while nProcs <= max(4, 2*os.cpu_count()):
+        (dt, track) = timeIt(scanTCXParallel, fn, nProcs, n = 1)
+        same = (len(track) == len(ref)) and \
+            all([v == 0 for v in maxDiff(ref, track).values()]) and \
+            np.array_equal(ref.meta['lapStart'], track.meta['lapStart']) and \
+            np.array_equal(ref.meta['activityStart'],
+                           track.meta['activityStart'])
+        print('{:>8s} {:>8.2f} s {:>8.1f} MB/s {:>8.1f} kpts/s  x{:.2f}'
+              '  same: {}'.format('n='+str(nProcs), dt,
+                                 os.path.getsize(fn)/1024**2/dt,
+                                 len(track)/dt/1e3, dt1/dt, same))
+        nProcs *= 2
+    print('laps:', ref.meta['lapStart'].size,
+          'activities:', ref.meta['activityStart'])
+    os.remove(fn)
+    os.rmdir(os.path.dirname(fn))
+#
+# ------------------------------------------------------------------------
+# are two processed rides the same (w/in rounding)?
+def sameRide(ride1, ride2,
+             rtol = 1e-6):
+    return (ride1.names == ride2.names) and \
+        all([np.allclose(ride1[name], ride2[name], rtol = rtol, atol = 1e-9,
+                         equal_nan = True) for name in ride1.names])
+#
+# ------------------------------------------------------------------------
+# incremental processing: same results, cost per update
+def benchFollow(files,
+                batch = 60):
+    """
+    feed TrackProcessor w/ batches of pts, compare to all pts at once,
+      time it vs re-processing the whole track at each batch,
+    and follow a copy of each file written piece by piece w/ tailTCX()
+    """
+    print('{:>12s} {:>6s} {:>10s} {:>10s} {:>8s} {:>6s} {:>6s}'.
+          format('file', 'pts', 'increm.', 'reprocess', 'speedup',
+                 'same', 'tail'))
+    for fn in files:
+        track = readTrack(fn, silent = True, fast = True)
+        n = len(track)
+        # the whole ride at once, as processTrack() does
+        proc = TrackProcessor()
+        proc.update(track)
+        (ride, stats) = (proc.ride, proc.stats(final = True))
+        # w/ the same x/y ref as the whole ride
+        refs = {'lonRef': stats['lonRef'], 'latRef': stats['latRef']}
+        #
+        def increm():
+            proc = TrackProcessor(**refs)
+            for i in range(0, n, batch):
+                proc.update(track.slice(i, i+batch))
+                proc.stats()
+            return proc
+        #
+        def reprocess():
+            proc = None
+            for i in range(0, n, batch):
+                proc = TrackProcessor(**refs)
+                proc.update(track.slice(0, i+batch))
+                proc.stats()
+            return proc
+        #
+        (dt1, proc) = timeIt(increm)
+        (dt2, xxxx) = timeIt(reprocess, n = 1)
+        #
+        # same data and stats as at once? (w/in rounding), the running
+        #  ones too
+        stats2 = proc.stats(final = True)
+        statsR = proc.stats()
+        same = sameRide(ride, proc.ride) and \
+            all([np.isclose(stats[k], s[k], rtol = 1e-9)
+                 if isinstance(stats[k], float) else stats[k] == s[k]
+                 for s in (stats2, statsR) for k in s])
+        #
+        # follow a copy being written
+        tmp = tempfile.mkdtemp()
+        copy = os.path.join(tmp, os.path.basename(fn))
+        with open(fn, 'rb') as f:
+            buf = f.read()
+        open(copy, 'wb').close()
+        def writer():
+            with open(copy, 'ab') as f:
+                for i in range(0, len(buf), 64*1024):
+                    f.write(buf[i:i+64*1024])
+                    f.flush()
+                    time.sleep(0.02)
+        th = threading.Thread(target = writer)
+        th.start()
+        proc = TrackProcessor(**refs)
+        nb = 0
+        for part in tailTCX(copy, poll = 0.01, idle = 5):
+            proc.update(part)
+            nb += 1
+        th.join()
+        os.remove(copy)
+        os.rmdir(tmp)
+        tail = (proc.nPts == n) and sameRide(ride, proc.ride)
+        #
+        print('{:>12s} {:>6d} {:>8.1f}ms {:>8.1f}ms {:>7.1f}x {:>6s} {:>6s}'
+              ' ({} batches)'.format(os.path.basename(fn), n,
+                                      dt1*1e3, dt2*1e3, dt2/dt1,
+                                      str(same), str(tail), nb))
+#
+# ------------------------------------------------------------------------
+# lazy derived columns: stats only vs the whole ride
+def benchLazy(files):
+    """
+    time processing a track for its stats only, and w/ all the ride's
+      columns accessed (as doPlot() does), and the memory used
+    """
+    print('{:>12s} {:>6s} {:>10s} {:>10s} {:>10s} {:>10s}'.
+          format('file', 'pts', 'stats', 'all cols', 'stats [B]',
+                 'all [B]'))
+    for fn in files:
+        track = readTrack(fn, silent = True, fast = True)
+        #
+        def statsOnly():
+            proc = TrackProcessor()
+            proc.update(track)
+            proc.stats(final = True)
+            return proc.ride
+        #
+        def allColumns():
+            ride = statsOnly()
+            for name in ride.names:
+                ride[name]
+            return ride
+        #
+        (dt1, ride1) = timeIt(statsOnly, n = 5)
+        (dt2, ride2) = timeIt(allColumns, n = 5)
+        print('{:>12s} {:>6d} {:>8.2f}ms {:>8.2f}ms {:>10d} {:>10d}'.
+              format(os.path.basename(fn), len(track), dt1*1e3, dt2*1e3,
+                     ride1.nbytes, ride2.nbytes))
+#
+# ------------------------------------------------------------------------
+# resident memory [MB], Linux only
+def residentMB():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1])*os.sysconf('SC_PAGE_SIZE')/2**20
+    except (OSError, ValueError):
+        return 0.0
+#
+# ------------------------------------------------------------------------
+# store a corpus, time opening it and selecting a few columns
+def benchStore(files,
+               nRides = 1000,
+               columns = ('Velocity', 'HeartRate')):
+    """
+    store nRides copies of the processed files in a corpus, then time
+      opening it, and reading columns across all the rides, w/ the
+      resident memory used
+    """
+    rides = []
+    for fn in files:
+        proc = TrackProcessor()
+        proc.update(readTrack(fn, silent = True, fast = True))
+        stats = proc.stats(final = True)
+        stats['fileName'] = fn
+        rides.append((proc.ride, stats))
+    #
+    with tempfile.TemporaryDirectory() as tmp:
+        t0 = time.perf_counter()
+        for i in range(nRides):
+            (ride, stats) = rides[i % len(rides)]
+            storeRide(ride, stats, tmp, name = 'ride{:05d}'.format(i),
+                      update = False)
+        indexCorpus(tmp)
+        dt = time.perf_counter() - t0
+        size = sum([os.path.getsize(os.path.join(d, f))
+                    for (d, dirs, fs) in os.walk(tmp) for f in fs])
+        print('stored {} rides, {:.1f} MB, in {:.2f} s'.
+              format(nRides, size/2**20, dt))
+        #
+        rss0 = residentMB()
+        (dt, corpus) = timeIt(Corpus, tmp, n = 1)
+        print('open:    {:8.2f} ms  {:6.1f} MB resident'.
+              format(dt*1e3, residentMB() - rss0))
+        #
+        def select():
+            return [(c, np.concatenate(list(corpus.column(c).values())))
+                    for c in columns]
+        (dt, values) = timeIt(select, n = 1)
+        nBytes = sum([v.nbytes for (c, v) in values])
+        print('select:  {:8.2f} ms  {:6.1f} MB resident, {} ({:.1f} MB)'.
+              format(dt*1e3, residentMB() - rss0, ' '.join(columns),
+                     nBytes/2**20))
+        (dt, df) = timeIt(corpus.statsFrame, n = 1)
+        print('stats:   {:8.2f} ms  {} x {} data frame'.
+              format(dt*1e3, *df.shape))
+#
+# ------------------------------------------------------------------------
+# velocity vs grade fits of a corpus: from the histograms vs the pts
+def benchModel(files,
+               nRides = 2000,
+               window = 20):
+    """
+    store nRides copies of the processed files, w/ their histograms, then
+      time modelCorpus() (1st run, then w/ the stack saved), vs dlsq_fit()
+      of each ride's and each window's pts, and compare the slopes
+    """
+    from modellib import rideHist, storeHist, modelCorpus
+    opts = initOpts()
+    rides = []
+    for fn in files:
+        proc = TrackProcessor()
+        proc.update(readTrack(fn, silent = True, fast = True))
+        rides.append((proc.ride, proc.stats(final = True),
+                      rideHist(proc.ride, opts)))
+    #
+    with tempfile.TemporaryDirectory() as tmp:
+        for i in range(nRides):
+            (ride, stats, hist) = rides[i % len(rides)]
+            name = storeRide(ride, stats, tmp, name = 'ride{:05d}'.format(i),
+                             update = False)
+            storeHist(hist, tmp, name)
+        indexCorpus(tmp)
+        #
+        (dt, model) = timeIt(modelCorpus, tmp, opts, window = window,
+                             silent = True, n = 1)
+        print('model, 1st: {:8.2f} ms  {} rides, {} windows of {}'.
+              format(dt*1e3, nRides, nRides-window+1, window))
+        (dt, model) = timeIt(modelCorpus, tmp, opts, window = window,
+                             silent = True)
+        print('model:      {:8.2f} ms'.format(dt*1e3))
+        #
+        def fitPts():
+            corpus = Corpus(tmp)
+            names = model['rides'].index
+            pts = []
+            for name in names:
+                ride = corpus[name]
+                m = MaskCache(ride, opts)('located') & \
+                    np.isfinite(ride['Grade'])
+                pts.append((ride['Grade'][m].astype(np.float64),
+                            ride['Velocity'][m].astype(np.float64)))
+            c1 = [dlsq_fit(g, v)[1][1] for (g, v) in pts]
+            w1 = [dlsq_fit(np.concatenate([g for (g, v) in pts[k:k+window]]),
+                           np.concatenate([v for (g, v) in pts[k:k+window]]))
+                  [1][1] for k in range(len(pts)-window+1)]
+            return (np.array(c1), np.array(w1))
+        (dt, (c1, w1)) = timeIt(fitPts, n = 1)
+        print('dlsq_fit:   {:8.2f} ms'.format(dt*1e3))
+        print('mph/10%: max difference, rides {:.3f}, windows {:.3f}'.
+              format(np.nanmax(np.abs(model['rides']['mph10'] - c1*10)),
+                     np.nanmax(np.abs(model['rides']['wMph10']
+                                      [window-1:] - w1*10))))
+#
+# ------------------------------------------------------------------------
+# POST a file to the local server
+def postFile(port, path, fn):
+    """
+    (status, body, xCache) = postFile(port, path, fn)
+      the file is streamed, not read in memory
+    """
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout = 300)
+    with open(fn, 'rb') as f:
+        conn.request('POST', path, body = f,
+                     headers = {'Content-Length': str(os.path.getsize(fn))})
+        resp = conn.getresponse()
+        body = resp.read()
+    conn.close()
+    return (resp.status, body, resp.getheader('X-Cache'))
+#
+# ------------------------------------------------------------------------
+# load test of the HTTP API, w/ 1, 2, 4 workers
+def benchServer(files,
+                nReqs = 40,
+                nClients = 8):
+    """
+    start serve-tcx.py w/ 1, 2, 4 workers, send it nReqs /stats requests
+      from nClients threads, all different (distinct velMin, so no cache
+      hits), then the same ones again (all cache hits)
+    """
+    # the reference stats
+    ref = {}
+    for fn in files:
+        proc = TrackProcessor()
+        proc.update(readTrack(fn, silent = True))
+        ref[fn] = proc.stats(final = True)
+    reqs = [(files[i % len(files)], 6.0+i*0.01) for i in range(nReqs)]
+    #
+    print('{:>8s} {:>10s} {:>10s} {:>8s}   {:>10s}  {}'.
+          format('workers', 'req/s', 'speedup', 'ok', 'cached', 'same'))
+    rate1 = None
+    for nWorkers in (1, 2, 4):
+        # a free port
+        with socket.socket() as s:
+            s.bind(('127.0.0.1', 0))
+            port = s.getsockname()[1]
+        srv = subprocess.Popen([sys.executable, 'serve-tcx.py',
+                                '-port', str(port),
+                                '-workers', str(nWorkers)],
+                               stdout = subprocess.PIPE,
+                               stderr = subprocess.DEVNULL, text = True)
+        # wait until it is up
+        srv.stdout.readline()
+        #
+        def run(req):
+            (fn, velMin) = req
+            return postFile(port, '/stats?velMin={:.2f}'.format(velMin), fn)
+        #
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(nClients) as ex:
+            res = list(ex.map(run, reqs))
+        dt = time.perf_counter() - t0
+        ok = sum([r[0] == 200 for r in res])
+        # w/ the default velMin, is it the same as here?
+        same = json.loads(res[0][1])['distance'] == ref[reqs[0][0]]['distance']
+        #
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(nClients) as ex:
+            res = list(ex.map(run, reqs))
+        dtc = time.perf_counter() - t0
+        hits = sum([r[2] == 'hit' for r in res])
+        #
+        srv.send_signal(signal.SIGINT)
+        srv.wait()
+        if rate1 is None:
+            rate1 = nReqs/dt
+        print('{:>8d} {:>10.1f} {:>9.2f}x {:>4d}/{:<3d}  {:>7.1f} req/s'
+              ' ({} hits)  {}'.format(nWorkers, nReqs/dt, nReqs/dt/rate1,
+                                      ok, nReqs, nReqs/dtc, hits, same))
+    print('cpus:', os.cpu_count())
+#
+# ------------------------------------------------------------------------
+#
+if __name__ == '__main__':
+    #
+    what  = 'geodesy'
+    files = sorted(glob.glob('*.tcx'))
+    if len(sys.argv) > 1:
+        what = sys.argv[1]
+    if len(sys.argv) > 2:
+        files = sys.argv[2:]
+    #
+    if what == 'geodesy':
+        benchGeodesy(files)
+    elif what == 'readers':
+        benchReaders(files)
+    elif what == 'scan':
+        benchScan(files)
+    elif what == 'parallel':
+        benchParallel(float(sys.argv[2]) if len(sys.argv) > 2 else 500)
+    elif what == 'follow':
+        benchFollow(files)
+    elif what == 'lazy':
+        benchLazy(files)
+    elif what == 'store':
+        benchStore(sorted(glob.glob('*.tcx')),
+                   int(sys.argv[2]) if len(sys.argv) > 2 else 1000)
+    elif what == 'model':
+        benchModel(sorted(glob.glob('*.tcx')),
+                   int(sys.argv[2]) if len(sys.argv) > 2 else 2000)
+    elif what == 'server':
+        benchServer(sorted(glob.glob('*.tcx')),
+                    int(sys.argv[2]) if len(sys.argv) > 2 else 40)
+    else:
+        print('invalid benchmark "'+what+'", ' +
+              'use: geodesy readers scan parallel follow lazy store model server')
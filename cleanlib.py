@@ -0,0 +1,292 @@
+#
+# clean lib: remove or correct the bad GPS pts, before the processing
+#  medianFilter()
+#  findSpikes()
+#  kalmanSmooth()
+#  cleanTrack()
+#  printCleaning()
+# <- Last updated: Tue Oct 20 00:52:17 2026 -> SGK
+#
+# a track is cleaned in a few vectorized passes, each linear in the no.
+# of pts:
+#  - the pts w/ a missing or non increasing time are removed
+#  - the impossible positions (out of range, or 0,0) are set to NaN
+#  - a spike is a pt whose implied speed from the previous pt and to the
+#    next one are both > maxSpeed, while going from the previous pt to
+#    the next one directly is not; an outlier is a pt more than medTol
+#    away from the running median of the positions; both are moved back
+#    on the track, interpolated in time from their good neighbors
+#  - the altitudes more than altTol away from their running median are
+#    replaced by that median
+#  - optionally, the positions are smoothed w/ a constant velocity Kalman
+#    filter and RTS smoother; the recursion is run on all the chunks of
+#    the track at once (one numpy op per step of a chunk, not per pt),
+#    the chunks overlap so their ends do not show
+#
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+#
+from columnlib import Track
+from geolib    import haversineDist, refPoint, projectXY, earthRad, \
+    deg2rad, km2mi
+#
+# the defaults: max speed [mph], running median width [pts], max distance
+#  from the median [km] and altitude from its median [m], Kalman position
+#  noise [m] and acceleration noise [m/s^2], chunk and overlap [pts]
+maxSpeed   = 100.0
+medWidth   = 5
+medTol     = 0.05
+altTol     = 30.0
+kalmanPos  = 5.0
+kalmanAcc  = 0.5
+kalmanSize = 512
+kalmanPad  = 64
+#
+# ------------------------------------------------------------------------
+# running median
+def medianFilter(x,
+                 width = medWidth):
+    """
+    xm = medianFilter(x, width)
+      the median of the width pts (odd) centered on each pt, the ends are
+      padded w/ the 1st and last values; NaN if any of them is NaN
+    """
+    x = np.asarray(x, dtype = np.float64)
+    if x.size == 0 or width < 2:
+        return x.copy()
+    h = width//2
+    return np.median(sliding_window_view(np.pad(x, h, mode = 'edge'),
+                                         2*h+1), axis = -1)
+#
+# ------------------------------------------------------------------------
+# the pts too fast to get to and to leave
+def findSpikes(time, lon, lat,
+               maxSpeed = maxSpeed):
+    """
+    spike = findSpikes(time, lon, lat, maxSpeed)
+      time in s, lon/lat in deg, maxSpeed in mph
+      spike - boolean array, True for the pts whose implied speed from
+              the previous and to the next pt are > maxSpeed, while the
+              one from the previous to the next pt is not; the 1st (last)
+              pt when the speed to (from) it is > maxSpeed, but not the
+              one next to it
+    """
+    n = time.size
+    spike = np.zeros(n, dtype = bool)
+    if n < 3:
+        return spike
+    vMax = maxSpeed/km2mi/3600.0
+    with np.errstate(invalid = 'ignore', divide = 'ignore'):
+        dt = np.diff(time)
+        v  = haversineDist(lon[:-1], lat[:-1], lon[1:], lat[1:])/dt
+        vSkip = haversineDist(lon[:-2], lat[:-2], lon[2:], lat[2:]) / \
+            (time[2:] - time[:-2])
+    spike[1:-1] = (v[:-1] > vMax) & (v[1:] > vMax) & (vSkip <= vMax)
+    spike[0]  = (v[0] > vMax) & (v[1] <= vMax)
+    spike[-1] = (v[-1] > vMax) & (v[-2] <= vMax)
+    return spike
+#
+# ------------------------------------------------------------------------
+# constant velocity Kalman filter and RTS smoother
+def kalmanSmooth(time, x, y,
+                 sigPos = kalmanPos, sigAcc = kalmanAcc,
+                 size = kalmanSize, pad = kalmanPad):
+    """
+    (xs, ys) = kalmanSmooth(time, x, y, sigPos, sigAcc, size, pad)
+      time in s, x/y positions in m, NaN when missing
+      sigPos - the position noise [m]
+      sigAcc - the acceleration noise [m/s^2]
+      the track is cut in chunks of size pts, each extended by pad pts on
+      both sides, and the chunks are filtered and smoothed together
+    """
+    n = time.size
+    if n < 2:
+        return (x.copy(), y.copy())
+    size = min(size, n)
+    nb = -(-n//size)
+    #
+    # the pts of each chunk, w/ the padding, clipped at the ends
+    idx = np.arange(nb)[:, None]*size + np.arange(-pad, size+pad)[None, :]
+    idx = np.clip(idx, 0, n-1)
+    t = time[idx]
+    z = np.stack((x[idx], y[idx]), axis = -1)
+    ok = np.isfinite(z).all(axis = -1)
+    #
+    (r, q) = (sigPos**2, sigAcc**2)
+    m = idx.shape[1]
+    # state (pos, vel) per axis, the covariance is the same for x and y
+    xp = np.zeros((m, nb, 2, 2))
+    xf = np.zeros((m, nb, 2, 2))
+    Pp = np.zeros((m, nb, 3))
+    Pf = np.zeros((m, nb, 3))
+    #
+    # start at the 1st pt, w/ a large velocity uncertainty
+    state = np.zeros((nb, 2, 2))
+    state[:, :, 0] = np.where(ok[:, :1], z[:, 0], 0.0)
+    P = np.zeros((nb, 3))
+    P[:, 0] = np.where(ok[:, 0], r, 1e12)
+    P[:, 2] = 1e4
+    for k in range(m):
+        dt = t[:, k] - t[:, k-1] if k > 0 else np.zeros(nb)
+        dt = np.maximum(dt, 0.0)
+        # predict
+        (p00, p01, p11) = (P[:, 0], P[:, 1], P[:, 2])
+        pos = state[:, :, 0] + dt[:, None]*state[:, :, 1]
+        vel = state[:, :, 1]
+        P = np.stack((p00 + 2*dt*p01 + dt**2*p11 + q*dt**3/3,
+                      p01 + dt*p11 + q*dt**2/2,
+                      p11 + q*dt), axis = -1)
+        xp[k, :, :, 0] = pos
+        xp[k, :, :, 1] = vel
+        Pp[k] = P
+        # update, where there is a measurement
+        s  = P[:, 0] + r
+        k0 = np.where(ok[:, k], P[:, 0]/s, 0.0)
+        k1 = np.where(ok[:, k], P[:, 1]/s, 0.0)
+        res = np.where(ok[:, k, None], z[:, k] - pos, 0.0)
+        state = np.stack((pos + k0[:, None]*res, vel + k1[:, None]*res),
+                         axis = -1)
+        P = np.stack(((1 - k0)*P[:, 0], (1 - k0)*P[:, 1],
+                      P[:, 2] - k1*P[:, 1]), axis = -1)
+        xf[k] = state
+        Pf[k] = P
+    #
+    # RTS smoother, backwards
+    xs = xf.copy()
+    for k in range(m-2, -1, -1):
+        dt = np.maximum(t[:, k+1] - t[:, k], 0.0)
+        (f00, f01, f11) = (Pf[k, :, 0], Pf[k, :, 1], Pf[k, :, 2])
+        (p00, p01, p11) = (Pp[k+1, :, 0], Pp[k+1, :, 1], Pp[k+1, :, 2])
+        det = p00*p11 - p01**2
+        det = np.where(det > 0, det, np.inf)
+        # C = Pf F' inv(Pp)
+        (a00, a01, a10, a11) = (f00 + dt*f01, f01, f01 + dt*f11, f11)
+        c00 = (a00*p11 - a01*p01)/det
+        c01 = (a01*p00 - a00*p01)/det
+        c10 = (a10*p11 - a11*p01)/det
+        c11 = (a11*p00 - a10*p01)/det
+        d = xs[k+1] - xp[k+1]
+        xs[k, :, :, 0] += c00[:, None]*d[:, :, 0] + c01[:, None]*d[:, :, 1]
+        xs[k, :, :, 1] += c10[:, None]*d[:, :, 0] + c11[:, None]*d[:, :, 1]
+    #
+    # keep the middle of each chunk
+    pos = xs[pad:pad+size, :, :, 0].transpose(1, 0, 2).reshape(-1, 2)[:n]
+    return (pos[:, 0], pos[:, 1])
+#
+# ------------------------------------------------------------------------
+# clean a track
+def cleanTrack(track,
+               maxSpeed = maxSpeed, medWidth = medWidth, medTol = medTol,
+               altTol = altTol, kalman = False):
+    """
+    (track, report) = cleanTrack(track, maxSpeed, medWidth, medTol,
+                                 altTol, kalman)
+      track    - a columnlib.Track w/ the raw columns, as read
+      maxSpeed - the max implied speed [mph], see findSpikes()
+      medWidth - the running median width [pts]
+      medTol   - the max distance from the median position [km]
+      altTol   - the max distance from the median altitude [m]
+      kalman   - smooth the positions, see kalmanSmooth()
+      returns a new track, and the report, a dict w/ the index (in the
+      track as read) of the pts removed (time), set to NaN (invalid),
+      moved (spikes, outliers), w/ a corrected altitude (altitude),
+      the no. of pts smoothed and the largest shift [m] (kalman, shift)
+    the report is also kept in track.meta['cleaning']
+    """
+    time = track['Time']
+    n = time.size
+    #
+    # the pts w/ a time after all the previous ones
+    with np.errstate(invalid = 'ignore'):
+        tMax = np.fmax.accumulate(time) if n > 0 else time
+        keep = np.isfinite(time)
+        keep[1:] &= time[1:] > tMax[:-1]
+    kept = np.flatnonzero(keep)
+    #
+    clean = Track(track.meta)
+    for name in track.names:
+        clean.addColumn(name, track[name][keep], track.units[name])
+    if 'lapStart' in track.meta:
+        clean.meta['lapStart'] = np.unique(np.searchsorted(
+            kept, track.meta['lapStart'])).tolist()
+    #
+    time = clean['Time']
+    lon = clean['Longitude'].copy()
+    lat = clean['Latitude'].copy()
+    alt = clean['Altitude'].astype(np.float64)
+    #
+    # impossible positions
+    with np.errstate(invalid = 'ignore'):
+        bad = (np.abs(lon) > 180) | (np.abs(lat) > 90) | \
+            ((lon == 0) & (lat == 0))
+    lon[bad] = np.nan
+    lat[bad] = np.nan
+    #
+    # spikes, then the outliers left
+    spike = findSpikes(time, lon, lat, maxSpeed)
+    (lonS, latS) = (np.where(spike, np.nan, lon), np.where(spike, np.nan, lat))
+    with np.errstate(invalid = 'ignore'):
+        outlier = haversineDist(lonS, latS, medianFilter(lonS, medWidth),
+                                medianFilter(latS, medWidth)) > medTol
+    moved = spike | outlier
+    good = np.isfinite(lon) & np.isfinite(lat) & ~moved
+    if moved.any() and good.sum() > 1:
+        lon[moved] = np.interp(time[moved], time[good], lon[good])
+        lat[moved] = np.interp(time[moved], time[good], lat[good])
+    #
+    # altitude spikes
+    altM = medianFilter(alt, medWidth)
+    with np.errstate(invalid = 'ignore'):
+        altBad = np.abs(alt - altM) > altTol
+    alt[altBad] = altM[altBad]
+    #
+    # Kalman smoother on the projected positions
+    (nSmooth, shift) = (0, 0.0)
+    if kalman and np.isfinite(lon).sum() > 1:
+        (lonRef, latRef) = refPoint(lon, lat)
+        (x, y) = projectXY(lon, lat, lonRef, latRef, earthRad*1000.0)
+        (xs, ys) = kalmanSmooth(time, x, y)
+        ok = np.isfinite(x) & np.isfinite(y)
+        shift = float(np.max(np.hypot(xs - x, ys - y)[ok]))
+        # back to lon/lat, the inverse of projectXY()
+        lat = latRef + ys/(earthRad*1000.0)/deg2rad
+        lon = lonRef + xs/(earthRad*1000.0*np.cos(latRef*deg2rad))/deg2rad
+        nSmooth = int(ok.sum())
+    #
+    clean.addColumn('Longitude', lon, clean.units['Longitude'])
+    clean.addColumn('Latitude',  lat, clean.units['Latitude'])
+    clean.addColumn('Altitude',  alt, clean.units['Altitude'],
+                    track['Altitude'].dtype)
+    #
+    report = {'time':     np.flatnonzero(~keep).tolist(),
+              'invalid':  kept[bad].tolist(),
+              'spikes':   kept[spike].tolist(),
+              'outliers': kept[outlier & ~spike].tolist(),
+              'altitude': kept[altBad].tolist(),
+              'kalman':   nSmooth,
+              'shift':    shift}
+    clean.meta['cleaning'] = report
+    return (clean, report)
+#
+# ------------------------------------------------------------------------
+# print the cleaning report
+def printCleaning(report,
+                  maxList = 10):
+    """
+    print how many pts were removed or corrected, and the 1st maxList ones
+    """
+    def show(idx):
+        s = ' '.join([str(i) for i in idx[:maxList]])
+        return s + (' ...' if len(idx) > maxList else '')
+    #
+    print('Cleaning:')
+    for (key, what) in (('time',     'removed, bad time'),
+                        ('invalid',  'invalid position'),
+                        ('spikes',   'spikes moved'),
+                        ('outliers', 'outliers moved'),
+                        ('altitude', 'altitudes fixed')):
+        idx = report[key]
+        print('  {:5d} {:18s} {}'.format(len(idx), what, show(idx)))
+    if report['kalman'] > 0:
+        print('  {:5d} {:18s} max shift {:.1f} m'.
+              format(report['kalman'], 'pts smoothed', report['shift']))
@@ -0,0 +1,172 @@
+#
+# column lib: a track stored as typed numpy columns
+#  Track
+#  makeTrack()
+#  parseTimes()
+# <- Last updated: Tue Oct 20 07:27:34 2026 -> SGK
+#
+from datetime import datetime
+import numpy as np
+import pandas as pd
+#
+# the columns every reader returns: name, dtype, units and fill value
+rawColumns = (('Time',      np.float64, 's',   np.nan),
+              ('Longitude', np.float64, 'o',   np.nan),
+              ('Latitude',  np.float64, 'o',   np.nan),
+              ('Altitude',  np.float32, 'm',   np.nan),
+              ('HeartRate', np.int16,   'bpm', 0),
+              ('Cadence',   np.int16,   'rpm', 0))
+#
+# the meta entries that are indices of pts, ie of the 1st pt of each lap
+indexMeta = ('lapStart', 'activityStart')
+#
+# ------------------------------------------------------------------------
+# a track, as a set of named columns of the same length
+class Track:
+    """
+    a track stored as named, typed columns (numpy arrays)
+      track['Time']       the column, a numpy array
+      track.units['Time'] its units
+      track.names         list of the column names, in order
+      track.meta          dict of extra info, ie 'format', 'fileName'
+
+    the raw columns returned by the readers are (see rawColumns)
+      Time [s, Unix epoch], Longitude, Latitude [deg], Altitude [m],
+      HeartRate [bpm], Cadence [rpm]
+    missing values are NaN for floats and 0 for HR/cadence
+
+    a derived column is computed from the others when first accessed
+      track.addDerived('Speed', fcn, 'mph')  # fcn(track) -> values
+    and then kept; track[name] returns the column itself (no copy) and
+    track.slice(i, j) a track w/ views of the columns
+    """
+    #
+    def __init__(self, meta = None):
+        self.columns = {}
+        self.units   = {}
+        self.derived = {}
+        self.meta    = dict(meta) if meta else {}
+    #
+    def addColumn(self, name, values,
+                  unit = '', dtype = None):
+        """
+        add (or replace) a column, converted to dtype if given
+        """
+        values = np.asarray(values, dtype = dtype)
+        if self.columns and (values.shape != (len(self), )):
+            raise ValueError('Track.addColumn(): "'+name+'" has ' +
+                             str(values.size)+' values, expected ' +
+                             str(len(self)))
+        self.columns[name] = values
+        self.units[name]   = unit
+        self.derived.pop(name, None)
+    #
+    def addDerived(self, name, fcn,
+                   unit = '', dtype = None):
+        """
+        add a column computed by fcn(track) when first accessed,
+          converted to dtype if given
+        """
+        self.derived[name] = (fcn, dtype)
+        self.units[name]   = unit
+    #
+    @property
+    def names(self):
+        # in the order they were added, computed or not
+        return [name for name in self.units if name in self]
+    #
+    @property
+    def nbytes(self):
+        """
+        memory used by the columns computed so far
+        """
+        return sum([v.nbytes for v in self.columns.values()])
+    #
+    def __len__(self):
+        for v in self.columns.values():
+            return v.size
+        # nothing computed yet
+        for name in self.derived:
+            return self[name].size
+        return 0
+    #
+    def __contains__(self, name):
+        return (name in self.columns) or (name in self.derived)
+    #
+    def __getitem__(self, name):
+        if name not in self.columns:
+            if name not in self.derived:
+                raise KeyError(name)
+            (fcn, dtype) = self.derived[name]
+            self.columns[name] = np.asarray(fcn(self), dtype = dtype)
+        return self.columns[name]
+    #
+    def slice(self, i, j):
+        """
+        return a track w/ the pts [i, j), the columns are views,
+          the laps' and activities' 1st pts are those in [i, j), from i
+        """
+        part = Track(self.meta)
+        (i, j, step) = slice(i, j).indices(len(self))
+        for key in indexMeta:
+            if key in part.meta:
+                idx = np.asarray(part.meta[key], dtype = np.int64)
+                part.meta[key] = idx[(idx >= i) & (idx < j)] - i
+        for name in self.names:
+            part.columns[name] = self[name][i:j]
+            part.units[name]   = self.units[name]
+        return part
+    #
+    def __repr__(self):
+        return '<Track {} pts: {}>'.format(len(self), ' '.join(self.names))
+    #
+    def toDataFrame(self):
+        """
+        return the columns as a pandas data frame
+        """
+        return pd.DataFrame(dict([(name, self[name]) for name in self.names]))
+#
+# ------------------------------------------------------------------------
+# convert ISO 8601 time stamps to Unix epoch time
+def parseTimes(times):
+    """
+    t = parseTimes(times)
+      times - a list of ISO 8601 strings, like 2021-05-01T15:13:33Z
+              or 2021-05-01T15:13:33.000+00:00
+      t     - numpy array of Unix epoch times [s], float64
+    """
+    if len(times) == 0:
+        return np.empty(0)
+    try:
+        tt = pd.to_datetime(times, utc = True)
+    except (ValueError, TypeError):
+        # mixed formats, do it one at a time
+        tt = pd.to_datetime([datetime.fromisoformat(t.replace('Z', '+00:00'))
+                             for t in times], utc = True)
+    t0 = pd.Timestamp(0, tz = 'UTC')
+    return np.asarray((tt - t0).total_seconds(), dtype = np.float64)
+#
+# ------------------------------------------------------------------------
+# make a track from the raw columns
+def makeTrack(time, lon, lat,
+              alt = None, hr = None, cad = None,
+              meta = None):
+    """
+    track = makeTrack(time, lon, lat, alt, hr, cad, meta)
+      time is Unix epoch [s], lon/lat in deg, alt in m
+      alt, hr, cad can be None (missing), or contain NaN
+      returns a Track with the rawColumns, typed and filled
+    """
+    track = Track(meta)
+    n = len(time)
+    for ((name, dtype, unit, fill), values) in zip(rawColumns,
+                                                   (time, lon, lat,
+                                                    alt, hr, cad)):
+        if values is None:
+            values = np.full(n, fill, dtype = dtype)
+        else:
+            values = np.asarray(values, dtype = np.float64)
+            if np.issubdtype(dtype, np.integer):
+                values = np.where(np.isfinite(values), np.round(values), fill)
+        track.addColumn(name, values, unit, dtype)
+    return track
@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+#
+# compare rides of the same route, aligned by distance, see comparelib.py
+#
+#   python compare-tcx.py [-pdf|-png|-x|-] [-ref k] [-step s] [-vmin v]
+#                         [-vmax v] files
+#
+#   the files can be archives, every ride is compared to the k-th one
+#   (0 by default), on a grid every s mi (0.01)
+#
+# <- Last updated: Tue Oct 20 01:14:05 2026 -> SGK
+#
+# this allows matplotlib to plot to file when there is no display
+import os, sys, time, matplotlib
+if (os.environ.get('DISPLAY','') == '') and (os.environ.get('OS') != 'Windows_NT'):
+    matplotlib.use('PDF')
+#
+from tracklib   import readTracks, TrackProcessor
+from comparelib import alignRides, printCompare, plotCompare
+#
+# ------------------------------------------------------------------------
+#
+if __name__ == '__main__':
+    #
+    # the options: -flag -> (name, type)
+    flags = {'-ref':  ('ref',    int),   '-step': ('step',   float),
+             '-vmin': ('velMin', float), '-vmax': ('velMax', float)}
+    opts = {'plotType': '-', 'ref': 0, 'step': 0.01,
+            'velMin': 6.0, 'velMax': 100.0}
+    args = sys.argv[1:]
+    while args and args[0].startswith('-'):
+        a = args.pop(0)
+        if a in ('-pdf', '-png', '-x', '-'):
+            opts['plotType'] = 'x' if a == '-x' else a[1:] or '-'
+            continue
+        if (a not in flags) or (len(args) == 0):
+            print('Invalid option', '"'+a+'",', 'usage\n' +
+                  ' compare-tcx.py [-pdf|-png|-x|-] [-ref k] [-step s]' +
+                  ' [-vmin v] [-vmax v] files')
+            sys.exit(1)
+        (name, typ) = flags[a]
+        opts[name] = typ(args.pop(0))
+    #
+    # read and process the rides
+    (rides, labels) = ([], [])
+    for fileName in args:
+        for track in readTracks(fileName, silent = True):
+            proc = TrackProcessor(velMin = opts['velMin'],
+                                  velMax = opts['velMax'])
+            proc.update(track)
+            rides.append(proc.ride)
+            labels.append(os.path.basename(track.meta['fileName']))
+    if len(rides) < 2:
+        print('need at least two rides to compare')
+        sys.exit(1)
+    if not (0 <= opts['ref'] < len(rides)):
+        print('invalid -ref', opts['ref'], 'for', len(rides), 'rides')
+        sys.exit(1)
+    #
+    t0 = time.perf_counter()
+    aligned = alignRides(rides, ref = opts['ref'], step = opts['step'])
+    dt = time.perf_counter() - t0
+    print('{} rides aligned on {} in {:.3f} s'.
+          format(len(rides), labels[opts['ref']], dt))
+    printCompare(aligned, labels)
+    #
+    if opts['plotType'] != '-':
+        plotCompare(aligned, labels, plotType = opts['plotType'])
@@ -0,0 +1,323 @@
+#
+# compare lib: compare rides of the same route, aligned by distance
+#  routeLine()
+#  matchDistance()
+#  forwardIdx()
+#  alignRides()
+#  printCompare()
+#  plotCompare()
+# <- Last updated: Tue Oct 20 07:16:52 2026 -> SGK
+#
+# each ride is map-matched on a reference ride: every pt is put at the
+# distance along the reference route of its nearest pt; the search is
+# vectorized, 1st on a coarse resampling of the route (a block of pts vs
+# all the coarse pts at once, the blocks sized so the cost matrices stay
+# small), then on the fine pts around the coarse match, and last on the
+# segments next to it; a small penalty for being far from where the pt is
+# expected (from the ride's own distance) picks the right pass on an out
+# and back, and a pt whose shift (distance along the route - own
+# distance) is away from the running median of the shifts is a crossing
+# of another part of the route, not kept; of the pts left, the ones that
+# go forward along the route are kept (a detour on a road the route takes
+# later is not), and the rides are interpolated on a shared distance
+# grid, so they can be subtracted
+#
+import numpy as np
+import matplotlib.pyplot as plt
+#
+from utilslib  import formatTime, putID, saveFig
+from columnlib import Track
+from geolib    import projectXY, km2mi
+from cleanlib  import medianFilter
+#
+# the defaults: coarse and fine spacing of the route [km], the penalty
+#  per km from the expected distance, the max distance off route [km],
+#  the running median width [pts] and max distance [km] from it of the
+#  shifts, the grid spacing and the largest gap to interpolate across [mi],
+#  the no. of neighbors of a pt going forward is checked w/, and the max
+#  no. of costs computed at once
+coarseStep  = 0.25
+fineStep    = 0.005
+expectPen   = 0.05
+maxOffRoute = 0.1
+shiftWidth  = 61
+maxShift    = 0.5
+gridStep    = 0.01
+maxGap      = 0.25
+fwdWidth    = 61
+maxCells    = 2**20
+#
+# the columns interpolated on the grid
+alignColumns = (('Velocity',       'mph'),
+                ('HeartRate',      'bpm'),
+                ('Cadence',        'rpm'),
+                ('SmoothAltitude', 'ft'))
+#
+# ------------------------------------------------------------------------
+# the reference route
+def routeLine(x, y,
+              step = fineStep):
+    """
+    (lx, ly, ld) = routeLine(x, y, step)
+      x, y - the positions of the reference ride [km], NaN if missing
+      the route resampled every step km along it, and the distance [km]
+      along it of each pt
+    """
+    ok = np.isfinite(x) & np.isfinite(y)
+    (x, y) = (x[ok], y[ok])
+    d = np.concatenate(([0.0], np.cumsum(np.hypot(np.diff(x), np.diff(y)))))
+    ld = np.arange(0, d[-1] + step, step) if d.size > 0 else np.zeros(0)
+    return (np.interp(ld, d, x), np.interp(ld, d, y), ld)
+#
+# ------------------------------------------------------------------------
+# the distance along the route of each pt
+def matchDistance(x, y, line,
+                  expect = None,
+                  coarse = coarseStep,
+                  penalty = expectPen,
+                  cells = maxCells):
+    """
+    (dist, off) = matchDistance(x, y, line, expect, coarse, penalty, cells)
+      x, y    - the positions to match [km]
+      line    - (lx, ly, ld) from routeLine()
+      expect  - where each pt is expected along the route [km], if known
+      coarse  - the spacing of the 1st search [km]
+      penalty - cost of being away from expect, in km per km
+      cells   - the max size of a block of pts times the route pts
+                searched
+      dist    - the distance along the route of the nearest pt [km]
+      off     - how far off the route is each pt [km], NaN if unknown
+    """
+    (lx, ly, ld) = line
+    n = x.size
+    (dist, off) = (np.full(n, np.nan), np.full(n, np.nan))
+    ok = np.isfinite(x) & np.isfinite(y)
+    if (ld.size < 2) or not ok.any():
+        return (dist, off)
+    (px, py) = (x[ok], y[ok])
+    e = expect[ok] if expect is not None else None
+    #
+    # the cost of matching the pts b to the route pts idx
+    def cost(b, idx):
+        c = (lx[idx] - px[b, None])**2 + (ly[idx] - py[b, None])**2
+        if e is not None:
+            c += (penalty*(ld[idx] - e[b, None]))**2
+        return c
+    #
+    # coarse, then fine around the coarse match, a block of pts at a time
+    ratio = max(int(round(coarse/(ld[1] - ld[0]))), 1)
+    cIdx = np.arange(0, ld.size, ratio)
+    step = max(cells//max(cIdx.size, 2*ratio+1), 1)
+    j = np.empty(px.size, dtype = np.int64)
+    for k in range(0, px.size, step):
+        b = slice(k, k+step)
+        c = cIdx[np.argmin(cost(b, cIdx[None, :]), axis = 1)]
+        fIdx = np.clip(c[:, None] + np.arange(-ratio, ratio+1)[None, :],
+                       0, ld.size-1)
+        j[b] = fIdx[np.arange(c.size), np.argmin(cost(b, fIdx), axis = 1)]
+    #
+    # project on the segments before and after the match, keep the nearest
+    best = np.full(px.size, np.inf)
+    for (a, b) in ((np.maximum(j-1, 0), j), (j, np.minimum(j+1, ld.size-1))):
+        (sx, sy) = (lx[b] - lx[a], ly[b] - ly[a])
+        s2 = sx**2 + sy**2
+        with np.errstate(invalid = 'ignore', divide = 'ignore'):
+            t = np.where(s2 > 0, ((px - lx[a])*sx + (py - ly[a])*sy)/s2, 0.0)
+        t = np.clip(t, 0, 1)
+        d2 = (lx[a] + t*sx - px)**2 + (ly[a] + t*sy - py)**2
+        better = d2 < best
+        best = np.where(better, d2, best)
+        dist[ok] = np.where(better, ld[a] + t*(ld[b] - ld[a]),
+                            dist[ok])
+    off[ok] = np.sqrt(best)
+    return (dist, off)
+#
+# ------------------------------------------------------------------------
+# the pts that go forward
+def forwardIdx(d,
+               width = fwdWidth,
+               jump = maxGap):
+    """
+    idx = forwardIdx(d, width, jump)
+      the index of a long strictly increasing subsequence of d: the pts
+      out of order w/ most of their width neighbors before, or after, are
+      dropped, the rest is cut in increasing runs (and at the steps >
+      jump), and the runs are chained, each one from its 1st pt above the
+      end of the one before it, to keep the most pts; the loops are over
+      the neighbors and the runs, not the pts
+    """
+    n = d.size
+    # how many of the neighbors before (after) a pt are not below (above)
+    (invB, invF, nB, nF) = np.zeros((4, n), dtype = np.int64)
+    for k in range(1, min(width, n-1)+1):
+        bad = d[:-k] >= d[k:]
+        invF[:-k] += bad
+        invB[k:] += bad
+        nF[:-k] += 1
+        nB[k:] += 1
+    idx = np.flatnonzero((2*invF <= nF) & (2*invB <= nB))
+    v = d[idx]
+    if v.size == 0:
+        return idx
+    #
+    # the runs, and the most pts of a chain ending w/ each one
+    dv = np.diff(v)
+    starts = np.concatenate(([0], np.flatnonzero((dv <= 0) | (dv > jump))+1))
+    ends = np.concatenate((starts[1:], [v.size]))
+    last = v[ends-1]
+    best = ends - starts
+    prev = np.full(starts.size, -1)
+    first = starts.copy()
+    for r in range(1, starts.size):
+        run = v[starts[r]:ends[r]]
+        q0 = max(r-width, 0)
+        k = np.searchsorted(run, last[q0:r], side = 'right')
+        gain = np.where(k < run.size, best[q0:r] + run.size - k, -1)
+        q = int(np.argmax(gain))
+        if gain[q] > run.size:
+            (best[r], prev[r], first[r]) = (gain[q], q0+q, starts[r]+k[q])
+    #
+    chain = []
+    r = int(np.argmax(best))
+    while r >= 0:
+        chain.append(r)
+        r = prev[r]
+    return idx[np.concatenate([np.arange(first[r], ends[r])
+                               for r in chain[::-1]])]
+#
+# ------------------------------------------------------------------------
+# align the rides on a distance grid
+def alignRides(rides,
+               ref = 0,
+               step = gridStep,
+               maxOff = maxOffRoute,
+               gap = maxGap,
+               columns = alignColumns):
+    """
+    aligned = alignRides(rides, ref, step, maxOff, gap, columns)
+      rides   - processed rides of the same route, see tracklib.py
+      ref     - which one is the reference
+      step    - the grid spacing [mi]
+      maxOff  - the pts further than maxOff [km] from the route are ignored
+      gap     - the grid pts w/in a gap > gap [mi] between matched pts are
+                not interpolated
+      columns - the columns to interpolate, see alignColumns
+      aligned - a columnlib.Track per ride, w/ the same Distance [mi] grid,
+                along the reference route, the Time [min] since the grid's
+                1st pt, the Gap [min] w/ the reference, and the columns,
+                NaN on the parts of the route the ride did not cover;
+                meta['onRoute'] is the fraction of the pts kept
+    the time at a distance is when the ride 1st got there, and a pt is
+    expected at its own distance from the start
+    """
+    lonRef = rides[ref].meta['lonRef']
+    latRef = rides[ref].meta['latRef']
+    #
+    def xy(ride):
+        return projectXY(ride['Longitude'], ride['Latitude'],
+                         lonRef, latRef)
+    #
+    line = routeLine(*xy(rides[ref]))
+    length = line[2][-1] if line[2].size > 0 else 0.0
+    grid = np.arange(0, length*km2mi + step/2, step)
+    #
+    aligned = []
+    for ride in rides:
+        (x, y) = xy(ride)
+        own = ride['Distance']/km2mi
+        (dist, off) = matchDistance(x, y, line, own)
+        #
+        # the pts on the route, not crossing it, that move forward along it
+        with np.errstate(invalid = 'ignore'):
+            on = off <= maxOff
+        shift = dist[on] - own[on]
+        on[on] = np.abs(shift - medianFilter(shift, shiftWidth)) < maxShift
+        d = dist[on]*km2mi
+        fwd = forwardIdx(d, jump = gap)
+        (idx, d) = (np.flatnonzero(on)[fwd], d[fwd])
+        #
+        # interpolate on the grid, NaN outside the part covered
+        def onGrid(v):
+            if d.size < 2:
+                return np.full(grid.size, np.nan)
+            g = np.interp(grid, d, v[idx].astype(np.float64))
+            g[miss] = np.nan
+            return g
+        #
+        k = np.clip(np.searchsorted(d, grid), 1, max(d.size-1, 1))
+        miss = (grid < d[0]) | (grid > d[-1]) | (d[k] - d[k-1] > gap) \
+            if d.size > 1 else np.ones(grid.size, dtype = bool)
+        #
+        t = onGrid(ride['Time'])
+        first = np.flatnonzero(np.isfinite(t))
+        if first.size > 0:
+            t -= t[first[0]]
+        one = Track({'fileName': ride.meta.get('fileName', ''),
+                     'onRoute':  idx.size/max(on.size, 1)})
+        one.addColumn('Distance', grid, 'mi')
+        one.addColumn('Time', t, 'min')
+        for (name, unit) in columns:
+            one.addColumn(name, onGrid(ride[name]), unit)
+        aligned.append(one)
+    #
+    for one in aligned:
+        one.addColumn('Gap', one['Time'] - aligned[ref]['Time'], 'min')
+    return aligned
+#
+# ------------------------------------------------------------------------
+# print the comparison
+def printCompare(aligned, labels):
+    """
+    print, for each ride, the distance it covered along the route, its
+      time and gap at the last pt covered, and the fraction on the route
+    """
+    print('{:20s} {:>7s} {:>8s} {:>8s} {:>6s}'.
+          format('ride', 'mi', 'time', 'gap', 'route'))
+    for (one, label) in zip(aligned, labels):
+        ok = np.flatnonzero(np.isfinite(one['Gap']))
+        if ok.size == 0:
+            print('{:20s} {:>7s}'.format(label[:20], '-'))
+            continue
+        j = ok[-1]
+        gap = one['Gap'][j]
+        step = one['Distance'][1] - one['Distance'][0]
+        print('{:20s} {:7.2f} {:>8s} {:>8s} {:5.1f}%'.
+              format(label[:20], (ok.size-1)*step,
+                     formatTime(one['Time'][j]),
+                     ('-' if gap < 0 else '+') + formatTime(abs(gap)),
+                     100*one.meta['onRoute']))
+#
+# ------------------------------------------------------------------------
+# plot the comparison
+def plotCompare(aligned, labels,
+                plotType = 'pdf',
+                plotSize = (12, 8),
+                name = 'compare'):
+    """
+    plot the gap w/ the 1st ride, the velocity and the HR of each ride,
+      and the altitude, vs the distance along the route
+    """
+    fig = plt.figure(figsize = plotSize)
+    panels = (('Gap',            'time gap [min]'),
+              ('Velocity',       'velocity [mph]'),
+              ('HeartRate',      'HR [bpm]'),
+              ('SmoothAltitude', 'altitude [ft]'))
+    for (k, (column, ylabel)) in enumerate(panels):
+        ax = fig.add_subplot(len(panels), 1, k+1)
+        for (one, label) in zip(aligned, labels):
+            ax.plot(one['Distance'], one[column], '-', linewidth = 0.8,
+                    label = label)
+        ax.set_ylabel(ylabel)
+        if k == 0:
+            ax.axhline(0, color = 'k', linewidth = 0.5)
+            ax.legend(fontsize = 6, ncol = 4)
+        if k == len(panels)-1:
+            ax.set_xlabel('distance along the route [mi]')
+    fig.tight_layout()
+    #
+    if (plotType == 'x') or (plotType == 'w'):
+        plt.show()
+    else:
+        putID(plt)
+        saveFig(fig, plotType, name = name)
+        plt.close(fig)
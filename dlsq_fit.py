@@ -6,7 +6,7 @@
 # uses numpy arrays for all computations, expect numpy arrays a input
 # to dlsq_fit
 #
-# <- Last updated: Sat May  1 16:49:35 2021 -> SGK
+# <- Last updated: Mon Oct 19 21:36:02 2026 -> SGK
 #
 import math
 import numpy as np
@@ -131,7 +131,10 @@ def dlsq_fit(x, y, nx = 1000):
       run the fitting, up to nx iterations
       return no of iters and coefs c[:]
         neg no of iters if not converged
+    x, y are converted to float64, float32 is not precise enough for eps
     """
+    x = np.asarray(x, dtype = np.float64)
+    y = np.asarray(y, dtype = np.float64)
     # initial guess
     c   = np.array([0.1, -1.0])
     # convergence precision
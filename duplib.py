@@ -0,0 +1,145 @@
+#
+# dup lib: find the rides already seen, ie the same ride from two sources
+#  fingerprint()
+#  sameRide()
+#  DupIndex
+# <- Last updated: Tue Oct 20 05:58:31 2026 -> SGK
+#
+# a ride's fingerprint is small and does not depend on how it was
+# sampled or how its times were written: its start time and duration,
+# its length, its bounding box and its position at sigPts fractions of
+# its length, quantized; the index keeps the fingerprints by start time
+# bucket, so a new ride is only compared to the rides that started w/in
+# a bucket of it, not to the whole corpus
+#
+import os, json
+import numpy as np
+#
+from geolib import stepDist
+#
+# the defaults: time bucket [s], no. of pts of the signature and its
+# resolution [deg], bounding box resolution [deg]; and when two rides
+# are the same: start and duration w/in timeTol [s], length w/in lenTol
+# (fraction), bounding box and signature w/in the tolerances [deg]
+timeBucket = 300
+sigPts     = 16
+sigRes     = 0.0005
+bboxRes    = 0.001
+timeTol    = 180
+lenTol     = 0.05
+bboxTol    = 0.003
+sigTol     = 0.002
+#
+# ------------------------------------------------------------------------
+# a ride's fingerprint
+def fingerprint(track,
+                n = sigPts):
+    """
+    fp = fingerprint(track, n)
+      track - a columnlib.Track w/ the raw columns
+      fp    - {'start', 'duration' [s], 'length' [km], 'bbox', 'sig'}, the
+              bbox (lon/lat min and max) and the signature (lon/lat at n
+              fractions of the length) are quantized to ints;
+              None if there are less than 2 pts w/ a time and a position
+    """
+    (t, lon, lat) = (track['Time'], track['Longitude'], track['Latitude'])
+    ok = np.isfinite(t) & np.isfinite(lon) & np.isfinite(lat)
+    if ok.sum() < 2:
+        return None
+    (t, lon, lat) = (t[ok], lon[ok], lat[ok])
+    d = np.concatenate(([0.0], np.cumsum(stepDist(lon, lat)[1:])))
+    f = np.linspace(0, d[-1], n)
+    sig = np.column_stack((np.interp(f, d, lon), np.interp(f, d, lat)))
+    bbox = (lon.min(), lat.min(), lon.max(), lat.max())
+    return {'start':    float(t[0]),
+            'duration': float(t[-1] - t[0]),
+            'length':   float(d[-1]),
+            'bbox':     [int(round(x/bboxRes)) for x in bbox],
+            'sig':      np.round(sig.ravel()/sigRes).astype(int).tolist()}
+#
+# ------------------------------------------------------------------------
+# are two fingerprints of the same ride
+def sameRide(fp1, fp2):
+    """
+    True if the fingerprints fp1 and fp2 are w/in the tolerances
+    """
+    if abs(fp1['start'] - fp2['start']) > timeTol or \
+       abs(fp1['duration'] - fp2['duration']) > timeTol:
+        return False
+    if abs(fp1['length'] - fp2['length']) > \
+       lenTol*max(fp1['length'], fp2['length']):
+        return False
+    if np.max(np.abs(np.subtract(fp1['bbox'], fp2['bbox'])))*bboxRes > \
+       bboxTol:
+        return False
+    if len(fp1['sig']) != len(fp2['sig']):
+        return False
+    return np.max(np.abs(np.subtract(fp1['sig'], fp2['sig'])))*sigRes <= \
+        sigTol
+#
+# ------------------------------------------------------------------------
+# the fingerprints of the rides seen
+class DupIndex:
+    """
+    index = DupIndex('dups.json')
+    dups = index.check(fp)        the names of the rides fp is the same as
+    index.add(name, fp)           add (or replace) a ride
+    index.changed                 True if a ride was added since saved
+    index.save()
+    a ride checked under its own name is not its own duplicate; the
+    index is read once and kept, save it once per file or batch, not
+    per ride
+    """
+    #
+    def __init__(self, fileName):
+        self.fileName = fileName
+        self.rides   = {}  # name -> fingerprint
+        self.buckets = {}  # start time bucket -> [names]
+        self.changed = False
+        if os.path.exists(fileName):
+            with open(fileName) as f:
+                self.rides = json.load(f)['rides']
+            for (name, fp) in self.rides.items():
+                self.buckets.setdefault(self.bucket(fp), []).append(name)
+    #
+    @staticmethod
+    def bucket(fp):
+        return str(int(fp['start']//timeBucket))
+    #
+    def check(self, fp,
+              name = None):
+        """
+        the names of the rides w/ the same fingerprint, looking only at
+          the rides that started in the same bucket or the ones next to it
+        """
+        if fp is None:
+            return []
+        b = int(self.bucket(fp))
+        dups = []
+        for k in (b-1, b, b+1):
+            for other in self.buckets.get(str(k), []):
+                if (other != name) and sameRide(fp, self.rides[other]):
+                    dups.append(other)
+        return dups
+    #
+    def add(self, name, fp):
+        """
+        add (or replace) a ride's fingerprint
+        """
+        if fp is None:
+            return
+        if name in self.rides:
+            self.buckets[self.bucket(self.rides[name])].remove(name)
+        self.rides[name] = fp
+        self.buckets.setdefault(self.bucket(fp), []).append(name)
+        self.changed = True
+    #
+    def save(self):
+        """
+        write the index, to a temp file renamed when complete
+        """
+        tmp = self.fileName+'.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({'rides': self.rides}, f)
+        os.replace(tmp, self.fileName)
+        self.changed = False
@@ -0,0 +1,294 @@
+#
+# elevation lib: smoothed altitude and grade, gain/loss and climbs
+#  fillGaps()
+#  smoothAlt()
+#  smoothGrade()
+#  zigzag()
+#  hystAlt()
+#  gainLoss()
+#  GainLoss
+#  findClimbs()
+#  printClimbs()
+# <- Last updated: Tue Oct 20 05:41:26 2026 -> SGK
+#
+# the altitude is smoothed over a distance window (not a no. of pts, so
+# the pts bunched up at low speed do not matter), w/ cumulative sums and
+# np.searchsorted(), and the grade is the slope of the smoothed altitude
+# across that window, so there is no dividing by the tiny steps
+#
+# the gain/loss use a hysteresis: the altitude must turn by more than h
+# to count, ie the zigzag of the turning pts; only the extrema of the
+# smoothed altitude are looked at one by one, and there are few of them
+#
+# GainLoss does the same as the pts are added (ie w/ -follow): it keeps
+# the hysteresis' state (the trend, the last turning pt and the extreme
+# since, the gain and loss so far), so only the new pts are looked at
+#
+import numpy as np
+#
+from utilslib  import formatTime
+from columnlib import Track
+from geolib    import km2mi, mtr2feet
+#
+# the defaults: smoothing window [km], hysteresis [m] for the gain/loss
+#  and for the climbs, smallest climb [m] and its min avg grade [%]
+smoothWidth = 0.1
+gainHyst    = 3.0
+climbHyst   = 10.0
+climbGain   = 20.0
+climbGrade  = 3.0
+#
+# ------------------------------------------------------------------------
+# fill the missing altitudes
+def fillGaps(dist, alt):
+    """
+    alt = fillGaps(dist, alt)
+      the NaN altitudes are interpolated (vs dist) from the valid ones,
+      all NaN if none is valid
+    """
+    alt = np.asarray(alt, dtype = np.float64)
+    ok = np.isfinite(alt)
+    if ok.all() or not ok.any():
+        return alt
+    # only the missing ones, the valid ones can share a distance (stopped)
+    alt = alt.copy()
+    alt[~ok] = np.interp(dist[~ok], dist[ok], alt[ok])
+    return alt
+#
+# ------------------------------------------------------------------------
+# smooth the altitude by distance
+def smoothAlt(dist, alt,
+              width = smoothWidth):
+    """
+    altS = smoothAlt(dist, alt, width)
+      dist  - cumulative distance [km], non decreasing
+      alt   - altitude [m], NaN when missing
+      width - the window [km]
+      altS  - the mean altitude of the pts w/in width/2 of each pt
+    """
+    alt = fillGaps(dist, alt)
+    if alt.size == 0:
+        return alt
+    cs = np.concatenate(([0.0], np.cumsum(alt)))
+    lo = np.searchsorted(dist, dist - width/2, 'left')
+    hi = np.searchsorted(dist, dist + width/2, 'right')
+    return (cs[hi] - cs[lo])/(hi - lo)
+#
+# ------------------------------------------------------------------------
+# the grade from the smoothed altitude
+def smoothGrade(dist, altS,
+                width = smoothWidth, grdMax = 15.0):
+    """
+    grade = smoothGrade(dist, altS, width, grdMax)
+      the slope [%] of altS [m] vs dist [km] across width [km] (less at
+      the ends), limited to +/- grdMax, 0 where undefined
+    """
+    if dist.size == 0:
+        return np.zeros(0)
+    d1 = np.minimum(dist + width/2, dist[-1])
+    d0 = np.maximum(dist - width/2, dist[0])
+    with np.errstate(invalid = 'ignore', divide = 'ignore'):
+        g = (np.interp(d1, dist, altS) - np.interp(d0, dist, altS)) / \
+            ((d1 - d0)*1000.0)*100
+    g[~np.isfinite(g)] = 0
+    return np.clip(g, -grdMax, grdMax)
+#
+# ------------------------------------------------------------------------
+# the turning pts, w/ a hysteresis
+def zigzag(alt, h):
+    """
+    idx = zigzag(alt, h)
+      the index of the alternating lows and highs of alt, each one more
+      than h away from the previous one, starting w/ 0
+    """
+    n = alt.size
+    if n == 0:
+        return np.zeros(0, dtype = np.int64)
+    # the candidates: the local extrema, and the ends
+    s = np.sign(np.diff(alt))
+    ext = np.flatnonzero(s[1:] != s[:-1]) + 1
+    cand = np.concatenate(([0], ext, [n-1])) if n > 1 else np.zeros(1, int)
+    z = alt[cand]
+    #
+    pts   = [0]
+    (lo, hi) = (0, 0)
+    trend = 0
+    for k in range(1, z.size):
+        v = z[k]
+        if trend == 0:
+            # no move > h yet, start from the lowest or highest pt
+            if v < z[lo]:
+                lo = k
+            if v > z[hi]:
+                hi = k
+            if z[hi] - z[lo] > h:
+                trend = 1 if hi > lo else -1
+                pts = [min(lo, hi), max(lo, hi)]
+        elif trend > 0:
+            if v >= z[pts[-1]]:
+                pts[-1] = k
+            elif z[pts[-1]] - v > h:
+                pts.append(k)
+                trend = -1
+        else:
+            if v <= z[pts[-1]]:
+                pts[-1] = k
+            elif v - z[pts[-1]] > h:
+                pts.append(k)
+                trend = 1
+    return cand[pts]
+#
+# ------------------------------------------------------------------------
+# the altitude w/out the turns smaller than the hysteresis
+def hystAlt(alt, h = gainHyst):
+    """
+    altH = hystAlt(alt, h)
+      alt linearly interpolated between its zigzag(alt, h) pts, so its
+      rises and drops are the gain and loss w/ a hysteresis h
+    """
+    alt = np.asarray(alt, dtype = np.float64)
+    if not np.isfinite(alt).any():
+        return np.zeros(alt.size)
+    idx = zigzag(alt, h)
+    return np.interp(np.arange(alt.size), idx, alt[idx])
+#
+# ------------------------------------------------------------------------
+# total gain and loss
+def gainLoss(alt, h = gainHyst):
+    """
+    (gain, loss) = gainLoss(alt, h)
+      the total gain and loss of alt, w/ a hysteresis h (same units)
+    """
+    d = np.diff(hystAlt(alt, h))
+    return (float(d[d > 0].sum()), float(-d[d < 0].sum()))
+#
+# ------------------------------------------------------------------------
+# total gain and loss, as the pts are added
+class GainLoss:
+    """
+    gl = GainLoss(h)
+    gl.add(alt)                 the next pts of the altitude, final
+    (gain, loss) = gl.totals(tail)
+      the gain and loss of the pts added, followed by the pts in tail,
+      that can still change (ie the smoothed altitude near the end), they
+      are not added; same as gainLoss() of all the pts
+    """
+    #
+    def __init__(self, h = gainHyst):
+        self.h = h
+        # trend, lowest and highest pts (value, pt no.) while no trend,
+        #  the last turning pt and the extreme since, gain, loss, no. of pts
+        self.state = (0, None, None, 0.0, 0.0, 0.0, 0.0, 0)
+    #
+    def feed(self, state, alt):
+        (trend, lo, hi, turn, last, gain, loss, n) = state
+        alt = np.asarray(alt, dtype = np.float64)
+        k = np.flatnonzero(np.isfinite(alt))
+        if k.size == 0:
+            return state[:-1] + (n + alt.size, )
+        # the candidates: the local extrema, and the ends
+        z = alt[k]
+        s = np.sign(np.diff(z))
+        cand = np.concatenate(([0], np.flatnonzero(s[1:] != s[:-1]) + 1,
+                               [z.size-1])) if z.size > 1 else np.zeros(1, int)
+        for i in cand:
+            v = z[i]
+            if trend == 0:
+                # no move > h yet, from the lowest or highest pt
+                if lo is None:
+                    (lo, hi) = ((v, n + k[i]), (v, n + k[i]))
+                if v < lo[0]:
+                    lo = (v, n + k[i])
+                if v > hi[0]:
+                    hi = (v, n + k[i])
+                if hi[0] - lo[0] > self.h:
+                    (trend, turn, last) = (1, lo[0], hi[0]) \
+                        if hi[1] > lo[1] else (-1, hi[0], lo[0])
+            elif trend > 0:
+                if v >= last:
+                    last = v
+                elif last - v > self.h:
+                    (gain, turn, last, trend) = (gain + last - turn, last, v,
+                                                 -1)
+            else:
+                if v <= last:
+                    last = v
+                elif v - last > self.h:
+                    (loss, turn, last, trend) = (loss + turn - last, last, v,
+                                                 1)
+        return (trend, lo, hi, turn, last, gain, loss, n + alt.size)
+    #
+    def add(self, alt):
+        self.state = self.feed(self.state, alt)
+    #
+    def totals(self,
+               tail = ()):
+        (trend, lo, hi, turn, last, gain, loss, n) = \
+            self.feed(self.state, tail)
+        if trend > 0:
+            gain += last - turn
+        elif trend < 0:
+            loss += turn - last
+        return (float(gain), float(loss))
+#
+# ------------------------------------------------------------------------
+# find the climbs
+def findClimbs(time, dist, altS, grade,
+               h = climbHyst, minGain = climbGain, minGrade = climbGrade):
+    """
+    climbs = findClimbs(time, dist, altS, grade, h, minGain, minGrade)
+      time   - elapsed time [min]
+      dist   - cumulative distance [km]
+      altS   - smoothed altitude [m]
+      grade  - grade [%]
+      a climb goes from a low to the next high of zigzag(altS, h), w/ a
+      gain >= minGain [m] and an avg grade >= minGrade [%]
+      climbs - a columnlib.Track, one row per climb, w/ its start time
+               [min] and distance [mi], length [mi], gain [ft], average
+               and max grade [%] and VAM (vertical ascent rate) [m/h]
+    """
+    idx = zigzag(altS, h) if np.isfinite(altS).any() else np.zeros(0, int)
+    (i0, i1) = (idx[:-1], idx[1:])
+    gain = altS[i1] - altS[i0]
+    span = dist[i1] - dist[i0]
+    with np.errstate(invalid = 'ignore', divide = 'ignore'):
+        avg = np.where(span > 0, gain/(span*1000.0)*100, 0.0)
+    ok = (gain >= minGain) & (avg >= minGrade)
+    (i0, i1, gain, span, avg) = (i0[ok], i1[ok], gain[ok], span[ok], avg[ok])
+    #
+    # the max grade over each climb, [i0, i1]
+    g = np.append(grade, -np.inf)
+    maxG = np.maximum.reduceat(g, np.ravel(np.column_stack((i0, i1+1))))[::2] \
+        if i0.size > 0 else np.zeros(0)
+    dt = time[i1] - time[i0]
+    with np.errstate(invalid = 'ignore', divide = 'ignore'):
+        vam = np.where(dt > 0, gain/(dt/60.0), 0.0)
+    #
+    climbs = Track()
+    for (name, values, unit) in (('Start',     time[i0],        'min'),
+                                 ('StartDist', dist[i0]*km2mi,  'mi'),
+                                 ('Length',    span*km2mi,      'mi'),
+                                 ('Gain',      gain*mtr2feet,   'ft'),
+                                 ('AvgGrade',  avg,             '%'),
+                                 ('MaxGrade',  maxG,            '%'),
+                                 ('VAM',       vam,             'm/h')):
+        climbs.addColumn(name, values, unit, np.float64)
+    return climbs
+#
+# ------------------------------------------------------------------------
+# print the climbs
+def printClimbs(climbs,
+                title = 'Climbs'):
+    """
+    print the climbs as a table, one line per climb
+    """
+    print(title)
+    print('{:>3s} {:>8s} {:>6s} {:>6s} {:>6s} {:>6s} {:>6s} {:>6s}'.
+          format('#', 'start', 'at mi', 'length', 'gain', 'avg%', 'max%',
+                 'VAM'))
+    for i in range(len(climbs)):
+        print('{:3d} {:>8s} {:6.2f} {:6.2f} {:6.0f} {:6.1f} {:6.1f} {:6.0f}'.
+              format(i+1, formatTime(climbs['Start'][i]),
+                     climbs['StartDist'][i], climbs['Length'][i],
+                     climbs['Gain'][i], climbs['AvgGrade'][i],
+                     climbs['MaxGrade'][i], climbs['VAM'][i]))
@@ -0,0 +1,338 @@
+#
+# FIT lib: decode a (Garmin) FIT binary file, in pure python + numpy
+#  scanFIT()
+#  decodeMessages()
+#  readFIT()
+#  writeFIT()
+# <- Last updated: Mon Oct 19 23:52:18 2026 -> SGK
+#
+# a FIT file is a 12 or 14 bytes header, a sequence of records and a CRC
+#   each record is a 1 byte header followed by either
+#     a definition message: the layout of the data messages of a local type
+#     a data message: the values, laid out as per its definition
+#   the record messages (global msg no 20) hold the trackpoints
+#
+# the file is scanned once in python, only looking at the record headers,
+# then all the data messages of a given definition are gathered and
+# decoded at once w/ numpy, as a structured array
+#
+import struct
+import numpy as np
+#
+from columnlib import makeTrack
+#
+# FIT epoch (1989-12-31 00:00 UTC) in Unix time
+fitEpoch = 631065600
+#
+# base types: no -> (numpy type, invalid value)
+baseTypes = {0x00: ('u1', 0xFF),       0x01: ('i1', 0x7F),
+             0x02: ('u1', 0xFF),       0x83: ('i2', 0x7FFF),
+             0x84: ('u2', 0xFFFF),     0x85: ('i4', 0x7FFFFFFF),
+             0x86: ('u4', 0xFFFFFFFF), 0x07: ('S1', None),
+             0x88: ('f4', None),       0x89: ('f8', None),
+             0x0A: ('u1', 0x00),       0x8B: ('u2', 0x0000),
+             0x8C: ('u4', 0x00000000), 0x0D: ('u1', None),
+             0x8E: ('i8', 0x7FFFFFFFFFFFFFFF),
+             0x8F: ('u8', 0xFFFFFFFFFFFFFFFF), 0x90: ('u8', 0)}
+#
+# record (msg no 20) fields: name -> (field no, scale, offset)
+recordFields = {'timestamp':         (253, 1,    0),
+                'position_lat':      (0,   1,    0),
+                'position_long':     (1,   1,    0),
+                'altitude':          (2,   5,  500),
+                'heart_rate':        (3,   1,    0),
+                'cadence':           (4,   1,    0),
+                'distance':          (5,   100,  0),
+                'speed':             (6,   1000, 0),
+                'enhanced_speed':    (73,  1000, 0),
+                'enhanced_altitude': (78,  5,  500)}
+#
+# lap (msg no 19) fields
+lapFields = {'start_time':           (2,   1,    0)}
+#
+semi2deg = 180.0/2**31
+#
+# ------------------------------------------------------------------------
+# a message definition
+class Definition:
+    """
+    layout of the data messages of a given local type
+      gmn     global message number (20 for records)
+      size    size of a data message (w/o the header byte)
+      fields  {field no: (offset, size, base type)}
+      endian  '<' or '>'
+    """
+    def __init__(self, gmn, endian, fields, size):
+        self.gmn    = gmn
+        self.endian = endian
+        self.fields = fields
+        self.size   = size
+    #
+    def dtype(self, nos):
+        """
+        numpy structured dtype to decode the fields in nos,
+          of the message that are present and have a known size
+        """
+        names   = []
+        formats = []
+        offsets = []
+        for no in nos:
+            if no not in self.fields:
+                continue
+            (off, size, bt) = self.fields[no]
+            (fmt, inv) = baseTypes.get(bt, ('u1', None))
+            if np.dtype(fmt).itemsize != size:
+                # an array field or a mismatch, skip it
+                continue
+            names.append(str(no))
+            formats.append(self.endian+fmt)
+            offsets.append(off)
+        return np.dtype({'names': names, 'formats': formats,
+                         'offsets': offsets, 'itemsize': self.size})
+#
+# ------------------------------------------------------------------------
+# scan a FIT file, find where each data message is
+def scanFIT(buf):
+    """
+    (defs, msgDef, msgPos, msgTime) = scanFIT(buf)
+      buf     - the content of the file (bytes)
+      defs    - list of the Definitions found
+      msgDef  - index in defs of each data message
+      msgPos  - offset in buf of each data message (after its header)
+      msgTime - timestamp of each data message w/ a compressed time header,
+                -1 otherwise (the full timestamp is then in field 253)
+    """
+    defs    = []
+    msgDef  = []
+    msgPos  = []
+    msgTime = []
+    nBuf = len(buf)
+    pos  = 0
+    #
+    # there can be several FIT files chained together
+    while pos + 12 <= nBuf:
+        (hSize, proto, profile, dSize, tag) = \
+            struct.unpack_from('<BBHI4s', buf, pos)
+        if tag != b'.FIT':
+            raise ValueError('scanFIT(): invalid FIT header at ' + str(pos))
+        pos += hSize
+        end  = pos + dSize
+        if end > nBuf:
+            raise ValueError('scanFIT(): truncated FIT file')
+        #
+        local    = {}  # local type -> index in defs
+        tsOffset = {}  # index in defs -> offset of its timestamp field
+        lastTime = 0
+        while pos < end:
+            h = buf[pos]
+            pos += 1
+            if h & 0x80:
+                # compressed timestamp header
+                k = local[(h >> 5) & 0x03]
+                dt = h & 0x1F
+                t = (lastTime & ~0x1F) + dt
+                if dt < (lastTime & 0x1F):
+                    t += 0x20
+                lastTime = t
+                msgDef.append(k)
+                msgPos.append(pos)
+                msgTime.append(t)
+                pos += defs[k].size
+            elif h & 0x40:
+                # definition message
+                arch = buf[pos+1]
+                endian = '>' if arch == 1 else '<'
+                (gmn, nf) = struct.unpack_from(endian+'HB', buf, pos+2)
+                pos += 5
+                fields = {}
+                size   = 0
+                for i in range(nf):
+                    (no, fs, bt) = buf[pos], buf[pos+1], buf[pos+2]
+                    fields[no] = (size, fs, bt)
+                    size += fs
+                    pos  += 3
+                # developer fields, just skip them
+                if h & 0x20:
+                    nd = buf[pos]
+                    pos += 1
+                    for i in range(nd):
+                        size += buf[pos+1]
+                        pos  += 3
+                defs.append(Definition(gmn, endian, fields, size))
+                k = len(defs)-1
+                local[h & 0x0F] = k
+                if 253 in fields and fields[253][1] == 4:
+                    tsOffset[k] = (fields[253][0], endian+'I')
+            else:
+                # data message
+                k = local[h & 0x0F]
+                msgDef.append(k)
+                msgPos.append(pos)
+                msgTime.append(-1)
+                if k in tsOffset:
+                    (off, fmt) = tsOffset[k]
+                    lastTime = struct.unpack_from(fmt, buf, pos+off)[0]
+                pos += defs[k].size
+        #
+        # skip the CRC
+        pos = end + 2
+    #
+    return (defs,
+            np.array(msgDef,  dtype = np.int32),
+            np.array(msgPos,  dtype = np.int64),
+            np.array(msgTime, dtype = np.int64))
+#
+# ------------------------------------------------------------------------
+# decode all the messages of a given type
+def decodeMessages(buf, scan, gmn, fields):
+    """
+    (values, seq) = decodeMessages(buf, scan, gmn, fields)
+      buf    - the content of the file
+      scan   - what scanFIT(buf) returned
+      gmn    - the global message number to decode
+      fields - {name: (field no, scale, offset)}
+      values - {name: float64 array}, NaN when invalid or missing
+               (the compressed timestamps fill in 'timestamp')
+      seq    - the index of these messages in the file
+    """
+    (defs, msgDef, msgPos, msgTime) = scan
+    raw = np.frombuffer(buf, dtype = np.uint8)
+    kk  = [k for k in range(len(defs)) if defs[k].gmn == gmn]
+    sel = np.flatnonzero(np.isin(msgDef, kk))
+    n   = sel.size
+    values = {name: np.full(n, np.nan) for name in fields}
+    nos = [fields[name][0] for name in fields]
+    #
+    for k in kk:
+        # which ones use this definition, and where they are in sel
+        j = np.flatnonzero(msgDef[sel] == k)
+        if j.size == 0:
+            continue
+        d  = defs[k]
+        dt = d.dtype(nos)
+        # gather the messages' bytes in one (n, size) array
+        idx = msgPos[sel[j], None] + np.arange(d.size)
+        rec = raw[idx].view(dt).reshape(j.size)
+        for (name, (no, scale, offset)) in fields.items():
+            if str(no) not in dt.names:
+                continue
+            v = rec[str(no)]
+            bt = d.fields[no][2]
+            inv = baseTypes.get(bt, (None, None))[1]
+            good = (v != inv) if inv is not None else np.isfinite(v)
+            values[name][j] = np.where(good, v/scale - offset, np.nan)
+    #
+    # compressed timestamps
+    if 'timestamp' in values:
+        t = msgTime[sel]
+        m = t >= 0
+        values['timestamp'][m] = t[m]
+    return (values, sel)
+#
+# ------------------------------------------------------------------------
+# read a FIT file
+def readFIT(f):
+    """
+    track = readFIT(f)
+      f     - file name or file object, in FIT format
+      track - a columnlib.Track, w/ the record messages
+    the enhanced altitude is used when present, the index of the 1st
+    record of each lap is kept in track.meta['lapStart']
+    """
+    if hasattr(f, 'read'):
+        buf = f.read()
+    else:
+        with open(f, 'rb') as fd:
+            buf = fd.read()
+    #
+    scan = scanFIT(buf)
+    (vals, seq) = decodeMessages(buf, scan, 20, recordFields)
+    #
+    # the laps, their 1st record is the 1st one at or after start_time
+    (laps, lseq) = decodeMessages(buf, scan, 19, lapFields)
+    t0 = np.sort(laps['start_time'][np.isfinite(laps['start_time'])])
+    lapStart = np.searchsorted(vals['timestamp'], t0) \
+        if np.all(np.diff(vals['timestamp']) >= 0) else np.zeros(0)
+    #
+    alt = vals['enhanced_altitude']
+    m = np.isnan(alt)
+    alt[m] = vals['altitude'][m]
+    return makeTrack(vals['timestamp'] + fitEpoch,
+                     vals['position_long']*semi2deg,
+                     vals['position_lat']*semi2deg,
+                     alt, vals['heart_rate'], vals['cadence'],
+                     meta = {'format': 'fit',
+                             'lapStart': lapStart.astype(np.int64)})
+#
+# ------------------------------------------------------------------------
+# FIT's CRC-16
+crcTable = (0x0000, 0xCC01, 0xD801, 0x1400, 0xF001, 0x3C00, 0x2800, 0xE401,
+            0xA001, 0x6C00, 0x7800, 0xB401, 0x5000, 0x9C01, 0x8801, 0x4400)
+#
+def fitCRC(buf, crc = 0):
+    """
+    compute the CRC of buf, as defined by the FIT protocol
+    """
+    for b in buf:
+        tmp = crcTable[crc & 0xF]
+        crc = (crc >> 4) & 0x0FFF
+        crc = crc ^ tmp ^ crcTable[b & 0xF]
+        tmp = crcTable[crc & 0xF]
+        crc = (crc >> 4) & 0x0FFF
+        crc = crc ^ tmp ^ crcTable[(b >> 4) & 0xF]
+    return crc
+#
+# ------------------------------------------------------------------------
+# write a track as a FIT file, mostly to test readFIT()
+def writeFIT(track, fn):
+    """
+    write the raw columns of track (a columnlib.Track) as a minimal FIT
+      activity file: a file_id message, one record message per point and
+      one lap message per lap (track.meta['lapStart'])
+    """
+    n = len(track)
+    # file_id: type (0) = activity (4), time_created (4)
+    fileId = struct.pack('<BBBHB' + 'BBB'*2,
+                         0x40, 0, 0, 0, 2,
+                         0, 1, 0x00,
+                         4, 4, 0x86)
+    t0 = int(track['Time'][0]) - fitEpoch if n > 0 else 0
+    fileId += struct.pack('<BBI', 0x00, 4, t0)
+    #
+    # record definition, local type 1
+    recDef = struct.pack('<BBBHB', 0x41, 0, 0, 20, 6) + \
+        bytes([253, 4, 0x86,  0, 4, 0x85,  1, 4, 0x85,
+               2, 2, 0x84,    3, 1, 0x02,  4, 1, 0x02])
+    #
+    # all the records at once, as a structured array
+    dt = np.dtype([('h', 'u1'), ('t', '<u4'), ('lat', '<i4'), ('lon', '<i4'),
+                   ('alt', '<u2'), ('hr', 'u1'), ('cad', 'u1')])
+    rec = np.zeros(n, dtype = dt)
+    rec['h'] = 0x01
+    rec['t'] = np.round(track['Time'] - fitEpoch)
+    for (name, col) in (('lat', 'Latitude'), ('lon', 'Longitude')):
+        v = track[col]
+        rec[name] = np.where(np.isfinite(v), np.round(v/semi2deg), 0x7FFFFFFF)
+    alt = np.asarray(track['Altitude'], dtype = float)
+    rec['alt'] = np.where(np.isfinite(alt), np.round((alt+500)*5), 0xFFFF)
+    for (name, col) in (('hr', 'HeartRate'), ('cad', 'Cadence')):
+        v = track[col]
+        rec[name] = np.where(v > 0, v, 0xFF)
+    #
+    # lap definition, local type 2, and a lap per track.meta['lapStart']
+    laps = np.asarray(track.meta.get('lapStart', []), dtype = np.int64)
+    laps = laps[laps < n]
+    lapDef = struct.pack('<BBBHB', 0x42, 0, 0, 19, 2) + \
+        bytes([253, 4, 0x86,  2, 4, 0x86])
+    lap = np.zeros(laps.size, dtype = [('h', 'u1'), ('t', '<u4'),
+                                       ('t0', '<u4')])
+    lap['h']  = 0x02
+    lap['t0'] = rec['t'][laps]
+    lap['t']  = rec['t'][np.append(laps[1:], n)-1]
+    #
+    data = fileId + recDef + rec.tobytes() + lapDef + lap.tobytes()
+    header = struct.pack('<BBHI4s', 14, 0x10, 2132, len(data), b'.FIT')
+    header += struct.pack('<H', fitCRC(header))
+    crc = fitCRC(data, fitCRC(header))
+    with open(fn, 'wb') as f:
+        f.write(header + data + struct.pack('<H', crc))
@@ -0,0 +1,221 @@
+#
+# geodesy lib: vectorized distances and projections, on numpy arrays
+#  haversineDist()
+#  equirectDist()
+#  vincentyDist()
+#  stepDist()
+#  stepXY()
+#  refPoint()
+#  projectXY()
+# <- Last updated: Tue Oct 20 00:21:09 2026 -> SGK
+#
+import numpy as np
+#
+# some constants
+earthRad = 6371.0088         # mean Earth radius [km]
+wgs84A   = 6378.137          # WGS84 semi-major axis [km]
+wgs84F   = 1/298.257223563   # WGS84 flattening
+deg2rad  = np.pi/180.0
+#
+# some conversion factors
+km2mi    = 0.621371          # km to mi
+mtr2feet = 3.28084           # m to ft
+#
+# ------------------------------------------------------------------------
+# great circle distance, using the haversine formula
+def haversineDist(lon1, lat1, lon2, lat2,
+                  rad = earthRad):
+    """
+    dist = haversineDist(lon1, lat1, lon2, lat2, rad)
+      lon/lat are in degrees, can be scalars or numpy arrays
+      rad is the radius [km], can also be an array (ie w/ altitude)
+      returns the great circle distance in km
+    """
+    phi1 = np.asarray(lat1)*deg2rad
+    phi2 = np.asarray(lat2)*deg2rad
+    dPhi = phi2 - phi1
+    dLam = (np.asarray(lon2) - np.asarray(lon1))*deg2rad
+    #
+    h = np.sin(dPhi/2)**2 + np.cos(phi1)*np.cos(phi2)*np.sin(dLam/2)**2
+    # guard against round off
+    h = np.clip(h, 0.0, 1.0)
+    return 2*rad*np.arcsin(np.sqrt(h))
+#
+# ------------------------------------------------------------------------
+# equirectangular approx, good enough for short steps
+def equirectDist(lon1, lat1, lon2, lat2,
+                 rad = earthRad):
+    """
+    dist = equirectDist(lon1, lat1, lon2, lat2, rad)
+      same as haversineDist() but uses the flat (equirectangular)
+      approximation at the mean latitude: faster, fine for steps < few km
+    """
+    phiM = (np.asarray(lat1) + np.asarray(lat2))*(deg2rad/2)
+    dx = (np.asarray(lon2) - np.asarray(lon1))*deg2rad*np.cos(phiM)
+    dy = (np.asarray(lat2) - np.asarray(lat1))*deg2rad
+    return rad*np.sqrt(dx**2 + dy**2)
+#
+# ------------------------------------------------------------------------
+# distance on the WGS84 ellipsoid, Vincenty's inverse formula
+#   iterated on the whole arrays at once
+def vincentyDist(lon1, lat1, lon2, lat2,
+                 eps = 1e-12, niterx = 200):
+    """
+    dist = vincentyDist(lon1, lat1, lon2, lat2)
+      distance on the WGS84 ellipsoid in km, using Vincenty's inverse formula
+      all the points are iterated together, until all have converged to eps
+      (or niterx iterations - nearly antipodal points may not converge,
+       their haversine distance is returned instead)
+    """
+    lon1, lat1, lon2, lat2 = np.broadcast_arrays(np.asarray(lon1, dtype=float),
+                                                 np.asarray(lat1, dtype=float),
+                                                 np.asarray(lon2, dtype=float),
+                                                 np.asarray(lat2, dtype=float))
+    a = wgs84A
+    f = wgs84F
+    b = a*(1-f)
+    #
+    L  = (lon2-lon1)*deg2rad
+    U1 = np.arctan((1-f)*np.tan(lat1*deg2rad))
+    U2 = np.arctan((1-f)*np.tan(lat2*deg2rad))
+    sinU1, cosU1 = np.sin(U1), np.cos(U1)
+    sinU2, cosU2 = np.sin(U2), np.cos(U2)
+    #
+    lam  = L.copy()
+    todo = np.ones(L.shape, dtype=bool)
+    # work arrays
+    sinSig = np.zeros(L.shape)
+    cosSig = np.ones(L.shape)
+    sig    = np.zeros(L.shape)
+    cos2A  = np.ones(L.shape)
+    cos2Sm = np.zeros(L.shape)
+    #
+    niter = 0
+    while todo.any() and niter < niterx:
+        niter += 1
+        sinLam = np.sin(lam)
+        cosLam = np.cos(lam)
+        sinSig = np.sqrt((cosU2*sinLam)**2 +
+                         (cosU1*sinU2 - sinU1*cosU2*cosLam)**2)
+        cosSig = sinU1*sinU2 + cosU1*cosU2*cosLam
+        sig    = np.arctan2(sinSig, cosSig)
+        # coincident points have sinSig == 0
+        with np.errstate(invalid='ignore', divide='ignore'):
+            sinA = np.where(sinSig > 0, cosU1*cosU2*sinLam/sinSig, 0.0)
+            cos2A = 1 - sinA**2
+            # equatorial lines have cos2A == 0
+            cos2Sm = np.where(cos2A > 0,
+                              cosSig - 2*sinU1*sinU2/cos2A, 0.0)
+        C = f/16*cos2A*(4 + f*(4 - 3*cos2A))
+        lamP = L + (1-C)*f*sinA*(sig + C*sinSig*
+                                 (cos2Sm + C*cosSig*(-1 + 2*cos2Sm**2)))
+        todo = np.abs(lamP - lam) > eps
+        lam  = lamP
+    #
+    u2 = cos2A*(a**2 - b**2)/b**2
+    A  = 1 + u2/16384*(4096 + u2*(-768 + u2*(320 - 175*u2)))
+    B  = u2/1024*(256 + u2*(-128 + u2*(74 - 47*u2)))
+    dSig = B*sinSig*(cos2Sm + B/4*(cosSig*(-1 + 2*cos2Sm**2) -
+                                   B/6*cos2Sm*(-3 + 4*sinSig**2)*
+                                   (-3 + 4*cos2Sm**2)))
+    dist = b*A*(sig - dSig)
+    #
+    # not converged -> use the great circle value
+    if todo.any():
+        dist = np.where(todo, haversineDist(lon1, lat1, lon2, lat2), dist)
+    return dist
+#
+# ------------------------------------------------------------------------
+# distance between consecutive points of a track
+def stepDist(lon, lat,
+             method = 'haversine',
+             rad = earthRad):
+    """
+    dd = stepDist(lon, lat, method, rad)
+      distance [km] between consecutive points, dd[0] = 0
+      method is 'haversine', 'equirect' or 'vincenty'
+      rad can be an array (radius at each point, ie w/ altitude)
+        it is then averaged between consecutive points
+    """
+    lon = np.asarray(lon, dtype=float)
+    lat = np.asarray(lat, dtype=float)
+    dd = np.zeros(lon.size)
+    if lon.size < 2:
+        return dd
+    #
+    rad = np.asarray(rad, dtype=float)
+    if rad.ndim > 0:
+        rad = (rad[1:] + rad[:-1])/2
+    #
+    if method == 'haversine':
+        dd[1:] = haversineDist(lon[:-1], lat[:-1], lon[1:], lat[1:], rad)
+    elif method == 'equirect':
+        dd[1:] = equirectDist(lon[:-1], lat[:-1], lon[1:], lat[1:], rad)
+    elif method == 'vincenty':
+        dd[1:] = vincentyDist(lon[:-1], lat[:-1], lon[1:], lat[1:])
+    else:
+        raise ValueError('stepDist(): invalid method "'+str(method)+'"')
+    return dd
+#
+# ------------------------------------------------------------------------
+# x/y displacements between consecutive points
+def stepXY(lon, lat,
+           rad = earthRad):
+    """
+    (dx, dy) = stepXY(lon, lat, rad)
+      east/north displacement [km] between consecutive points,
+      using the local (mid-step) latitude, dx[0] = dy[0] = 0
+    """
+    lon = np.asarray(lon, dtype=float)
+    lat = np.asarray(lat, dtype=float)
+    dx = np.zeros(lon.size)
+    dy = np.zeros(lon.size)
+    if lon.size < 2:
+        return (dx, dy)
+    #
+    rad = np.asarray(rad, dtype=float)
+    if rad.ndim > 0:
+        rad = (rad[1:] + rad[:-1])/2
+    phiM = (lat[1:] + lat[:-1])*(deg2rad/2)
+    dx[1:] = rad*np.cos(phiM)*np.diff(lon)*deg2rad
+    dy[1:] = rad*np.diff(lat)*deg2rad
+    return (dx, dy)
+#
+# ------------------------------------------------------------------------
+# reference location of a ride
+def refPoint(lon, lat):
+    """
+    (lonRef, latRef) = refPoint(lon, lat)
+      center of the bounding box of the valid points
+    """
+    lon = np.asarray(lon, dtype=float)
+    lat = np.asarray(lat, dtype=float)
+    m = np.isfinite(lon) & np.isfinite(lat)
+    if not m.any():
+        return (0.0, 0.0)
+    lonRef = (lon[m].min() + lon[m].max())/2
+    latRef = (lat[m].min() + lat[m].max())/2
+    return (float(lonRef), float(latRef))
+#
+# ------------------------------------------------------------------------
+# project lon/lat to a local x/y plane
+def projectXY(lon, lat,
+              lonRef = None,
+              latRef = None,
+              rad = earthRad):
+    """
+    (x, y) = projectXY(lon, lat, lonRef, latRef, rad)
+      equirectangular projection [km] about (lonRef, latRef)
+      if lonRef/latRef are None, use refPoint(lon, lat), ie the ride's center
+      x is along the parallel at latRef, y along the meridian
+    """
+    lon = np.asarray(lon, dtype=float)
+    lat = np.asarray(lat, dtype=float)
+    if (lonRef is None) or (latRef is None):
+        (lon0, lat0) = refPoint(lon, lat)
+        lonRef = lon0 if lonRef is None else lonRef
+        latRef = lat0 if latRef is None else latRef
+    #
+    x = rad*np.cos(latRef*deg2rad)*(lon - lonRef)*deg2rad
+    y = rad*(lat - latRef)*deg2rad
+    return (x, y)
@@ -1,7 +1,7 @@
 #
 # simple routine using gmplot to create an html to overplot on google map
 #   mkGMap()
-# <- Last updated: Sat May  1 16:51:29 2021 -> SGK
+# <- Last updated: Mon Oct 19 22:41:27 2026 -> SGK
 #
 import os
 import numpy as np
@@ -10,40 +10,30 @@ from utilslib import formatTime
 #
 # ------------------------------------------------------------------------
 # create an html to overplot on google map, using gmplot
-def mkGMap(data, infos, stats,
-           color = 'red', velMin = 6.0):
+def mkGMap(ride, stats,
+           color = 'red', velMin = 6.0,
+           htmlFile = 'gmap.html'):
     """
-    create an hmlt file to overplot route on a Google Map
-      using gmplot module
+    create an hmlt file (htmlFile) to overplot route on a Google Map
+      using gmplot module, ride and stats are from processTrack()
     """
     #
-    # decode infos -> index[] and units[]
-    nCols, nLines = data.shape
-    index = {}
-    units = {}
-    i = 0
-    for wx in infos.split():
-        w = wx.split(':')
-        index[w[0]] = i
-        units[w[0]] = w[1]
-        i += 1
+    # lon -> values
+    lon  = ride['Longitude']
+    mLon = np.isfinite(lon)
+    lonList = lon[mLon]
     #
-    # lon index -> values
-    ix = index['Longitude']
-    mLon = np.isfinite(data[ix, :])
-    lonList = data[ix, mLon]
-    #
-    # lat index -> values
-    ix = index['Latitude']
-    mLat = np.isfinite(data[ix, :])
-    latList = data[ix, mLat]
+    # lat -> values
+    lat  = ride['Latitude']
+    mLat = np.isfinite(lat)
+    latList = lat[mLat]
     #
     # get center and borders
-    latCntr = sum(latList)/sum(mLat)
-    lonCntr = sum(lonList)/sum(mLon)
+    latCntr = latList.mean()
+    lonCntr = lonList.mean()
     #
-    (north, south) = (max(latList),  min(latList))
-    (east,  west)  = (max(lonList),  min(lonList))
+    (north, south) = (latList.max(), latList.min())
+    (east,  west)  = (lonList.max(), lonList.min())
     #
     # widens and shift east by 20%
     dlon = (east-west)*.2
@@ -96,8 +86,8 @@ def mkGMap(data, infos, stats,
                          stats['avgHeartRate'], stats['maxHeartRate'])
     #
     # location of text
-    lat = max(latList)
-    lon = max(lonList)+0.075
+    lat = latList.max()
+    lon = lonList.max()+0.075
     #
     # must write one string at a time, \n not allowed
     for s in str.split('\n'):
@@ -109,7 +99,7 @@ def mkGMap(data, infos, stats,
         lat -= .009
     #
     # Pass the file path of the html
-    gmap.draw( "gmap.html" )
+    gmap.draw( htmlFile )
     #
-    print('Load \'gmap.html\' in a browser, ' + \
+    print('Load \''+htmlFile+'\' in a browser, ' + \
           'map is centered on {:.4f},{:.4f}'.format(latCntr, lonCntr))
@@ -0,0 +1,284 @@
+#
+# model lib: velocity vs grade models of a corpus of rides, from their
+#  2D histograms
+#  rideHist()
+#  storeHist()
+#  loadHists()
+#  windowSums()
+#  histSums()
+#  histProfiles()
+#  modelCorpus()
+#  printModel()
+# <- Last updated: Tue Oct 20 07:21:48 2026 -> SGK
+#
+# each ride's located (grade, velocity) pts are binned once in a 2D
+# histogram, kept w/ the ride's columns (gradeHist.npy), and the corpus'
+# histograms are stacked, in the order the rides started, in gradeHists.npy,
+# only the rides stored again are re-read; the sums of the rolling windows
+# of rides are differences of their cumulative sum over the rides: the
+# straight line fit (same as doPlot()'s dlsq_fit(), w/ each pt at its
+# bin's center) needs only 5 sums per histogram, and the profile (the
+# median velocity in each grade bin) the histogram summed over velocity,
+# both add up, so they are computed per ride, merged per window, and all
+# the rides and windows are solved at once; the time is in merging the
+# histograms, not in the fits
+#
+import os, json, time
+import numpy as np
+import pandas as pd
+#
+from statslib  import MaskCache
+from storelib  import Corpus, writeFile, rideFileName
+from reportlib import fitLines
+#
+# the bins: 0.5% of grade (centered on 0), 0.5 mph of velocity
+gradeEdges = np.arange(-15.25, 15.26, 0.5)
+velEdges   = np.arange(0.0, 60.01, 0.5)
+gradeBins  = (gradeEdges[1:] + gradeEdges[:-1])/2
+velBins    = (velEdges[1:] + velEdges[:-1])/2
+#
+# a ride's histogram, and the corpus' stacked ones w/ their index
+histName  = 'gradeHist.npy'
+stackName = 'gradeHists.npy'
+stackIndex = 'gradeHists.json'
+#
+# the window, no. of rides, and the min no. of pts of a profile's bin
+modelWindow  = 20
+profileMin   = 30
+profileGrades = (-6.0, -3.0, 0.0, 3.0, 6.0)
+#
+# ------------------------------------------------------------------------
+# a ride's 2D histogram
+def rideHist(ride, opts):
+    """
+    hist = rideHist(ride, opts)
+      ride - a processed ride, see tracklib.processTrack()
+      opts - dict w/ velMin, velMax, hrMin, cadMin
+      hist - int32 array (gradeBins.size, velBins.size), the no. of
+             located pts in each (grade, velocity) bin, the pts beyond the
+             edges are counted in the edge bins
+    """
+    masks = MaskCache(ride, opts)
+    (g, v) = (ride['Grade'], ride['Velocity'])
+    m = masks('located') & np.isfinite(g) & np.isfinite(v)
+    dg = gradeEdges[1] - gradeEdges[0]
+    dv = velEdges[1] - velEdges[0]
+    ig = np.clip(((g[m] - gradeEdges[0])/dg).astype(np.int64),
+                 0, gradeBins.size-1)
+    iv = np.clip(((v[m] - velEdges[0])/dv).astype(np.int64),
+                 0, velBins.size-1)
+    hist = np.bincount(ig*velBins.size + iv,
+                       minlength = gradeBins.size*velBins.size)
+    return hist.reshape(gradeBins.size, velBins.size).astype(np.int32)
+#
+# ------------------------------------------------------------------------
+# save a ride's histogram, w/ its columns
+def storeHist(hist, dirName, name):
+    """
+    storeHist(hist, dirName, name)
+      save the histogram of the ride name in the corpus in dirName
+    """
+    rideDir = os.path.join(dirName, name)
+    os.makedirs(rideDir, exist_ok = True)
+    writeFile(os.path.join(rideDir, histName),
+              lambda f: np.save(f, hist), 'wb')
+#
+# ------------------------------------------------------------------------
+# the corpus' histograms, stacked
+def loadHists(corpus, opts):
+    """
+    (names, hists) = loadHists(corpus, opts)
+      corpus - a storelib.Corpus
+      names  - its rides, in the order they started
+      hists  - array (len(names), gradeBins.size, velBins.size)
+    the stack is saved in the corpus, and only the rides whose ride.json
+    changed since are read again; the histogram of a ride stored w/out
+    one is computed from its columns, and saved
+    """
+    dirName = corpus.dirName
+    names = sorted(corpus.names,
+                   key = lambda n: (corpus.stats(n).get('startEpoch', 0.0),
+                                    corpus.stats(n)['startTime']))
+    stamps = [os.stat(os.path.join(dirName, n, rideFileName)).st_mtime_ns
+              for n in names]
+    #
+    # the stack saved, and its index {name: [row, stamp]}
+    (index, stack) = ({}, None)
+    (fn, stackFile) = (os.path.join(dirName, stackIndex),
+                       os.path.join(dirName, stackName))
+    if os.path.exists(fn) and os.path.exists(stackFile):
+        with open(fn) as f:
+            index = json.load(f)
+        stack = np.load(stackFile, mmap_mode = 'r')
+    if [index.get(n, [None, None]) for n in names] == \
+       [[i, s] for (i, s) in enumerate(stamps)]:
+        return (names, stack)
+    #
+    hists = np.empty((len(names), gradeBins.size, velBins.size),
+                     dtype = np.int32)
+    for (i, (name, stamp)) in enumerate(zip(names, stamps)):
+        if index.get(name, [None, None])[1] == stamp:
+            hists[i] = stack[index[name][0]]
+            continue
+        histFile = os.path.join(dirName, name, histName)
+        if os.path.exists(histFile):
+            hists[i] = np.load(histFile)
+        else:
+            hists[i] = rideHist(corpus[name], opts)
+            storeHist(hists[i], dirName, name)
+    #
+    writeFile(stackFile, lambda f: np.save(f, hists), 'wb')
+    writeFile(fn, lambda f: json.dump(dict([(n, [i, s]) for (i, (n, s)) in
+                                            enumerate(zip(names, stamps))]),
+                                      f))
+    return (names, hists)
+#
+# ------------------------------------------------------------------------
+# the sums over the rolling windows
+def windowSums(x, window):
+    """
+    wx = windowSums(x, window)
+      x  - array (n, ...) of counts (or sums), ie of n rides
+      wx - array (n-window+1, ...), wx[k] is the sum of x[k:k+window],
+           empty if n < window
+    """
+    n = len(x)
+    if window < 1 or n < window:
+        return np.zeros((0, ) + x.shape[1:], dtype = x.dtype)
+    cum = np.zeros((n+1, ) + x.shape[1:], dtype = x.dtype)
+    np.cumsum(x, axis = 0, out = cum[1:])
+    return cum[window:] - cum[:-window]
+#
+# ------------------------------------------------------------------------
+# the sums of a straight line fit, of histograms
+def histSums(hists):
+    """
+    sums = histSums(hists)
+      hists - array (..., gradeBins.size, velBins.size)
+      sums  - array (..., 5), reportlib's fitSums of each histogram's pts,
+              at their bins' centers, the fits are reportlib.fitLines(sums)
+    """
+    hists = np.asarray(hists)
+    hg = hists.sum(axis = -1, dtype = np.float64)
+    hv = hists.sum(axis = -2, dtype = np.float64)
+    gv = hists.astype(np.float64) @ velBins
+    return np.stack((hg.sum(axis = -1),
+                     hg @ gradeBins,
+                     hv @ velBins,
+                     hg @ gradeBins**2,
+                     gv @ gradeBins), axis = -1)
+#
+# ------------------------------------------------------------------------
+# velocity profiles, of histograms
+def histProfiles(cum,
+                 minPts = profileMin):
+    """
+    profiles = histProfiles(cum, minPts)
+      cum      - array (..., gradeBins.size, velBins.size), histograms
+                 summed over velocity, ie np.cumsum(hists, axis = -1)
+      profiles - array (..., gradeBins.size), the median velocity [mph] in
+                 each grade bin (interpolated in its velocity bin), NaN
+                 for the bins w/ less than minPts pts
+    """
+    n = cum[..., -1]
+    half = n/2.0
+    k = np.argmax(cum >= half[..., None], axis = -1)
+    upTo = np.take_along_axis(cum, k[..., None], axis = -1)[..., 0]
+    below = np.take_along_axis(cum, np.maximum(k-1, 0)[..., None],
+                               axis = -1)[..., 0]
+    below = np.where(k > 0, below, 0)
+    dv = velEdges[1] - velEdges[0]
+    with np.errstate(invalid = 'ignore', divide = 'ignore'):
+        profiles = velEdges[k] + dv*(half - below)/(upTo - below)
+    return np.where(n >= max(minPts, 1), profiles, np.nan)
+#
+# ------------------------------------------------------------------------
+# model the corpus
+def modelCorpus(corpusDir, opts,
+                window = modelWindow,
+                silent = False):
+    """
+    model = modelCorpus(corpusDir, opts, window)
+      corpusDir - a corpus of processed rides (see storelib.py), ie
+                  -store's or -batch's rides/
+      opts      - dict w/ velMin, velMax, hrMin, cadMin
+      window    - the no. of rides of the rolling windows
+      model     - {'rides':    data frame, one row per ride in the order
+                               they started: startTime, pts, vel0 [mph],
+                               mph10 [mph/10%] of the ride's fit, and
+                               wVel0, wMph10 of the window ending w/ it,
+                   'profiles': array (rides, gradeBins.size) of the
+                               rides' profiles, see histProfiles(),
+                   'wProfiles': same, of the windows, NaN for the rides
+                               before the 1st full window,
+                   'window':   window}
+    """
+    t0 = time.perf_counter()
+    corpus = Corpus(corpusDir)
+    if len(corpus) == 0:
+        raise ValueError('modelCorpus(): no rides in '+corpusDir)
+    (names, hists) = loadHists(corpus, opts)
+    t1 = time.perf_counter()
+    #
+    # per ride, then merged per window; int32 counts unless too many pts
+    sums = histSums(hists)
+    dtype = np.int32 if sums[:, 0].sum() < 2**31 else np.int64
+    cum = np.cumsum(hists, axis = -1, dtype = dtype)
+    wCum = windowSums(cum, window)
+    t2 = time.perf_counter()
+    #
+    # the rides and the windows, in one call
+    nWins = len(wCum)
+    (c0, c1) = fitLines(np.concatenate((sums, windowSums(sums, window))))
+    (c0, w0, c1, w1) = (c0[:len(names)], c0[len(names):],
+                        c1[:len(names)], c1[len(names):])
+    profiles = histProfiles(cum)
+    wProfiles = histProfiles(wCum)
+    #
+    # the windows, aligned on the ride they end w/
+    skip = len(names) - nWins
+    pad = np.full(skip, np.nan)
+    df = pd.DataFrame({'startTime': [corpus.stats(n)['startTime']
+                                     for n in names],
+                       'pts':       sums[:, 0].astype(np.int64),
+                       'vel0':      c0,
+                       'mph10':     c1*10,
+                       'wVel0':     np.concatenate((pad, w0)),
+                       'wMph10':    np.concatenate((pad, w1*10))},
+                      index = names)
+    wProfiles = np.concatenate((np.full((skip, gradeBins.size), np.nan),
+                                wProfiles))
+    t3 = time.perf_counter()
+    if not silent:
+        print(('model: {} rides, {} windows of {}, in {:.2f} s ' +
+               '(load {:.2f} s, merge {:.2f} s, fits {:.2f} s)').
+              format(len(names), nWins, window, t3-t0, t1-t0, t2-t1,
+                     t3-t2))
+    return {'rides':     df,
+            'profiles':  profiles,
+            'wProfiles': wProfiles,
+            'window':    window}
+#
+# ------------------------------------------------------------------------
+# print the model
+def printModel(model,
+               grades = profileGrades):
+    """
+    printModel(model, grades)
+      one line per ride: its fit, the fit of the window ending w/ it and
+      that window's profile at the grades [%]
+    """
+    df = model['rides']
+    cols = [int(np.argmin(np.abs(gradeBins - g))) for g in grades]
+    print(('{:24s} {:>19s} {:>7s} {:>6s} {:>7s} {:>6s} {:>8s} ' +
+           ' '.join(['{:>6s}']*len(cols))).
+          format('ride', 'start', 'pts', 'vel0', 'mph/10', 'w vel0',
+                 'w mph/10', *['{:+g}%'.format(gradeBins[k]) for k in cols]))
+    for (i, (name, row)) in enumerate(df.iterrows()):
+        print(('{:24s} {:>19s} {:7d} {:6.1f} {:7.1f} {:6.1f} {:8.1f}' +
+               ''.join([' {:6.1f}']*len(cols))).
+              format(name[:24], row['startTime'][:19], int(row['pts']),
+                     row['vel0'], row['mph10'], row['wVel0'],
+                     row['wMph10'], *model['wProfiles'][i, cols]))
+    print('{} rides, windows of {} rides, {} pts'.
+          format(len(df), model['window'], int(df['pts'].sum())))
@@ -1,11 +1,13 @@
 #
 # plot the track and its properties
+#  readGMapImage()
 #  getGMapImage()
 #  doPlot()
-# <- Last updated: Sat May  1 17:11:20 2021 -> SGK
+# <- Last updated: Tue Oct 20 07:02:03 2026 -> SGK
 #
+import os
+from functools import lru_cache
 import numpy as np
-from math import cos,sin,atan,pi,sqrt
 #
 import matplotlib.pyplot as plt
 from matplotlib.ticker import FuncFormatter
@@ -13,6 +15,39 @@ from matplotlib.ticker import FuncFormatter
 # extra function from my .py files
 from utilslib import formatTime, formatTimeLabels, putID, saveFig
 from dlsq_fit import dlsq_fit
+from geolib   import projectXY, km2mi
+from statslib import MaskCache
+#
+# the map images are next to this file, not in the current directory
+#  (ie serve-tcx.py or -watch started elsewhere)
+mapDir = os.path.dirname(os.path.abspath(__file__))
+#
+# ------------------------------------------------------------------------
+# read the Google Map image, once: it is cached
+@lru_cache(maxsize = None)
+def readGMapImage(useRoad):
+    """
+    (gmapImage, xcut, ytrm) = readGMapImage(useRoad)
+      read gmap-road.jpg (useRoad True) or gmap-satellite.jpg, in mapDir,
+      and cut/trim it to remove ugly bits from the screen shot,
+      xcut, ytrm: how it was trimmed, to correct pixel positions
+    the result is cached (and read-only), so a long running process
+    decodes each image only once
+    """
+    if useRoad:
+        gmapImage = plt.imread(os.path.join(mapDir, "gmap-road.jpg"))
+    else:
+        gmapImage = plt.imread(os.path.join(mapDir, "gmap-satellite.jpg"))
+    #
+    # cut/trim this image to remove ugly bits from the screen shot
+    (h, w, d)    = gmapImage.shape
+    (xcut, xtrm) = ( 0, 0)
+    (ycut, ytrm) = (65, 0)
+    xmax  = w-xtrm
+    ymax  = h-ytrm
+    gmapImage = gmapImage[ycut:ymax, xcut:xmax, :]
+    gmapImage.flags.writeable = False
+    return (gmapImage, xcut, ytrm)
 #
 # ------------------------------------------------------------------------
 # get the Google Map image
@@ -23,10 +58,11 @@ def getGMapImage(useRoad,
     """
     read a screen shot of a google map and return it as an image
       plus the bounding box of the image in miles wrt to a ref lat/lon
+      (the same ref used by processTrack(), ie stats['lonRef/latRef'])
 
       useRoad is True then read gmap-road.jpg
                  False          gmap-satellite.jpg
-       both jpg must be in the cwd
+       both jpg must be in mapDir, next to plottrack.py
 
     I saved such a pair of images using a screen shot of google map, 
       and calibrated it to get lon/lat at two positions
@@ -44,14 +80,12 @@ def getGMapImage(useRoad,
     #
     if useRoad:
         ## 1510 x 864, x/y pos of two markers
-        gmapImage = plt.imread("gmap-road.jpg")
         (xps1, yps1) = ( 132.5, 740.5)
         (xps2, yps2) = (1326.5, 117.5)
         marker = '.b'
         color = 'red'
     else:
         ## 1514 x 867, x/y pos of two markers
-        gmapImage = plt.imread("gmap-satellite.jpg")
         (xps1, yps1) = ( 132.5, 740.5+4)
         (xps2, yps2) = (1326.5, 117.5+4)
         marker = '.y'
@@ -61,34 +95,19 @@ def getGMapImage(useRoad,
     (lat1, lon1) = (42.523128, -71.579051)
     (lat2, lon2) = (42.365291, -71.169124)
     #
-    # cut/trim this image to remove ugly bits from the screen shot
-    (h, w, d)    = gmapImage.shape
-    (xcut, xtrm) = ( 0, 0)
-    (ycut, ytrm) = (65, 0)
+    # the trimmed image, and the trimming of the markers' positions
+    (gmapImage, xcut, ytrm) = readGMapImage(useRoad)
     xps1 -= xcut
     xps2 -= xcut
     yps1 -= ytrm
     yps2 -= ytrm
-    xmax  = w-xtrm
-    ymax  = h-ytrm
-    gmapImage = gmapImage[ycut:ymax, xcut:xmax, :]
     (imageHeight, imageWidth, imageDepth) = gmapImage.shape
     #
-    # conversion factors
-    deg2rad  = pi/180.0
-    km2mi    = 0.621371  # km to mi
-    #
-    # convert to miles
-    earthRad = 6367.449  # km
-    earthRad *= km2mi    # mi
-    # some simple spherical trig
-    earthRho = earthRad*cos(latRef*deg2rad)
-    #
-    xVal1 = earthRho*atan((lon1-lonRef)*deg2rad)
-    yVal1 = earthRad*atan((lat1-latRef)*deg2rad)
-    #
-    xVal2 = earthRho*atan((lon2-lonRef)*deg2rad)
-    yVal2 = earthRad*atan((lat2-latRef)*deg2rad)
+    # project the markers the same way the ride is, in miles
+    (xVal, yVal) = projectXY(np.array([lon1, lon2]), np.array([lat1, lat2]),
+                             lonRef, latRef)
+    (xVal1, xVal2) = xVal*km2mi
+    (yVal1, yVal2) = yVal*km2mi
     #
     # get the x scaling xV = xOff + xScl * xP
     xScl = (xVal2-xVal1)/(xps2-xps1)
@@ -109,7 +128,7 @@ def getGMapImage(useRoad,
 #
 # ------------------------------------------------------------------------
 # plot the track
-def doPlot(data, infos, stats,
+def doPlot(ride, stats,
            plotType = 'pdf',      # type of plot
            noRoute  = False,      # don't show route
            useRoad  = False,      # overplot on road or satellite image
@@ -117,9 +136,11 @@ def doPlot(data, infos, stats,
            plotSize = (12, 8),    # size of plot windows
            velMin   = 6.0,        # define when moving etc
            velMax   = 100.0,
-           cadMin   = 50):
+           cadMin   = 50,
+           tag      = '',          # added to the saved files name
+           outDir   = ''):         # where to save them
     """
-    plot the data
+    plot the ride, as returned by processTrack() w/ its stats
       fig1: route on top of a map or using google map -> html
       fig2: ride properties vs time or distance
 
@@ -131,18 +152,11 @@ def doPlot(data, infos, stats,
       velMin       define when moving, etc
       velMax       
       cadMin   
+      tag          added to the names of the saved files, ie route-tag
+      outDir       directory where to save them (cwd if '')
     """
     #
-    # decode infos -> index[] and units[]
-    nCols, nLines = data.shape
-    index = {}
-    units = {}
-    i = 0
-    for wx in infos.split():
-        w = wx.split(':')
-        index[w[0]] = i
-        units[w[0]] = w[1]
-        i += 1
+    units = ride.units
     #
     # get the stats
     avgMVel = stats['avgMVel']
@@ -153,23 +167,12 @@ def doPlot(data, infos, stats,
     maxCad  = stats['maxCadence']
     #
     # find the max(running mean moving velocity)
-    ix = index['MeanMVel']
-    mxxVel = max(data[ix, :])
-    #
-    # reject NaN postn values
-    ix = index['XPosition']
-    iy = index['YPosition']
-    mask1 = np.logical_not(np.isnan(data[ix, :]))
-    mask2 = np.logical_not(np.isnan(data[iy, :]))
-    mask0 = mask1 & mask2
+    mxxVel = ride['MeanMVel'].max()
     #
-    # reject velocities outside [velMin, velMax]
-    iv = index['Velocity']
-    mask1 = data[iv, :] > velMin
-    mask2 = data[iv, :] < velMax
-    #
-    # final mask
-    mask = mask0 & mask1 & mask2 ## & mask3
+    # reject NaN postn values and velocities outside [velMin, velMax]
+    masks = MaskCache(ride, {'velMin': velMin, 'velMax': velMax,
+                             'cadMin': cadMin})
+    mask = masks('located')
     #
     fmtStr = 'Started {}\n' + \
         'Time total {}, moving {}, paused {}\n' + \
@@ -187,15 +190,15 @@ def doPlot(data, infos, stats,
         fig1 = plt.figure(figsize = plotSize)
         #
         # get x/y position arrays of the ride
-        ix = index['XPosition']
-        iy = index['YPosition']
-        xPos = data[ix, mask]
-        yPos = data[iy, mask]
+        xPos = ride['XPosition'][mask]
+        yPos = ride['YPosition'][mask]
         #
         # get the Google map and its bounding box (in miles)
         #  plus which marker and color to use
         (gmapImage, xMin, xMax, yMin, yMax, \
-         marker, color) = getGMapImage(useRoad)
+         marker, color) = getGMapImage(useRoad,
+                                       lonRef = stats['lonRef'],
+                                       latRef = stats['latRef'])
         #
         # display the image
         plt.imshow(gmapImage, extent=[xMin, xMax, yMin, yMax])
@@ -243,22 +246,25 @@ def doPlot(data, infos, stats,
     for p in plotList.split():
         v = p.split('-')
         #
-        # index for variables
-        ix = index[v[0]]
-        iy = index[v[1]]
+        # the variables
+        x = ride[v[0]]
+        y = ride[v[1]]
         #
         # set the subplot on a 3x2 grid
         ax = plt.subplot(3, 2, k)
         #
         # do not plot low cadence values
         if (v[1] == 'Cadence'):
-            m = data[iy, :] > cadMin
-            m = m & mask
+            m = masks('cadence') & mask
         else:
             m = mask
         #
         # plot the data, using small dot (pixel) as marker
-        ax.plot(data[ix, m], data[iy, m], ',')
+        ax.plot(x[m], y[m], ',')
+        #
+        # and the smoothed altitude, w/ its gain
+        if (v[1] == 'Altitude'):
+            plt.plot(x[m], ride['SmoothAltitude'][m], color='g')
         #
         # if vs time, use my tick labels
         #  and set the x-label
@@ -275,23 +281,26 @@ def doPlot(data, infos, stats,
         # set xp/yp as min/max of x/y
         xp = np.empty(2)
         yp = np.empty(2)
-        xp[0] = min(data[ix, mask])
-        xp[1] = max(data[ix, mask])
+        #  (of all the pts if none are valid)
+        xv = x[mask] if mask.any() else x
+        xp[0] = np.nanmin(xv)
+        xp[1] = np.nanmax(xv)
         #
         # add'l stuff depending on which var is being plotted
         if (v[0] == 'Grade'):
             #
-            # if plot vs grade, add a linear fit
-            (n, c) = dlsq_fit(data[ix, m], data[iy, m])
-            yp[0] = c[0] + c[1]*xp[0]
-            yp[1] = c[0] + c[1]*xp[1]
-            # draw the lin fit, w/ a green dot-dashed line
-            plt.plot(xp, yp, '-.g')
-            #
-            # where to put text, assume v[1] is velocity
-            xx = xp[0]
-            yy = min(data[iy, m])
-            plt.text(xx, yy, '{:.1f} mph/10%'.format(c[1]*10),color='g')
+            # if plot vs grade, add a linear fit (if enough pts)
+            if m.sum() > 1:
+                (n, c) = dlsq_fit(x[m], y[m])
+                yp[0] = c[0] + c[1]*xp[0]
+                yp[1] = c[0] + c[1]*xp[1]
+                # draw the lin fit, w/ a green dot-dashed line
+                plt.plot(xp, yp, '-.g')
+                #
+                # where to put text, assume v[1] is velocity
+                xx = xp[0]
+                yy = y[m].min()
+                plt.text(xx, yy, '{:.1f} mph/10%'.format(c[1]*10),color='g')
         #
         else:
             if (v[1] == 'Velocity'):
@@ -301,9 +310,7 @@ def doPlot(data, infos, stats,
                 yp[1] = avgMVel 
                 plt.plot(xp, yp, '-.r')
                 # draw the up-to-then mean moving velocity, in green
-                ix = index[v[0]]
-                iy = index['MeanMVel']
-                plt.plot(data[ix, mask], data[iy, mask], color='g')
+                plt.plot(x[mask], ride['MeanMVel'][mask], color='g')
                 #
                 # add the avg mvg vel, max(mean mvg vel) and max(vel)
                 #   in red, green and blue
@@ -318,6 +325,15 @@ def doPlot(data, infos, stats,
                 yy = mxxVel+1
                 plt.text(xx, yy, '{:.1f}'.format(mxxVel), color = 'g')
                 #
+            if (v[1] == 'Altitude'):
+                #
+                # add the gain/loss in green
+                xx = xp[0]
+                yy = np.nanmax(y)
+                plt.text(xx, yy, '+{:.0f} -{:.0f} ft'.format(
+                    stats['elevGain'], stats['elevLoss']),
+                         color = 'g', va = 'top')
+                #
             if (v[1] == 'HeartRate'):
                 #
                 # draw line at avg HR 
@@ -355,8 +371,8 @@ def doPlot(data, infos, stats,
     #
     # done, add the string str to last frame
     #  alignmt is va == vert aligmt set to 'top'
-    xx = min(data[ix, mask])
-    yy = max(data[iy, mask])
+    xx = xp[0]
+    yy = np.nanmax(y[mask] if mask.any() else y)
     plt.text(xx, yy, str, fontsize = 6, va = 'top')
     #
     # use tight layout
@@ -371,5 +387,7 @@ def doPlot(data, infos, stats,
         putID(plt)
         # save them to two files (unless noRoute == True)
         if not noRoute:
-            saveFig(fig1, plotType, name='route')
-        saveFig(fig2, plotType, name='stats')
+            saveFig(fig1, plotType, name=os.path.join(outDir, 'route'+tag))
+            plt.close(fig1)
+        saveFig(fig2, plotType, name=os.path.join(outDir, 'stats'+tag))
+        plt.close(fig2)
@@ -4,29 +4,234 @@
 #   put them in a two separate figure
 #   handle missing cadence and missing HR 
 #   gmap: get apikey from $APIKEY
+#   reads TCX, GPX or FIT files, compressed or not,
+#     or zip/tar archives of them (processes every ride)
 #
-# <- Last updated: Sun May  2 15:04:47 2021 -> SGK
+#   -follow: process a TCX file as it is written
+#   -watch:  process the files dropped in a directory, w/out exiting,
+#            so the modules are imported and the maps read only once
+#   -zones:  log the time in HR, cadence... zones, w/ weekly... totals
+#            (-hrzones: the rider's HR zones)
+#   -splits: per lap, mile or km splits
+#   -climbs: the climbs, from the smoothed altitude
+#   -clean:  remove or correct the bad GPS pts before processing,
+#            -kalman to also smooth the positions
+#   -store:  save the processed rides in a corpus directory, as columns
+#            that can be memory-mapped, see storelib.py
+#   -batch:  process a directory of track files, redo only what changed
+#            since the last run, and print the summary table; each file
+#            and ride is run in a worker (-timeout, -maxmem), the ones
+#            that fail are quarantined, and an interrupted run resumes
+#   -dedup:  skip the rides seen before (ie from another source), w/ an
+#            index of their fingerprints, see duplib.py
+#   -view:   interactive viewer, w/ linked cursors and zoom, see viewlib.py
+#   -replay: render a replay video of the ride, see replaylib.py
+#   -tz:     the rides' time zone, by default the zone where each one
+#            started (w/ timezonefinder, if installed), w/ its DST rules
+#            (see tzlib.py)
+#   -report: a season report (PDF or HTML) of the rides in the -batch or
+#            -store corpus, from their stats, see reportlib.py
+#   -model:  velocity vs grade fits and profiles of each ride and of
+#            rolling windows of rides in the -batch or -store corpus,
+#            from their 2D histograms, see modellib.py
+#
+# <- Last updated: Tue Oct 20 06:52:10 2026 -> SGK
+#
+# check that we're running v3.9 or later, before the imports that need it
+#  (zoneinfo and importlib.resources.files(), see tzlib.py)
+import sys
+MIN_PYTHON = (3, 9)
+if sys.version_info < MIN_PYTHON:
+    sys.exit("Python %s.%s or later is required." % MIN_PYTHON)
 #
 # this allows matplotlib to plot to file when there is no display 
-import os, matplotlib
+import os, json, matplotlib
 if (os.environ.get('DISPLAY','') == '') and (os.environ.get('OS') != 'Windows_NT'):
     matplotlib.use('PDF')
 #
 # load needed functions from other .py files
 from argslib   import initOpts, parseArgs
-from tracklib  import readTrack, processTrack
+from tracklib  import readTracks, processTrack, followTrack
 from mkgmap    import mkGMap
 from plottrack import doPlot
+from watchlib  import watchDir
+from zonelib   import zonesFor, zoneTimes, printZones, periodKeys, ZoneLog
+from splitlib  import splitBounds, splitStats, printSplits
+from elevlib   import findClimbs, printClimbs
+from cleanlib  import cleanTrack, printCleaning
+from storelib  import storeRide, indexCorpus
+from batchlib  import runBatch
+from duplib    import fingerprint, DupIndex
+from reportlib import rideSummary, seasonReport
+from modellib  import rideHist, storeHist, modelCorpus, printModel
+from geolib    import km2mi, mtr2feet
 #
 # ------------------------------------------------------------------------
+# read and process each ride in a file
+def processTracks(fileName, opts,
+                  tagAll = False,
+                  dups   = None):
+    """
+    for (ride, stats, tag) in processTracks(fileName, opts, tagAll, dups):
+      tag is '-'+the ride's name for the rides in an archive, 
+        or if tagAll is True, '' otherwise
+      the rides in dups (the opts['dedup'] DupIndex, opened once) under
+        another name are skipped, the new ones are added, not saved
+    """
+    for track in readTracks(fileName,
+                            silent = opts['useTable'],
+                            fast   = opts['fast'],
+                            nProcs = opts['nProcs']):
+        #
+        # tag the outputs w/ the ride name if from an archive
+        name = track.meta['fileName']
+        if tagAll or name.startswith(fileName+'/'):
+            tag = '-'+os.path.basename(name).split('.')[0]
+        else:
+            tag = ''
+        #
+        # skip the rides already seen
+        if dups is not None:
+            fp = fingerprint(track)
+            same = dups.check(fp, name)
+            if same:
+                if not opts['useTable']:
+                    print('skipping', name, '(same ride as', same[0]+')')
+                continue
+            dups.add(name, fp)
+        #
+        # remove or correct the bad GPS pts
+        if opts['clean']:
+            (track, report) = cleanTrack(track, maxSpeed = opts['velMax'],
+                                         kalman   = opts['kalman'])
+            if not opts['useTable']:
+                printCleaning(report)
+        #
+        # process the track, returns the processed ride
+        # (a columnlib.Track) and the stats 
+        (ride, stats) = processTrack(track,
+                                     useTable = opts['useTable'],
+                                     velMin   = opts['velMin'],
+                                     velMax   = opts['velMax'],
+                                     grdMax   = opts['grdMax'],
+                                     cadMin   = opts['cadMin'],
+                                     hrMin    = opts['hrMin'],
+                                     zone     = opts['tz'] or None,
+                                     silent   = opts['useTable'])
+        stats['fileName'] = name
+        if opts['clean']:
+            stats['cleaning'] = dict([(key, len(v)) if type(v) is list
+                                      else (key, v)
+                                      for (key, v) in report.items()])
+        yield (ride, stats, tag)
 #
-if __name__ == '__main__':
+# ------------------------------------------------------------------------
+# produce the outputs of a ride
+def saveOutputs(ride, stats, tag, opts):
+    """
+    make the gmap html or the plots, and the replay, as per opts,
+      in opts['outDir'], whose names end w/ tag
+    when watching a directory, the stats are saved as stats-tag.json
+    """
+    outDir = opts['outDir']
+    #
+    # overlay on a Google map
+    if (opts['plotType'] == 'gmap'):
+        mkGMap(ride, stats, velMin = opts['velMin'],
+               htmlFile = os.path.join(outDir, 'gmap'+tag+'.html'))
+    #
+    # or view it
+    elif (opts['plotType'] == 'view'):
+        from viewlib import viewRide
+        viewRide(ride, stats,
+                 useRoad  = opts['useRoad'],  plotVS = opts['plotVS'],
+                 velMin   = opts['velMin'],   velMax = opts['velMax'],
+                 cadMin   = opts['cadMin'],   plotSize = opts['plotSize'])
+    #
+    # or generate plots
+    elif (opts['plotType'] != '-'):
+        doPlot(ride, stats,
+               plotType = opts['plotType'],
+               useRoad  = opts['useRoad'],  noRoute = opts['noRoute'],
+               plotSize = opts['plotSize'], plotVS  = opts['plotVS'],
+               velMin   = opts['velMin'],   velMax  = opts['velMax'],
+               cadMin   = opts['cadMin'],   tag     = tag,
+               outDir   = outDir)
     #
-    # check that we're running v3.7 or later
-    import sys
-    MIN_PYTHON = (3, 7)
-    if sys.version_info < MIN_PYTHON:
-        sys.exit("Python %s.%s or later is required." % MIN_PYTHON)
+    # and the replay
+    if opts['replay'] != '':
+        name = tag or '-'+os.path.basename(
+            stats.get('fileName', opts['fileName'])).split('.')[0]
+        from replaylib import replayRide
+        replayRide(ride, stats,
+                   os.path.join(outDir, 'replay'+name+'.'+opts['replay']),
+                   useRoad  = opts['useRoad'],  plotVS = opts['plotVS'],
+                   velMin   = opts['velMin'],   velMax = opts['velMax'],
+                   cadMin   = opts['cadMin'],   plotSize = opts['plotSize'])
+    #
+    # and the stats
+    if opts['watch']:
+        with open(os.path.join(outDir, 'stats'+tag+'.json'), 'w') as f:
+            json.dump(stats, f, indent = 1)
+    #
+    # and the time in zones
+    if opts['zones'] != '':
+        logZones(ride, stats, opts)
+    #
+    # and the splits
+    if opts['splits'] != '':
+        by = opts['splits']
+        splits = splitStats(ride, splitBounds(ride, by), opts,
+                            unit = 'km' if by == 'km' else 'mi')
+        printSplits(splits, title = 'Splits per '+by)
+    #
+    # and the climbs
+    if opts['climbs']:
+        climbs = findClimbs(ride['Time'], ride['Distance']/km2mi,
+                            ride['SmoothAltitude']/mtr2feet, ride['Grade'])
+        printClimbs(climbs)
+    #
+    # and the ride itself, indexed by processFile(), w/ its summary
+    #  and its velocity vs grade histogram
+    if opts['store'] != '':
+        stats['summary'] = rideSummary(ride, opts)
+        name = storeRide(ride, stats, opts['store'], update = False)
+        storeHist(rideHist(ride, opts), opts['store'], name)
+#
+# ------------------------------------------------------------------------
+# log the time in zones of a ride
+def logZones(ride, stats, opts):
+    """
+    add the ride's time in zones to the log opts['zones'], and print
+      them, w/ the totals of that week, unless useTable
+    """
+    table = zonesFor(opts)
+    zones = zoneTimes(ride, opts, table = table)
+    log = ZoneLog(opts['zones'], table = table)
+    log.add(stats.get('fileName', opts['fileName']), stats['startTime'],
+            zones)
+    log.save()
+    if not opts['useTable']:
+        week = periodKeys(stats['startTime'])['week']
+        printZones(zones, table = table, title = 'Time in zones [min]')
+        printZones(log.totals('week')[week], table = table,
+                   title = week+' [min]')
+#
+# ------------------------------------------------------------------------
+# process all the rides in a file, save the dups index once
+def processFile(fileName, opts,
+                dups = None):
+    for ride in processTracks(fileName, opts, tagAll = opts['watch'],
+                              dups = dups):
+        saveOutputs(*ride, opts)
+    if opts['store'] != '':
+        indexCorpus(opts['store'])
+    if (dups is not None) and dups.changed:
+        dups.save()
+#
+# ------------------------------------------------------------------------
+#
+if __name__ == '__main__':
     #
     # initialize the options
     opts = initOpts()
@@ -36,30 +241,60 @@ if __name__ == '__main__':
     if err:
         exit()
     #
-    # read the TCX file and store it in a pandas data frame
-    trackDF = readTrack(opts['fileName'],
-                        silent = opts['useTable'])
-    #
-    # process the track, returns a numpy data array
-    # and infos (which col is what) and stats 
-    (data, infos, stats) = processTrack(trackDF,
-                                        useTable = opts['useTable'],
-                                        velMin   = opts['velMin'],
-                                        velMax   = opts['velMax'],
-                                        grdMax   = opts['grdMax'],
-                                        cadMin   = opts['cadMin'],
-                                        hrMin    = opts['hrMin'],
-                                        silent   = opts['useTable'])
+    if opts['outDir'] != '':
+        os.makedirs(opts['outDir'], exist_ok = True)
     #
-    # overlay on a Google map
-    if (opts['plotType'] == 'gmap'):
-        mkGMap(data, infos, stats, velMin = opts['velMin'])
+    # follow a TCX file as it grows, print the stats as it goes
+    if opts['follow']:
+        (ride, stats) = followTrack(opts['fileName'],
+                                    useTable = opts['useTable'],
+                                    idle     = opts['idle'],
+                                    velMin   = opts['velMin'],
+                                    velMax   = opts['velMax'],
+                                    grdMax   = opts['grdMax'],
+                                    cadMin   = opts['cadMin'],
+                                    hrMin    = opts['hrMin'],
+                                    zone     = opts['tz'] or None)
+        saveOutputs(ride, stats, '', opts)
     #
-    # or generate plots
-    elif (opts['plotType'] != '-'):
-        doPlot(data, infos, stats,
-               plotType = opts['plotType'],
-               useRoad  = opts['useRoad'],  noRoute = opts['noRoute'],
-               plotSize = opts['plotSize'], plotVS  = opts['plotVS'],
-               velMin   = opts['velMin'],   velMax  = opts['velMax'],
-               cadMin   = opts['cadMin'])
+    # process a directory, redo only what changed since the last run
+    elif opts['batch'] != '':
+        counts = runBatch(opts['fileName'], opts)
+        if not opts['useTable']:
+            print(('{files} files: {parse} parsed, {process} processed, ' +
+                   '{plot} plotted, {gmap} gmaps, {dups} duplicates, ' +
+                   '{failed} failed').
+                  format(**counts))
+    #
+    # watch a directory, process the files dropped in it, until ^C,
+    #  w/ the dups index read once
+    elif opts['watch']:
+        dups = DupIndex(opts['dedup']) if opts['dedup'] != '' else None
+        try:
+            watchDir(opts['fileName'],
+                     lambda fn: processFile(fn, opts, dups = dups),
+                     poll = opts['poll'], once = opts['once'])
+        except KeyboardInterrupt:
+            if (dups is not None) and dups.changed:
+                dups.save()
+    #
+    # read the track file(s) (TCX, GPX or FIT) as typed columns,
+    #  an archive (zip or tar) holds several rides, process them all
+    else:
+        processFile(opts['fileName'], opts,
+                    dups = DupIndex(opts['dedup']) if opts['dedup'] != ''
+                    else None)
+    #
+    # the season report and the model, from the rides stored
+    corpusDir = os.path.join(opts['batch'], 'rides') \
+        if opts['batch'] != '' else opts['store']
+    if opts['report'] != '':
+        if corpusDir != '':
+            seasonReport(corpusDir, opts['report'], opts)
+        else:
+            print('-report needs -batch or -store, no report made')
+    if opts['model'] > 0:
+        if corpusDir != '':
+            printModel(modelCorpus(corpusDir, opts, window = opts['model']))
+        else:
+            print('-model needs -batch or -store, no model made')
@@ -0,0 +1,343 @@
+#
+# read lib: read a track file, whatever its format
+#  detectFormat()
+#  detectPacking()
+#  HeadStream
+#  peekStream()
+#  iterSources()
+#  readTCX()
+#  readGPX()
+#  readStream()
+#  iterTracks()
+#  readFile()
+# <- Last updated: Mon Oct 19 23:24:37 2026 -> SGK
+#
+import io
+import gzip, bz2, lzma, zipfile, tarfile
+import xml.etree.ElementTree as ET
+import numpy as np
+#
+from columnlib import makeTrack, parseTimes
+from fitlib    import readFIT
+from scanlib   import scanTCX, scanTCXParallel
+#
+nan = float('nan')
+#
+# ------------------------------------------------------------------------
+# guess the format from the first bytes
+def detectFormat(head):
+    """
+    fmt = detectFormat(head)
+      head - the first few kB of the file (bytes)
+      fmt  - 'fit', 'tcx', 'gpx' or None if unknown
+    """
+    if len(head) >= 12 and head[8:12] == b'.FIT':
+        return 'fit'
+    if b'<TrainingCenterDatabase' in head:
+        return 'tcx'
+    if b'<gpx' in head:
+        return 'gpx'
+    return None
+#
+# ------------------------------------------------------------------------
+# guess how a file is packed (compressed or archived) from its first bytes
+def detectPacking(head):
+    """
+    kind = detectPacking(head)
+      head - the first few kB of the file (bytes)
+      kind - 'gz', 'bz2', 'xz', 'zip', 'tar' or None if not packed
+    """
+    if head[:2] == b'\x1f\x8b':
+        return 'gz'
+    if head[:3] == b'BZh':
+        return 'bz2'
+    if head[:6] == b'\xfd7zXZ\x00':
+        return 'xz'
+    if head[:4] == b'PK\x03\x04':
+        return 'zip'
+    if head[257:262] == b'ustar':
+        return 'tar'
+    return None
+#
+# ------------------------------------------------------------------------
+# a read-only stream that gives back what was peeked
+class HeadStream(io.RawIOBase):
+    """
+    wraps a non seekable stream f, from which head was already read:
+      reading it returns head, then the rest of f
+    """
+    def __init__(self, head, f):
+        self.head = head
+        self.f    = f
+    #
+    def readable(self):
+        return True
+    #
+    def readinto(self, b):
+        if self.head:
+            n = min(len(b), len(self.head))
+            b[:n] = self.head[:n]
+            self.head = self.head[n:]
+            return n
+        data = self.f.read(len(b))
+        n = len(data)
+        b[:n] = data
+        return n
+#
+# ------------------------------------------------------------------------
+# peek at the first bytes of a stream
+def peekStream(f, n = 4096):
+    """
+    (head, f) = peekStream(f, n)
+      return the first n bytes of f, and a stream to read f from its start
+    """
+    try:
+        seekable = f.seekable()
+    except AttributeError:
+        # ie a tar member, in stream mode
+        seekable = False
+    if seekable:
+        pos  = f.tell()
+        head = f.read(n)
+        f.seek(pos)
+        return (head, f)
+    head = f.read(n)
+    return (head, io.BufferedReader(HeadStream(head, f)))
+#
+# ------------------------------------------------------------------------
+# iterate on the files in a (possibly compressed and/or archived) stream
+def iterSources(f, name):
+    """
+    for (name, head, stream) in iterSources(f, name):
+      f    - a binary file object
+      name - its name
+    yields each file in f, decompressed as it is read:
+      gzip, bzip2 and xz are stream-decompressed,
+      the members of zip and tar archives are yielded in turn,
+        w/out extracting them to disk (a zip must be seekable, nested
+        zips are read in memory)
+      each stream must be consumed before asking for the next one
+    """
+    (head, f) = peekStream(f)
+    kind = detectPacking(head)
+    #
+    if kind in ('gz', 'bz2', 'xz'):
+        opener = {'gz':  gzip.GzipFile,
+                  'bz2': bz2.BZ2File,
+                  'xz':  lzma.LZMAFile}[kind]
+        base = name[:-len(kind)-1] if name.endswith('.'+kind) else name
+        yield from iterSources(opener(fileobj = f) if kind == 'gz' \
+                               else opener(f), base)
+    #
+    elif kind == 'zip':
+        if isinstance(f, io.BufferedReader) and \
+           isinstance(f.raw, HeadStream):
+            f = io.BytesIO(f.read())
+        with zipfile.ZipFile(f) as zf:
+            for info in zf.infolist():
+                if info.is_dir():
+                    continue
+                with zf.open(info) as member:
+                    yield from iterSources(member,
+                                           name+'/'+info.filename)
+    #
+    elif kind == 'tar':
+        with tarfile.open(fileobj = f, mode = 'r|') as tf:
+            for info in tf:
+                if not info.isfile():
+                    continue
+                yield from iterSources(tf.extractfile(info),
+                                       name+'/'+info.name)
+    #
+    else:
+        yield (name, head, f)
+#
+# ------------------------------------------------------------------------
+# strip the {namespace} from a tag
+def localTag(tag):
+    return tag.rpartition('}')[2]
+#
+# ------------------------------------------------------------------------
+# read a TCX file, streaming it w/ ElementTree.iterparse()
+def readTCX(f):
+    """
+    track = readTCX(f)
+      f     - file name or file object, in TCX format
+      track - a columnlib.Track
+    the file is parsed incrementally and the trackpoints are discarded
+    as they are read, so only the columns are kept in memory
+    the index of the 1st point of each lap and activity are kept in
+    track.meta['lapStart'] and track.meta['activityStart']
+    """
+    (time, lon, lat, alt, hr, cad) = ([], [], [], [], [], [])
+    (laps, acts) = ([], [])
+    vals   = None
+    parent = None
+    for (event, elem) in ET.iterparse(f, events = ('start', 'end')):
+        tag = localTag(elem.tag)
+        if event == 'start':
+            if tag == 'Trackpoint':
+                vals = {}
+            elif tag == 'Track':
+                parent = elem
+            elif tag == 'Lap':
+                laps.append(len(time))
+            elif tag == 'Activity':
+                acts.append(len(time))
+            continue
+        #
+        # only look inside the trackpoints
+        if vals is None:
+            continue
+        if tag == 'Trackpoint':
+            time.append(vals.get('Time'))
+            lon.append(vals.get('LongitudeDegrees', nan))
+            lat.append(vals.get('LatitudeDegrees',  nan))
+            alt.append(vals.get('AltitudeMeters',   nan))
+            hr.append( vals.get('Value',            nan))
+            cad.append(vals.get('Cadence',          nan))
+            vals = None
+            # drop what was parsed so far
+            if parent is not None:
+                parent.clear()
+        elif elem.text is not None:
+            # HR is the only <Value> in a trackpoint
+            vals[tag] = elem.text
+    #
+    return makeTrack(parseTimes(time),
+                     np.array(lon, dtype = float),
+                     np.array(lat, dtype = float),
+                     np.array(alt, dtype = float),
+                     np.array(hr,  dtype = float),
+                     np.array(cad, dtype = float),
+                     meta = {'format': 'tcx',
+                             'lapStart':      np.array(laps, dtype = np.int64),
+                             'activityStart': np.array(acts, dtype = np.int64)})
+#
+# ------------------------------------------------------------------------
+# read a GPX file, streaming it w/ ElementTree.iterparse()
+def readGPX(f):
+    """
+    track = readGPX(f)
+      f     - file name or file object, in GPX format
+      track - a columnlib.Track
+    HR and cadence are read from the usual <extensions>, ie
+      gpxtpx:TrackPointExtension/gpxtpx:hr and gpxtpx:cad
+    the track segments are the laps, see readTCX()
+    """
+    (time, lon, lat, alt, hr, cad) = ([], [], [], [], [], [])
+    (segs, trks) = ([], [])
+    vals   = None
+    parent = None
+    for (event, elem) in ET.iterparse(f, events = ('start', 'end')):
+        tag = localTag(elem.tag)
+        if event == 'start':
+            if tag == 'trkpt':
+                vals = {'lat': elem.get('lat', nan),
+                        'lon': elem.get('lon', nan)}
+            elif tag == 'trkseg':
+                parent = elem
+                segs.append(len(time))
+            elif tag == 'trk':
+                trks.append(len(time))
+            continue
+        #
+        if vals is None:
+            continue
+        if tag == 'trkpt':
+            time.append(vals.get('time'))
+            lon.append(vals['lon'])
+            lat.append(vals['lat'])
+            alt.append(vals.get('ele', nan))
+            hr.append( vals.get('hr',  nan))
+            cad.append(vals.get('cad', nan))
+            vals = None
+            if parent is not None:
+                parent.clear()
+        elif elem.text is not None:
+            vals[tag] = elem.text
+    #
+    return makeTrack(parseTimes(time),
+                     np.array(lon, dtype = float),
+                     np.array(lat, dtype = float),
+                     np.array(alt, dtype = float),
+                     np.array(hr,  dtype = float),
+                     np.array(cad, dtype = float),
+                     meta = {'format': 'gpx',
+                             'lapStart':      np.array(segs, dtype = np.int64),
+                             'activityStart': np.array(trks, dtype = np.int64)})
+#
+# ------------------------------------------------------------------------
+# read a track from a stream, TCX, GPX or FIT
+def readStream(f, head):
+    """
+    track = readStream(f, head)
+      f    - a binary file object (not compressed)
+      head - its first bytes, to determine its format
+      returns a columnlib.Track, or None if not a TCX, GPX or FIT stream
+    the XML formats are parsed as f is read
+    """
+    fmt = detectFormat(head)
+    if fmt == 'tcx':
+        return readTCX(f)
+    elif fmt == 'gpx':
+        return readGPX(f)
+    elif fmt == 'fit':
+        return readFIT(f)
+    return None
+#
+# ------------------------------------------------------------------------
+# read each track in a file, possibly compressed or an archive
+def iterTracks(fn,
+               silent = True,
+               fast   = False,
+               nProcs = 1):
+    """
+    for track in iterTracks(fn):
+      yields each track found in fn, a TCX, GPX or FIT file that can be
+      compressed (gzip, bzip2, xz) or an archive of such files (zip, tar)
+      track.meta['fileName'] is fn, or fn/member for an archive
+      files that are not tracks are skipped (and listed unless silent)
+      fast: use scanlib.scanTCX() for a plain TCX file, if it can
+      nProcs: if > 1, the fast scan is done in parallel by nProcs processes
+    """
+    if fast:
+        with open(fn, 'rb') as f:
+            head = f.read(4096)
+        if (detectPacking(head) is None) and (detectFormat(head) == 'tcx'):
+            if nProcs > 1:
+                track = scanTCXParallel(fn, nProcs)
+            else:
+                track = scanTCX(fn)
+            if track is not None:
+                track.meta['fileName'] = fn
+                yield track
+                return
+            if not silent:
+                print('fast scan failed on', fn, '- using the XML reader')
+    #
+    with open(fn, 'rb') as f:
+        for (name, head, stream) in iterSources(f, fn):
+            track = readStream(stream, head)
+            if track is None:
+                if not silent:
+                    print('skipping', name, '(not a track file)')
+                continue
+            track.meta['fileName'] = name
+            yield track
+#
+# ------------------------------------------------------------------------
+# read a file, TCX, GPX or FIT, possibly compressed
+def readFile(fn,
+             fast   = False,
+             nProcs = 1):
+    """
+    track = readFile(fn)
+      read fn, its format is determined from its content,
+      it can be compressed (the 1st track is returned for an archive)
+      returns a columnlib.Track
+      fast, nProcs: see iterTracks()
+    """
+    for track in iterTracks(fn, fast = fast, nProcs = nProcs):
+        return track
+    raise ValueError('readFile(): "'+fn+'" is not a TCX, GPX or FIT file')
@@ -0,0 +1,131 @@
+#
+# replay lib: render a ride's replay to a video
+#  FrameWriter
+#  replayRide()
+# <- Last updated: Tue Oct 20 06:19:41 2026 -> SGK
+#
+# the figure is a viewlib.RideViewer w/ the velocity, HR and altitude
+# panels: the map and the full tracks are drawn once, then for each frame
+# only the cursors and the marker on the route are drawn over that saved
+# background, and the frame's pixels are written to ffmpeg's stdin, so
+# nothing is kept from one frame to the next and the memory used does not
+# depend on the no. of frames
+#
+import time, shutil, subprocess
+import numpy as np
+import matplotlib.pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+#
+from viewlib import RideViewer
+#
+# the defaults: frames per second, ride seconds per video second, dpi
+replayFPS   = 30
+replaySpeed = 60
+replayDPI   = 100
+#
+# the panels: column, mask
+replayPanels = (('Velocity',       'located'),
+                ('HeartRate',      'heartRate'),
+                ('SmoothAltitude', 'located'))
+#
+# ------------------------------------------------------------------------
+# write the frames, as they are rendered
+class FrameWriter:
+    """
+    writer = FrameWriter(fileName, width, height, fps)
+    writer.write(rgba)            a frame, width x height RGBA bytes
+    writer.close()
+      the frames are piped to ffmpeg, that encodes them to fileName,
+      or written as is (raw RGBA) if fileName ends in .rgba
+    """
+    #
+    def __init__(self, fileName, width, height, fps):
+        self.proc = None
+        if fileName.endswith('.rgba'):
+            self.f = open(fileName, 'wb')
+            return
+        ffmpeg = shutil.which('ffmpeg')
+        if ffmpeg is None:
+            raise RuntimeError('FrameWriter: ffmpeg not found, needed for ' +
+                               fileName+' (use a .rgba file for raw frames)')
+        self.proc = subprocess.Popen([ffmpeg, '-y', '-loglevel', 'error',
+                                      '-f', 'rawvideo', '-pix_fmt', 'rgba',
+                                      '-s', '{}x{}'.format(width, height),
+                                      '-r', str(fps), '-i', '-',
+                                      '-pix_fmt', 'yuv420p', fileName],
+                                     stdin = subprocess.PIPE)
+        self.f = self.proc.stdin
+    #
+    def write(self, rgba):
+        self.f.write(rgba)
+    #
+    def close(self):
+        self.f.close()
+        if self.proc is not None and self.proc.wait() != 0:
+            raise RuntimeError('FrameWriter: ffmpeg failed, exit status ' +
+                               str(self.proc.returncode))
+#
+# ------------------------------------------------------------------------
+# render a ride's replay
+def replayRide(ride, stats, fileName,
+               fps      = replayFPS,
+               speed    = replaySpeed,
+               dpi      = replayDPI,
+               plotVS   = 'Time',
+               useRoad  = True,
+               velMin   = 6.0,
+               velMax   = 100.0,
+               cadMin   = 10,
+               plotSize = (12, 8),
+               silent   = False):
+    """
+    info = replayRide(ride, stats, fileName, fps, speed, dpi, ...)
+      ride and stats as returned by tracklib.processTrack()
+      fileName - the video (.mp4... encoded by ffmpeg, or .rgba raw frames)
+      fps      - frames per second of the video
+      speed    - ride seconds per video second, a 2h ride is 2 min at 60
+      info     - {'frames', 'seconds' (to render), 'fps' (rendered per s),
+                  'duration' (of the video [s])}
+    raises ValueError if the ride has no located pts
+    the other args are passed to viewlib.RideViewer
+    """
+    viewer = RideViewer(ride, stats, plotVS = plotVS, useRoad = useRoad,
+                        velMin = velMin, velMax = velMax, cadMin = cadMin,
+                        plotSize = plotSize, panels = replayPanels)
+    fig = viewer.fig
+    fig.set_dpi(dpi)
+    canvas = FigureCanvasAgg(fig)
+    (width, height) = canvas.get_width_height()
+    #
+    # the frames' times [min] -> the located pts
+    times = ride['Time'][viewer.idx]
+    if times.size == 0:
+        plt.close(fig)
+        raise ValueError('replayRide(): no located pts to replay')
+    nFrames = int((times[-1] - times[0])*60.0/speed*fps) + 1
+    frames = np.searchsorted(times, times[0] +
+                             np.arange(nFrames)*speed/fps/60.0)
+    frames = np.minimum(frames, times.size-1)
+    #
+    # the background, drawn once, saved by viewer.onDraw()
+    t0 = time.perf_counter()
+    canvas.draw()
+    writer = FrameWriter(fileName, width, height, fps)
+    try:
+        for i in frames:
+            viewer.moveCursor(i)
+            writer.write(canvas.buffer_rgba())
+    finally:
+        writer.close()
+        plt.close(fig)
+    dt = time.perf_counter() - t0
+    #
+    info = {'frames':   nFrames,
+            'seconds':  dt,
+            'fps':      nFrames/dt if dt > 0 else 0.0,
+            'duration': nFrames/fps}
+    if not silent:
+        print('replay: {} frames ({:.1f} s of video) in {:.1f} s, {:.1f} fps'.
+              format(nFrames, info['duration'], dt, info['fps']) +
+              ", saved in '"+fileName+"'")
+    return info
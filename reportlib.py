@@ -0,0 +1,289 @@
+#
+# report lib: a season report of a corpus of rides, from their stats
+#  reportZones()
+#  rideSummary()
+#  fitLines()
+#  summaryFrame()
+#  periodTable()
+#  seasonReport()
+# <- Last updated: Tue Oct 20 06:14:07 2026 -> SGK
+#
+# each processed ride keeps a small summary in its stats (the time in the
+# HR zones, and the sums a straight line fit of velocity vs grade needs,
+# see rideSummary()), so the report only reads the corpus' index: the
+# rides' stats are a data frame, summed per week, month, season and year
+# w/ groupby(), and the fits of all the years are solved at once from the
+# summed sums, which is the least squares fit of all the year's pts, the
+# same line dlsq_fit() finds (it converges to it for a straight line)
+#
+# the summary keeps the HR zones' edges it was made w/, a ride summarized
+# w/ other edges than opts['hrZones'] is summarized again from its columns
+#
+# the report is a PDF (matplotlib) or a self-contained HTML file (the
+# figures embedded as PNG), per the file's extension
+#
+import os, io, time, base64
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+from matplotlib.backends.backend_pdf import PdfPages
+#
+from statslib import MaskCache
+from zonelib  import zonesFor, zoneLabels, zoneTimes, periodKeys
+from storelib import Corpus
+from utilslib import formatTime
+#
+# the periods of the report
+reportPeriods = ('week', 'month', 'season', 'year')
+#
+# the sums of the fit: n, sum(g), sum(v), sum(g^2), sum(g*v)
+fitSums = ('fitN', 'fitG', 'fitV', 'fitGG', 'fitGV')
+#
+# ------------------------------------------------------------------------
+# the zones kept per ride
+def reportZones(opts):
+    """
+    table = reportZones(opts)
+      the HR row of zonelib's zoneTable, w/ the edges opts['hrZones']
+    """
+    return tuple([z for z in zonesFor(opts) if z[0] == 'HeartRate'])
+#
+# ------------------------------------------------------------------------
+# a ride's summary, kept in its stats
+def rideSummary(ride, opts):
+    """
+    summary = rideSummary(ride, opts)
+      ride    - a processed ride, see tracklib.processTrack()
+      opts    - dict w/ velMin, velMax, hrMin, cadMin, hrZones
+      summary - {'hrZones': the time in the HR zones [min],
+                 'hrEdges': the HR zones' edges [bpm],
+                 'gradeFit': the fit's sums, see fitSums},
+                the fit is of the velocity vs the grade of the located
+                pts, like the one doPlot() draws
+    """
+    masks = MaskCache(ride, opts)
+    table = reportZones(opts)
+    zones = zoneTimes(ride, opts, table = table, masks = masks)
+    (g, v) = (ride['Grade'], ride['Velocity'])
+    m = masks('located') & np.isfinite(g) & np.isfinite(v)
+    (g, v) = (g[m].astype(np.float64), v[m].astype(np.float64))
+    return {'hrZones':  [float(t) for t in zones['HeartRate']],
+            'hrEdges':  [float(e) for e in table[0][2]],
+            'gradeFit': [float(g.size), g.sum(), v.sum(), (g*g).sum(),
+                         (g*v).sum()]}
+#
+# ------------------------------------------------------------------------
+# straight line fits, from their sums
+def fitLines(sums):
+    """
+    (c0, c1) = fitLines(sums)
+      sums   - array (..., 5) of the fitSums, ie of several rides or years
+      c0, c1 - v = c0 + c1*g, NaN w/ less than 2 pts or no spread
+    """
+    (n, sg, sv, sgg, sgv) = np.moveaxis(np.asarray(sums, dtype = np.float64),
+                                        -1, 0)
+    det = n*sgg - sg*sg
+    with np.errstate(invalid = 'ignore', divide = 'ignore'):
+        c1 = np.where((n > 1) & (det > 0), (n*sgv - sg*sv)/det, np.nan)
+        c0 = (sv - c1*sg)/n
+    return (c0, c1)
+#
+# ------------------------------------------------------------------------
+# the rides' stats and summaries, as a data frame
+def summaryFrame(corpus, opts):
+    """
+    df = summaryFrame(corpus, opts)
+      corpus - a storelib.Corpus
+      df     - one row per ride: the periods' keys, distance, moving
+               time and distance, elevation gain, time in each HR zone
+               and the fit's sums; the summary of a ride stored w/out
+               one, or w/ other HR zones, is computed from its columns
+    """
+    edges = [float(e) for e in reportZones(opts)[0][2]]
+    before = [float(e) for e in reportZones({})[0][2]]
+    nZones = len(edges)+1
+    rows = []
+    for name in corpus.names:
+        stats = corpus.stats(name)
+        summary = stats.get('summary')
+        # the summaries made before -hrzones are of the default zones
+        if summary is None or summary.get('hrEdges', before) != edges:
+            summary = rideSummary(corpus[name], opts)
+        row = periodKeys(stats['startTime'])
+        row.update({'startEpoch': stats.get('startEpoch', 0.0),
+                    'rides':       1,
+                    'distance':    stats['distance'],
+                    'mvgDistance': stats['mvgDistance'],
+                    'movingTime':  stats['movingTime'],
+                    'elevGain':    stats['elevGain']})
+        row.update(zip(['hr{}'.format(k) for k in range(nZones)],
+                       summary['hrZones']))
+        row.update(zip(fitSums, summary['gradeFit']))
+        rows.append(row)
+    return pd.DataFrame(rows, index = corpus.names)
+#
+# ------------------------------------------------------------------------
+# the totals per period
+def periodTable(df, period):
+    """
+    table = periodTable(df, period)
+      the sums per week, month, season or year of summaryFrame(), w/ the
+      average moving velocity [mph], and the fit's slope [mph/10%] and
+      velocity at 0% [mph], in the order the periods started
+    """
+    groups = df.drop(columns = [p for p in reportPeriods if p != period]).\
+        groupby(period)
+    order = groups['startEpoch'].min().sort_values().index
+    table = groups.sum().drop(columns = 'startEpoch').loc[order]
+    with np.errstate(invalid = 'ignore', divide = 'ignore'):
+        table['avgMVel'] = table['mvgDistance']/(table['movingTime']/60.0)
+    (c0, c1) = fitLines(table[list(fitSums)].values)
+    table['vel0']  = c0
+    table['mph10'] = c1*10
+    return table
+#
+# ------------------------------------------------------------------------
+# the season table, formatted
+def formatTable(table, edges):
+    labels = zoneLabels(edges)
+    out = pd.DataFrame(index = table.index)
+    out['rides']        = table['rides']
+    out['distance [mi]'] = table['distance'].map('{:.1f}'.format)
+    out['moving time']  = table['movingTime'].map(formatTime)
+    out['avg vel [mph]'] = table['avgMVel'].map('{:.2f}'.format)
+    out['gain [ft]']    = table['elevGain'].map('{:.0f}'.format)
+    for (k, label) in enumerate(labels):
+        out['HR '+label+' [h]'] = (table['hr{}'.format(k)]/60).\
+            map('{:.1f}'.format)
+    out['mph/10%']      = table['mph10'].map('{:.1f}'.format)
+    return out
+#
+# ------------------------------------------------------------------------
+# the figures
+def reportFigures(tables, edges, plotSize):
+    labels = zoneLabels(edges)
+    figs = []
+    #
+    # distance per week, moving time and velocity per month, HR zones
+    fig = plt.figure(figsize = plotSize)
+    week = tables['week']
+    ax = fig.add_subplot(2, 2, 1)
+    ax.bar(np.arange(len(week)), week['distance'], color = 'b')
+    ax.set_xticks(np.arange(len(week))[::max(len(week)//8, 1)])
+    ax.set_xticklabels(week.index[::max(len(week)//8, 1)], fontsize = 7,
+                       rotation = 30)
+    ax.set_title('Distance per week [mi]')
+    #
+    month = tables['month']
+    x = np.arange(len(month))
+    step = max(len(month)//8, 1)
+    ax = fig.add_subplot(2, 2, 2)
+    ax.bar(x, month['movingTime']/60, color = 'g')
+    ax.set_xticks(x[::step])
+    ax.set_xticklabels(month.index[::step], fontsize = 7, rotation = 30)
+    ax.set_title('Moving time per month [h]')
+    #
+    ax = fig.add_subplot(2, 2, 3)
+    ax.plot(x, month['avgMVel'], 'o-r')
+    ax.set_xticks(x[::step])
+    ax.set_xticklabels(month.index[::step], fontsize = 7, rotation = 30)
+    ax.set_title('Average moving velocity per month [mph]')
+    #
+    season = tables['season']
+    x = np.arange(len(season))
+    ax = fig.add_subplot(2, 2, 4)
+    bottom = np.zeros(len(season))
+    for (k, label) in enumerate(labels):
+        t = season['hr{}'.format(k)].values/60
+        ax.bar(x, t, bottom = bottom, label = label)
+        bottom += t
+    step = max(len(season)//8, 1)
+    ax.set_xticks(x[::step])
+    ax.set_xticklabels(season.index[::step], fontsize = 7, rotation = 30)
+    ax.set_title('Time in HR zones per season [h]')
+    ax.legend(fontsize = 6)
+    fig.tight_layout()
+    figs.append(fig)
+    #
+    # the velocity vs grade fit of each year
+    fig = plt.figure(figsize = plotSize)
+    ax = fig.add_subplot(1, 1, 1)
+    g = np.array([-10.0, 10.0])
+    for (year, row) in tables['year'].iterrows():
+        if np.isfinite(row['mph10']):
+            ax.plot(g, row['vel0'] + row['mph10']*g/10, '-',
+                    label = '{}: {:.1f} mph at 0%, {:.1f} mph/10%'.
+                    format(year, row['vel0'], row['mph10']))
+    ax.set_xlabel('Grade [%]')
+    ax.set_ylabel('Velocity [mph]')
+    ax.set_title('Velocity vs grade, fit of each year')
+    ax.legend()
+    figs.append(fig)
+    return figs
+#
+# ------------------------------------------------------------------------
+# the report
+def seasonReport(corpusDir, fileName, opts,
+                 silent = False):
+    """
+    tables = seasonReport(corpusDir, fileName, opts)
+      corpusDir - a corpus of processed rides (see storelib.py), ie
+                  -store's or -batch's rides/
+      fileName  - the report, .pdf or .html
+      opts      - dict w/ velMin, velMax, hrMin, cadMin, hrZones and
+                  plotSize
+      tables    - {period: its periodTable()}
+    """
+    t0 = time.perf_counter()
+    corpus = Corpus(corpusDir)
+    if len(corpus) == 0:
+        raise ValueError('seasonReport(): no rides in '+corpusDir)
+    df = summaryFrame(corpus, opts)
+    edges = reportZones(opts)[0][2]
+    tables = dict([(period, periodTable(df, period))
+                   for period in reportPeriods])
+    figs = reportFigures(tables, edges, opts['plotSize'])
+    title = 'Season report, {} rides, {} to {}'.format(
+        len(df), df.sort_values('startEpoch')['week'].iloc[0],
+        df.sort_values('startEpoch')['week'].iloc[-1])
+    #
+    if fileName.endswith('.html'):
+        parts = ['<html><head><meta charset="utf-8"><title>'+title +
+                 '</title></head><body>', '<h1>'+title+'</h1>']
+        for fig in figs:
+            buf = io.BytesIO()
+            fig.savefig(buf, format = 'png')
+            parts.append('<img src="data:image/png;base64,' +
+                         base64.b64encode(buf.getvalue()).decode()+'">')
+        for period in ('season', 'month'):
+            parts.append('<h2>Per '+period+'</h2>')
+            parts.append(formatTable(tables[period], edges).to_html())
+        parts.append('</body></html>')
+        tmp = fileName+'.tmp'
+        with open(tmp, 'w') as f:
+            f.write('\n'.join(parts))
+        os.replace(tmp, fileName)
+    else:
+        with PdfPages(fileName) as pdf:
+            figs[0].suptitle(title)
+            for fig in figs:
+                pdf.savefig(fig)
+            # the season table, on its own page
+            table = formatTable(tables['season'], edges)
+            fig = plt.figure(figsize = opts['plotSize'])
+            ax = fig.add_subplot(1, 1, 1)
+            ax.axis('off')
+            ax.set_title('Per season')
+            t = ax.table(cellText = table.values, rowLabels = table.index,
+                         colLabels = table.columns, loc = 'upper center')
+            t.auto_set_font_size(False)
+            t.set_fontsize(7)
+            pdf.savefig(fig)
+            figs.append(fig)
+    for fig in figs:
+        plt.close(fig)
+    #
+    if not silent:
+        print('report: {} rides in {:.2f} s, saved in \'{}\''.
+              format(len(df), time.perf_counter() - t0, fileName))
+    return tables
@@ -0,0 +1,337 @@
+#
+# scan lib: fast TCX reader, scans the raw bytes w/ regular expressions
+#  toFloat()
+#  scanBuffer()
+#  findStarts()
+#  scanTCX()
+#  splitChunks()
+#  scanChunk()
+#  scanTCXParallel()
+#  tailTCX()
+# <- Last updated: Mon Oct 19 23:27:15 2026 -> SGK
+#
+# instead of building an XML tree, the file is memory-mapped and scanned
+# w/ one precompiled pattern that matches a whole <Trackpoint> and captures
+# the few fields needed, the values are then converted at once w/ numpy
+#
+# this only works for the usual TCX layout: plain <Trackpoint> tags, its
+# elements in the schema's order, UTC time stamps, no comments or CDATA;
+# otherwise scanBuffer() returns None and one must use the XML reader
+#
+# a big file can be scanned in parallel: it is split in chunks that start
+# at a <Trackpoint>, each chunk is scanned by a worker process that puts
+# its columns in shared memory, and the chunks' columns are concatenated
+#
+# a file still being written (ie a live recording) can be followed: only
+# the bytes appended since the last look are scanned, up to the last
+# complete </Trackpoint>
+#
+import os, re, mmap, time
+import numpy as np
+#
+from columnlib import makeTrack
+#
+# a trackpoint, the schema's order is
+#  Time Position AltitudeMeters DistanceMeters HeartRateBpm Cadence
+#  SensorState Extensions
+tcxColumns = ('Time', 'Latitude', 'Longitude', 'Altitude',
+              'HeartRate', 'Cadence')
+tcxPattern = re.compile(
+    rb'<Trackpoint>\s*' +
+    rb'<Time>(\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d(?:\.\d+)?)' +
+    rb'(?:Z|[+-]00:00)</Time>\s*' +
+    rb'(?:<Position>\s*' +
+    rb'<LatitudeDegrees>([^<]*)</LatitudeDegrees>\s*' +
+    rb'<LongitudeDegrees>([^<]*)</LongitudeDegrees>\s*' +
+    rb'</Position>\s*)?' +
+    rb'(?:<AltitudeMeters>([^<]*)</AltitudeMeters>\s*)?' +
+    rb'(?:<DistanceMeters>[^<]*</DistanceMeters>\s*)?' +
+    rb'(?:<HeartRateBpm[^>]*>\s*<Value>([^<]*)</Value>\s*' +
+    rb'</HeartRateBpm>\s*)?' +
+    rb'(?:<Cadence>([^<]*)</Cadence>\s*)?' +
+    rb'(?:<SensorState>[^<]*</SensorState>\s*)?' +
+    rb'(?:<Extensions>.*?</Extensions>\s*)?' +
+    rb'</Trackpoint>', re.S)
+tpStartPat = re.compile(rb'<Trackpoint>')
+lapPat     = re.compile(rb'<Lap[\s>]')
+actPat     = re.compile(rb'<Activity[\s>]')
+#
+# ------------------------------------------------------------------------
+# convert a list of values (bytes) to a float array, missing ones -> NaN
+def toFloat(vals):
+    """
+    convert a list of bytes to a float64 array, b'' -> NaN
+    """
+    a = np.array(vals)
+    if a.dtype.itemsize < 3:
+        # room for 'nan'
+        a = a.astype('S3')
+    a[a == b''] = b'nan'
+    return a.astype(np.float64)
+#
+# ------------------------------------------------------------------------
+# scan a range of bytes for trackpoints
+def scanBuffer(buf,
+               start = 0, end = None):
+    """
+    cols = scanBuffer(buf, start, end)
+      buf   - bytes, or a memory map, holding a TCX file or a part of it
+      start - where to start
+      end   - where to stop (len(buf) if None)
+      cols  - {column: numpy array} for the trackpoints in [start, end),
+              w/ Time in Unix epoch [s] and NaN for missing values,
+              or None if the layout is not the expected one
+    """
+    if end is None:
+        end = len(buf)
+    #
+    if (buf.find(b'<!--', start, end) >= 0) or \
+       (buf.find(b'<![CDATA[', start, end) >= 0):
+        return None
+    #
+    # every trackpoint must match
+    pts = tcxPattern.findall(buf, start, end)
+    n = len(pts)
+    if n != len(tpStartPat.findall(buf, start, end)):
+        return None
+    if n == 0:
+        return dict([(name, np.empty(0)) for name in tcxColumns])
+    #
+    cols = {}
+    try:
+        for (name, vals) in zip(tcxColumns, zip(*pts)):
+            if name == 'Time':
+                v = np.array(vals).astype('datetime64[ms]')
+                cols[name] = v.astype(np.int64)/1e3
+            else:
+                cols[name] = toFloat(vals)
+    except ValueError:
+        return None
+    return cols
+#
+# ------------------------------------------------------------------------
+# where the laps (or activities) start
+def findStarts(buf, pat,
+               start = 0, end = None):
+    """
+    idx = findStarts(buf, pat, start, end)
+      for each match of pat (ie lapPat) in [start, end) the number of
+      trackpoints in [start, match), ie the index of the lap's 1st point
+    """
+    if end is None:
+        end = len(buf)
+    idx = []
+    n   = 0
+    pos = start
+    for m in pat.finditer(buf, start, end):
+        n  += len(tpStartPat.findall(buf, pos, m.start()))
+        pos = m.start()
+        idx.append(n)
+    return idx
+#
+# ------------------------------------------------------------------------
+# make a track from the columns and the laps/activities
+def makeScannedTrack(cols, laps, acts):
+    """
+    track = makeScannedTrack(cols, laps, acts)
+      laps, acts are the index of the 1st point of each lap/activity,
+      kept in track.meta['lapStart'] and track.meta['activityStart']
+    """
+    track = makeTrack(cols['Time'], cols['Longitude'], cols['Latitude'],
+                      cols['Altitude'], cols['HeartRate'], cols['Cadence'],
+                      meta = {'format': 'tcx'})
+    track.meta['lapStart']      = np.array(laps, dtype = np.int64)
+    track.meta['activityStart'] = np.array(acts, dtype = np.int64)
+    return track
+#
+# ------------------------------------------------------------------------
+# read a TCX file w/ scanBuffer()
+def scanTCX(fn):
+    """
+    track = scanTCX(fn)
+      read the TCX file fn by memory-mapping it and scanning its bytes,
+      returns a columnlib.Track, or None if fn does not have the expected
+      layout (use readlib.readTCX() then)
+    """
+    with open(fn, 'rb') as f:
+        try:
+            buf = mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ)
+        except ValueError:
+            # an empty file
+            return None
+        try:
+            cols = scanBuffer(buf)
+            if cols is not None:
+                laps = findStarts(buf, lapPat)
+                acts = findStarts(buf, actPat)
+        finally:
+            buf.close()
+    if cols is None:
+        return None
+    return makeScannedTrack(cols, laps, acts)
+#
+# ------------------------------------------------------------------------
+# split a buffer in chunks that start w/ a <Trackpoint>
+def splitChunks(buf, nChunks):
+    """
+    chunks = splitChunks(buf, nChunks)
+      return a list of up to nChunks (start, end) byte ranges covering buf,
+      all but the 1st start at a <Trackpoint>, so each holds whole
+      trackpoints (the laps and activities between them are in the
+      chunk before)
+    """
+    size   = len(buf)
+    bounds = [0]
+    for i in range(1, nChunks):
+        pos = buf.find(b'<Trackpoint>', max(size*i//nChunks, bounds[-1]+1))
+        if pos < 0:
+            break
+        if pos > bounds[-1]:
+            bounds.append(pos)
+    bounds.append(size)
+    return list(zip(bounds[:-1], bounds[1:]))
+#
+# ------------------------------------------------------------------------
+# scan a chunk of a file, in a worker process
+def scanChunk(fn, start, end):
+    """
+    (shmName, n, laps, acts) = scanChunk(fn, start, end)
+      scan [start, end) of the TCX file fn, put the columns (in tcxColumns
+      order) as a (6, n) float64 array in a new shared memory block
+      returns its name, the number of points and the relative lap and
+      activity starts, or None if the layout is not the expected one
+      the caller must unlink the shared memory
+    """
+    from multiprocessing import shared_memory
+    #
+    with open(fn, 'rb') as f:
+        buf = mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ)
+        try:
+            cols = scanBuffer(buf, start, end)
+            if cols is None:
+                return None
+            laps = findStarts(buf, lapPat, start, end)
+            acts = findStarts(buf, actPat, start, end)
+        finally:
+            buf.close()
+    #
+    n = cols['Time'].size
+    nc = len(tcxColumns)
+    shm = shared_memory.SharedMemory(create = True, size = max(1, nc*n*8))
+    a = np.ndarray((nc, n), dtype = np.float64, buffer = shm.buf)
+    for (i, name) in enumerate(tcxColumns):
+        a[i, :] = cols[name]
+    del a
+    name = shm.name
+    shm.close()
+    return (name, n, laps, acts)
+#
+# ------------------------------------------------------------------------
+# read a big TCX file, scanning chunks of it in parallel
+def scanTCXParallel(fn,
+                    nProcs = None,
+                    chunkSize = 32*1024*1024):
+    """
+    track = scanTCXParallel(fn, nProcs, chunkSize)
+      same as scanTCX(), but the file is split in chunks of about
+      chunkSize bytes (at least nProcs of them), scanned by nProcs
+      worker processes (os.cpu_count() if None)
+      returns a columnlib.Track, or None if the layout is not the
+      expected one
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    from multiprocessing import shared_memory, resource_tracker
+    #
+    if nProcs is None:
+        nProcs = os.cpu_count() or 1
+    size = os.path.getsize(fn)
+    nChunks = max(nProcs, -(-size//chunkSize))
+    if (nProcs <= 1) or (nChunks <= 1):
+        return scanTCX(fn)
+    #
+    with open(fn, 'rb') as f:
+        buf = mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ)
+        chunks = splitChunks(buf, nChunks)
+        buf.close()
+    #
+    # start the tracker of the shared memory blocks before the workers,
+    #  so they all use this one (the blocks are freed here)
+    resource_tracker.ensure_running()
+    with ProcessPoolExecutor(max_workers = nProcs) as ex:
+        results = list(ex.map(scanChunk, [fn]*len(chunks),
+                              [c[0] for c in chunks],
+                              [c[1] for c in chunks]))
+    #
+    # concatenate the chunks' columns, in order, and free the shared mem
+    ok = all([r is not None for r in results])
+    nTot = sum([r[1] for r in results if r is not None])
+    nc = len(tcxColumns)
+    data = np.empty((nc, nTot)) if ok else None
+    (laps, acts) = ([], [])
+    k = 0
+    for r in results:
+        if r is None:
+            continue
+        (name, n, lapsC, actsC) = r
+        shm = shared_memory.SharedMemory(name = name)
+        if ok:
+            data[:, k:k+n] = np.ndarray((nc, n), dtype = np.float64,
+                                        buffer = shm.buf)
+            laps += [k+i for i in lapsC]
+            acts += [k+i for i in actsC]
+        shm.close()
+        shm.unlink()
+        k += n
+    if not ok:
+        return None
+    #
+    cols = dict([(name, data[i]) for (i, name) in enumerate(tcxColumns)])
+    return makeScannedTrack(cols, laps, acts)
+#
+# ------------------------------------------------------------------------
+# follow a TCX file as it grows
+def tailTCX(fn,
+            poll = 1.0,
+            idle = None):
+    """
+    for track in tailTCX(fn, poll, idle):
+      yields a columnlib.Track w/ the trackpoints appended to the TCX file
+      fn since the previous one (the first one holds those already there),
+      only the new bytes are read and scanned, track.meta['lapStart']
+      holds the laps that start in these points
+      poll - how often to look for new bytes [s]
+      idle - stop after idle seconds w/out new bytes (None: never),
+      it stops when the file is complete (</TrainingCenterDatabase>)
+      raises ValueError if the layout is not the expected one
+    """
+    pos  = 0      # where to read next
+    rest = b''    # bytes read but not scanned yet
+    last = time.time()
+    with open(fn, 'rb') as f:
+        while True:
+            f.seek(pos)
+            new = f.read()
+            pos += len(new)
+            if new:
+                last = time.time()
+                rest += new
+                # scan up to the last complete trackpoint
+                end = rest.rfind(b'</Trackpoint>')
+                if end >= 0:
+                    end += len(b'</Trackpoint>')
+                    cols = scanBuffer(rest, 0, end)
+                    if cols is None:
+                        raise ValueError('tailTCX(): "'+fn+'" ' +
+                                         'does not have the expected layout')
+                    laps = findStarts(rest, lapPat, 0, end)
+                    track = makeScannedTrack(cols, laps, [])
+                    track.meta['fileName'] = fn
+                    rest = rest[end:]
+                    if len(track) > 0:
+                        yield track
+                if b'</TrainingCenterDatabase>' in rest:
+                    return
+            elif (idle is not None) and (time.time() - last > idle):
+                return
+            else:
+                time.sleep(poll)
@@ -0,0 +1,37 @@
+#!/usr/bin/env python
+#
+# serve the track analysis as a local HTTP API, see apilib.py
+#
+#   python serve-tcx.py [-host h] [-port p] [-workers n] [-maxjobs n]
+#                       [-queue n] [-cache n]
+#
+#   curl --data-binary @210501.tcx 'http://127.0.0.1:8080/stats?velMin=8'
+#   curl --data-binary @210501.tcx -o route.png \
+#        'http://127.0.0.1:8080/plot?fig=route&fmt=png'
+#
+# <- Last updated: Mon Oct 19 20:06:37 2026 -> SGK
+#
+import sys
+from apilib import runServer
+#
+# ------------------------------------------------------------------------
+#
+if __name__ == '__main__':
+    #
+    # the options: -flag -> (name, type)
+    flags = {'-host':    ('host',      str), '-port':    ('port',      int),
+             '-workers': ('nWorkers',  int), '-maxjobs': ('maxJobs',   int),
+             '-queue':   ('maxQueue',  int), '-cache':   ('cacheSize', int)}
+    opts = {}
+    args = sys.argv[1:]
+    while args:
+        a = args.pop(0)
+        if (a not in flags) or (len(args) == 0):
+            print('Invalid option', '"'+a+'",', 'usage\n' +
+                  ' serve-tcx.py [-host h] [-port p] [-workers n]' +
+                  ' [-maxjobs n] [-queue n] [-cache n]')
+            sys.exit(1)
+        (name, typ) = flags[a]
+        opts[name] = typ(args.pop(0))
+    #
+    runServer(**opts)
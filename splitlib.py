@@ -0,0 +1,137 @@
+#
+# split lib: per lap and per mile (or km) splits of a ride
+#  splitBounds()
+#  splitStats()
+#  printSplits()
+# <- Last updated: Tue Oct 20 00:29:12 2026 -> SGK
+#
+# a split goes from one boundary pt to the next, so the splits cover the
+# ride and add up to its totals; the boundaries are the laps' 1st pts,
+# or found w/ np.searchsorted() on the cumulative distance, and every
+# value is a difference of cumulative sums at the boundaries, or a
+# np.maximum.reduceat(), so there is no loop on the pts
+#
+import numpy as np
+#
+from utilslib  import formatTime
+from columnlib import Track
+from statslib  import MaskCache
+from geolib    import km2mi, mtr2feet
+from elevlib   import hystAlt, gainHyst
+#
+# ------------------------------------------------------------------------
+# where the splits start and end
+def splitBounds(ride,
+                by = 'lap',
+                moving = False):
+    """
+    bounds = splitBounds(ride, by, moving)
+      ride   - a processed ride, see tracklib.processTrack()
+      by     - 'lap' (ride.meta['lapStart']), 'mi' or 'km'
+      moving - split on the moving distance, not the total one
+      bounds - index of the pts between splits, 0 and n-1 included
+    """
+    n = len(ride)
+    if n < 2:
+        return np.zeros(min(n, 1), dtype = np.int64)
+    if by == 'lap':
+        starts = np.asarray(ride.meta.get('lapStart', []), dtype = np.int64)
+    elif by in ('mi', 'km'):
+        dist = ride['MovingDistance' if moving else 'Distance']
+        step = 1.0 if by == 'mi' else km2mi
+        marks = np.arange(1, int(np.nanmax(dist)/step)+1)*step
+        # the 1st pt at or past each mile/km
+        starts = np.searchsorted(dist, marks)
+    else:
+        raise ValueError('splitBounds(): invalid kind of split "'+by+'"')
+    return np.unique(np.concatenate(([0], starts[(starts > 0) &
+                                                 (starts < n)], [n-1])))
+#
+# ------------------------------------------------------------------------
+# the stats of each split
+def splitStats(ride, bounds, opts,
+               unit = 'mi',
+               masks = None):
+    """
+    splits = splitStats(ride, bounds, opts, unit, masks)
+      ride   - a processed ride, see tracklib.processTrack()
+      bounds - from splitBounds()
+      opts   - dict w/ velMin, velMax, hrMin, cadMin (see statslib.py)
+      unit   - 'mi' or 'km', for the distance and velocity
+      masks  - a statslib.MaskCache to reuse, if any
+      splits - a columnlib.Track, one row per split, w/ its start time,
+               distance, time, moving time, avg moving velocity, avg/max
+               HR, avg cadence and elevation gain
+    the HR and cadence are averaged over the pts in the statslib masks,
+    0 if none
+    """
+    if masks is None:
+        masks = MaskCache(ride, opts)
+    (b0, b1) = (bounds[:-1], bounds[1:])
+    #
+    # a split's value from a cumulative column
+    def diff(c):
+        return c[b1] - c[b0]
+    #
+    # the average over a mask, w/ cumulative sums
+    def average(v, m):
+        s = diff(np.cumsum(np.where(m, v, 0), dtype = np.float64))
+        k = diff(np.cumsum(m))
+        return np.where(k > 0, s/np.maximum(k, 1), 0.0)
+    #
+    # the elevation gain, ft, of the smoothed altitude w/ a hysteresis
+    dAlt = np.diff(hystAlt(ride['SmoothAltitude'], gainHyst*mtr2feet),
+                   prepend = 0.0)
+    gain = diff(np.cumsum(np.maximum(dAlt, 0)))
+    #
+    toUnit = 1.0 if unit == 'mi' else 1.0/km2mi
+    time   = diff(ride['Time'])
+    mTime  = diff(ride['MovingTime'])
+    mDist  = diff(ride['MovingDistance'])
+    with np.errstate(invalid = 'ignore', divide = 'ignore'):
+        vel = np.where(mTime > 0, mDist/(mTime/60.0), 0.0)
+    #
+    # the max HR, over the pts after the split's 1st one to its last one
+    hr = np.where(masks('heartRate'), ride['HeartRate'], 0)
+    maxHR = np.maximum.reduceat(hr, b0+1) if b0.size > 0 else np.zeros(0)
+    #
+    units = {'mi': ('mi', 'mph'), 'km': ('km', 'km/h')}[unit]
+    splits = Track({'unit': unit})
+    for (name, values, u) in (
+            ('Start',        ride['Time'][b0],               'min'),
+            ('Distance',     diff(ride['Distance'])*toUnit,  units[0]),
+            ('Time',         time,                           'min'),
+            ('MovingTime',   mTime,                          'min'),
+            ('Velocity',     vel*toUnit,                     units[1]),
+            ('HeartRate',    average(ride['HeartRate'],
+                                     masks('heartRate')),    'bpm'),
+            ('MaxHeartRate', maxHR,                          'bpm'),
+            ('Cadence',      average(ride['Cadence'],
+                                     masks('cadence')),      'rpm'),
+            ('Gain',         gain,                           'ft')):
+        splits.addColumn(name, values, u, np.float64)
+    return splits
+#
+# ------------------------------------------------------------------------
+# print the splits
+def printSplits(splits,
+                title = 'Splits'):
+    """
+    print the splits as a table, one line per split
+    """
+    print(title)
+    u = splits.units
+    print(('{:>3s} {:>8s} {:>7s} {:>8s} {:>8s} {:>6s} ' +
+           '{:>5s} {:>5s} {:>5s} {:>5s}').
+          format('#', 'start', u['Distance'], 'time', 'moving',
+                 u['Velocity'], 'HR', 'maxHR', 'cad', 'gain'))
+    for i in range(len(splits)):
+        print(('{:3d} {:>8s} {:7.2f} {:>8s} {:>8s} {:6.2f} ' +
+               '{:5.1f} {:5.0f} {:5.1f} {:5.0f}').
+              format(i+1, formatTime(splits['Start'][i]),
+                     splits['Distance'][i],
+                     formatTime(splits['Time'][i]),
+                     formatTime(splits['MovingTime'][i]),
+                     splits['Velocity'][i], splits['HeartRate'][i],
+                     splits['MaxHeartRate'][i], splits['Cadence'][i],
+                     splits['Gain'][i]))
@@ -0,0 +1,180 @@
+#
+# stats lib: masked statistics of a processed ride
+#  statMasks
+#  statAggs
+#  statTable
+#  MaskCache
+#  maskedStats()
+#  RunningStats
+# <- Last updated: Tue Oct 20 05:31:14 2026 -> SGK
+#
+# each stat is declared in statTable as an aggregate of one column over
+# the pts selected by a mask; the masks are declared in statMasks and
+# computed once per ride (MaskCache), and each (column, mask) pair is
+# extracted once for all its aggregates, the percentiles in one call;
+# when no pt passes a mask the stat is set to its fill value, and the
+# count ('count' aggregate) is 0, nothing is divided by 0
+#
+# RunningStats keeps, for each (column, mask), the count, sum, sum of
+# squares, min and max of the pts added so far, so the mean, std, min and
+# max are updated at the cost of the new pts only; the percentiles need
+# all the pts, they are left to maskedStats()
+#
+import numpy as np
+#
+# the masks: name -> fcn(ride, opts, masks), where masks(name) returns
+#  another (cached) mask, and opts has velMin, velMax, hrMin and cadMin
+statMasks = {
+    'moving':    lambda ride, o, masks: (ride['Velocity'] > o['velMin']) &
+                                        (ride['Velocity'] < o['velMax']),
+    'heartRate': lambda ride, o, masks: masks('moving') &
+                                        (ride['HeartRate'] > o['hrMin']),
+    'cadence':   lambda ride, o, masks: masks('moving') &
+                                        (ride['Cadence'] > o['cadMin']),
+    'located':   lambda ride, o, masks: masks('moving') &
+                                        np.isfinite(ride['XPosition']) &
+                                        np.isfinite(ride['YPosition'])}
+#
+# the aggregates: name -> fcn(values), values is a non empty float64 array
+#  count and pNN (NNth percentile) are handled by maskedStats()
+statAggs = {'mean': np.mean,
+            'max':  np.max,
+            'min':  np.min,
+            'std':  np.std}
+#
+# the same, from the running sums: fcn(n, sum, sum of squares, min, max),
+#  n > 0
+runningAggs = {'mean': lambda n, s, s2, lo, hi: s/n,
+               'max':  lambda n, s, s2, lo, hi: hi,
+               'min':  lambda n, s, s2, lo, hi: lo,
+               'std':  lambda n, s, s2, lo, hi:
+               np.sqrt(max(s2/n - (s/n)**2, 0.0))}
+#
+# the stats: (key, column, mask, aggregate, fill value if no pts)
+statTable = (('nMVel',          'Velocity',  'moving',    'count', 0),
+             ('avgMVel',        'Velocity',  'moving',    'mean',  0.0),
+             ('maxMVel',        'Velocity',  'moving',    'max',   0.0),
+             ('stdMVel',        'Velocity',  'moving',    'std',   0.0),
+             ('p50MVel',        'Velocity',  'moving',    'p50',   0.0),
+             ('p95MVel',        'Velocity',  'moving',    'p95',   0.0),
+             ('nHeartRate',     'HeartRate', 'heartRate', 'count', 0),
+             ('avgHeartRate',   'HeartRate', 'heartRate', 'mean',  0.0),
+             ('maxHeartRate',   'HeartRate', 'heartRate', 'max',   0.0),
+             ('stdHeartRate',   'HeartRate', 'heartRate', 'std',   0.0),
+             ('p50HeartRate',   'HeartRate', 'heartRate', 'p50',   0.0),
+             ('p95HeartRate',   'HeartRate', 'heartRate', 'p95',   0.0),
+             ('nCadence',       'Cadence',   'cadence',   'count', 0),
+             ('avgCadence',     'Cadence',   'cadence',   'mean',  0.0),
+             ('maxCadence',     'Cadence',   'cadence',   'max',   0.0),
+             ('stdCadence',     'Cadence',   'cadence',   'std',   0.0),
+             ('p50Cadence',     'Cadence',   'cadence',   'p50',   0.0),
+             ('p95Cadence',     'Cadence',   'cadence',   'p95',   0.0))
+#
+# ------------------------------------------------------------------------
+# compute each mask once
+class MaskCache:
+    """
+    masks = MaskCache(ride, opts)
+    masks('moving')     the mask, computed on the 1st call, see statMasks
+      ride - a columnlib.Track w/ the rideColumns
+      opts - dict w/ velMin, velMax, hrMin, cadMin
+    """
+    #
+    def __init__(self, ride, opts,
+                 masks = statMasks):
+        self.ride  = ride
+        self.opts  = opts
+        self.masks = masks
+        self.cache = {}
+    #
+    def __call__(self, name):
+        if name not in self.cache:
+            self.cache[name] = self.masks[name](self.ride, self.opts, self)
+        return self.cache[name]
+#
+# ------------------------------------------------------------------------
+# compute the stats of statTable
+def maskedStats(ride, opts,
+                table = statTable,
+                masks = None):
+    """
+    stats = maskedStats(ride, opts, table, masks)
+      ride  - a columnlib.Track w/ the rideColumns
+      opts  - dict w/ velMin, velMax, hrMin, cadMin
+      table - the stats to compute, see statTable
+      masks - a MaskCache to reuse, if any
+      returns {key: value}, floats (ints for counts)
+    """
+    if masks is None:
+        masks = MaskCache(ride, opts)
+    #
+    # group the stats by (column, mask)
+    groups = {}
+    for (key, column, mask, agg, fill) in table:
+        groups.setdefault((column, mask), []).append((key, agg, fill))
+    #
+    stats = {}
+    for ((column, mask), rows) in groups.items():
+        values = ride[column][masks(mask)].astype(np.float64)
+        n = values.size
+        #
+        # all the percentiles at once
+        pcts = [agg for (key, agg, fill) in rows if agg[0] == 'p']
+        if (n > 0) and pcts:
+            pcts = dict(zip(pcts, np.percentile(values,
+                                                [float(p[1:]) for p in pcts])))
+        #
+        for (key, agg, fill) in rows:
+            if agg == 'count':
+                stats[key] = n
+            elif n == 0:
+                stats[key] = fill
+            elif agg[0] == 'p':
+                stats[key] = float(pcts[agg])
+            else:
+                stats[key] = float(statAggs[agg](values))
+    return stats
+#
+# ------------------------------------------------------------------------
+# the stats of statTable, updated as the pts are added
+class RunningStats:
+    """
+    running = RunningStats(opts, table)
+    running.add(part)       the new pts, a columnlib.Track w/ the columns
+                            the table and its masks use
+    running.stats()         the stats so far, w/out the percentiles
+      opts, table - see maskedStats()
+    add() costs O(new pts), stats() O(table)
+    """
+    #
+    def __init__(self, opts,
+                 table = statTable):
+        self.opts  = opts
+        self.table = [row for row in table if row[3][0] != 'p']
+        # (column, mask) -> [n, sum, sum of squares, min, max]
+        self.sums = dict([((column, mask), [0, 0.0, 0.0, np.inf, -np.inf])
+                          for (key, column, mask, agg, fill) in self.table])
+    #
+    def add(self, part):
+        masks = MaskCache(part, self.opts)
+        for ((column, mask), sums) in self.sums.items():
+            values = part[column][masks(mask)].astype(np.float64)
+            if values.size == 0:
+                continue
+            sums[0] += values.size
+            sums[1] += values.sum()
+            sums[2] += (values*values).sum()
+            sums[3] = min(sums[3], values.min())
+            sums[4] = max(sums[4], values.max())
+    #
+    def stats(self):
+        stats = {}
+        for (key, column, mask, agg, fill) in self.table:
+            sums = self.sums[(column, mask)]
+            if agg == 'count':
+                stats[key] = sums[0]
+            elif sums[0] == 0:
+                stats[key] = fill
+            else:
+                stats[key] = float(runningAggs[agg](*sums))
+        return stats
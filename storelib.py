@@ -0,0 +1,203 @@
+#
+# store lib: save processed rides as columns, load a corpus of them
+#  storeRide()
+#  indexCorpus()
+#  loadRide()
+#  Corpus
+# <- Last updated: Tue Oct 20 07:21:30 2026 -> SGK
+#
+# a corpus is a directory w/ a sub directory per ride, holding one .npy
+# file per column and a ride.json w/ its no. of pts, columns, units, meta
+# and stats, and an index (corpus.json) of all the ride.json; opening a
+# corpus reads only the index, and a column is memory-mapped
+# (np.load(mmap_mode = 'r')) when first accessed, so only the columns used
+# are read from disk, and only the pages touched stay resident
+#
+# the .npy layout needs nothing but numpy, and each column is a plain
+# array on disk, so selecting a column never reads the others
+#
+import os, json
+import numpy as np
+import pandas as pd
+#
+from columnlib import Track
+#
+indexName    = 'corpus.json'
+rideFileName = 'ride.json'
+#
+# ------------------------------------------------------------------------
+# numpy values to JSON
+def toJSON(x):
+    if isinstance(x, np.ndarray):
+        return x.tolist()
+    if isinstance(x, np.generic):
+        return x.item()
+    raise TypeError('storelib: cannot save a '+type(x).__name__)
+#
+# ------------------------------------------------------------------------
+# write a file, to a temp file renamed when complete
+def writeFile(fn, write,
+              mode = 'w'):
+    tmp = fn+'.tmp'
+    with open(tmp, mode) as f:
+        write(f)
+    os.replace(tmp, fn)
+#
+# ------------------------------------------------------------------------
+# save a processed ride
+def storeRide(ride, stats, dirName,
+              name = None,
+              update = True):
+    """
+    name = storeRide(ride, stats, dirName, name, update)
+      ride    - a processed ride (columnlib.Track), all its columns are
+                saved, the lazy ones are computed
+      stats   - its stats
+      dirName - the corpus directory, created if needed
+      name    - the ride's name in the corpus, by default the name of
+                stats['fileName'] w/out its extension(s); a ride saved
+                again is replaced
+      update  - add the ride to the index, or leave it to indexCorpus(),
+                when storing many rides
+    """
+    if name is None:
+        if 'fileName' not in stats:
+            raise ValueError('storeRide(): no name and no stats[\'fileName\']')
+        name = os.path.basename(stats['fileName']).split('.')[0]
+    rideDir = os.path.join(dirName, name)
+    os.makedirs(rideDir, exist_ok = True)
+    #
+    dtypes = {}
+    for column in ride.names:
+        values = np.ascontiguousarray(ride[column])
+        dtypes[column] = values.dtype.str
+        writeFile(os.path.join(rideDir, column+'.npy'),
+                  lambda f: np.save(f, values), 'wb')
+    #
+    entry = {'n':      len(ride),
+             'units':  dict([(c, ride.units[c]) for c in ride.names]),
+             'dtypes': dtypes,
+             'meta':   ride.meta,
+             'stats':  stats}
+    writeFile(os.path.join(rideDir, rideFileName),
+              lambda f: json.dump(entry, f, default = toJSON))
+    #
+    # update the index
+    if update:
+        index = Corpus.readIndex(dirName)
+        index[name] = json.loads(json.dumps(entry, default = toJSON))
+        writeFile(os.path.join(dirName, indexName),
+                  lambda f: json.dump(index, f))
+    return name
+#
+# ------------------------------------------------------------------------
+# rebuild the index
+def indexCorpus(dirName):
+    """
+    n = indexCorpus(dirName)
+      (re)write the index of the corpus in dirName from the ride.json of
+      each ride, returns the no. of rides
+    """
+    os.makedirs(dirName, exist_ok = True)
+    index = {}
+    for name in sorted(os.listdir(dirName)):
+        fn = os.path.join(dirName, name, rideFileName)
+        if os.path.isfile(fn):
+            with open(fn) as f:
+                index[name] = json.load(f)
+    writeFile(os.path.join(dirName, indexName),
+              lambda f: json.dump(index, f))
+    return len(index)
+#
+# ------------------------------------------------------------------------
+# a stored ride, w/out the index
+def loadRide(dirName, name,
+             entry = None):
+    """
+    ride = loadRide(dirName, name, entry)
+      the ride name of the corpus in dirName, as a columnlib.Track whose
+      columns are memory-mapped when accessed, entry is its ride.json
+      (read if None)
+    """
+    rideDir = os.path.join(dirName, name)
+    if entry is None:
+        with open(os.path.join(rideDir, rideFileName)) as f:
+            entry = json.load(f)
+    ride = Track(entry['meta'])
+    for (column, unit) in entry['units'].items():
+        ride.addDerived(column,
+                        lambda t, c = column: np.load(
+                            os.path.join(rideDir, c+'.npy'), mmap_mode = 'r'),
+                        unit)
+    return ride
+#
+# ------------------------------------------------------------------------
+# a corpus of stored rides
+class Corpus:
+    """
+    corpus = Corpus(dirName)
+    corpus.names                    the rides' names, sorted
+    corpus.stats(name)              a ride's stats
+    corpus[name]                    a ride, as a columnlib.Track whose
+                                    columns are memory-mapped when accessed
+    corpus.column('Velocity')       {name: column}, memory-mapped
+    corpus.statsFrame()             the stats as a pandas data frame,
+                                    one row per ride
+    only the index is read when the corpus is opened
+    """
+    #
+    def __init__(self, dirName):
+        self.dirName = dirName
+        self.index = Corpus.readIndex(dirName)
+        self.rides = {}
+    #
+    @staticmethod
+    def readIndex(dirName):
+        fn = os.path.join(dirName, indexName)
+        if not os.path.exists(fn):
+            return {}
+        with open(fn) as f:
+            return json.load(f)
+    #
+    @property
+    def names(self):
+        return sorted(self.index)
+    #
+    def __len__(self):
+        return len(self.index)
+    #
+    def __contains__(self, name):
+        return name in self.index
+    #
+    def stats(self, name):
+        """
+        the stats of a ride
+        """
+        return self.index[name]['stats']
+    #
+    def __getitem__(self, name):
+        if name not in self.rides:
+            self.rides[name] = loadRide(self.dirName, name, self.index[name])
+        return self.rides[name]
+    #
+    def column(self, column,
+               names = None):
+        """
+        {name: column} for the rides in names (all by default)
+        """
+        if names is None:
+            names = self.names
+        return dict([(name, self[name][column]) for name in names])
+    #
+    def statsFrame(self,
+                   keys = None):
+        """
+        the stats (only keys, if given) as a data frame, indexed by name
+        """
+        rows = []
+        for name in self.names:
+            stats = self.stats(name)
+            rows.append(dict([(k, v) for (k, v) in stats.items()
+                              if (keys is None or k in keys) and
+                              not isinstance(v, (dict, list))]))
+        return pd.DataFrame(rows, index = self.names)
@@ -0,0 +1,24 @@
+#
+# pytest setup: the libs are top-level modules in the repo's root,
+#  the sample rides are the *.tcx files there
+# <- Last updated: Tue Oct 20 07:23:05 2026 -> SGK
+#
+import os, sys, glob
+import pytest
+#
+rootDir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if rootDir not in sys.path:
+    sys.path.insert(0, rootDir)
+#
+# no display, for the plots
+os.environ.setdefault('MPLBACKEND', 'Agg')
+#
+tcxFiles = sorted(glob.glob(os.path.join(rootDir, '*.tcx')))
+#
+@pytest.fixture(params = tcxFiles, ids = os.path.basename)
+def sampleFile(request):
+    return request.param
+#
+@pytest.fixture
+def sampleFiles():
+    return list(tcxFiles)
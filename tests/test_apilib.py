@@ -0,0 +1,124 @@
+#
+# tests of the HTTP API: several requests per connection (keep-alive),
+#  w/ the bodies of the requests answered early skipped
+# <- Last updated: Tue Oct 20 07:34:06 2026 -> SGK
+#
+import os, sys, glob, json, socket, subprocess
+import pytest
+#
+rootDir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+#
+@pytest.fixture(scope = 'module')
+def server():
+    """
+    a serve-tcx.py w/ 1 worker on a free port, yields the port
+    """
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        port = s.getsockname()[1]
+    srv = subprocess.Popen([sys.executable,
+                            os.path.join(rootDir, 'serve-tcx.py'),
+                            '-port', str(port), '-workers', '1'],
+                           cwd = rootDir, stdout = subprocess.PIPE,
+                           stderr = subprocess.DEVNULL, text = True)
+    try:
+        # it prints a line once it is serving
+        assert srv.stdout.readline().startswith('serving on')
+        yield port
+    finally:
+        srv.terminate()
+        srv.wait()
+#
+@pytest.fixture(scope = 'module')
+def body():
+    with open(sorted(glob.glob(os.path.join(rootDir, '*.tcx')))[-1],
+              'rb') as f:
+        return f.read()
+#
+def request(method, path,
+            body = b'', headers = ''):
+    return '{} {} HTTP/1.1\r\nHost: test\r\nContent-Length: {}\r\n{}\r\n'.\
+        format(method, path, len(body), headers).encode() + body
+#
+def readResponse(f):
+    """
+    (code, headers, body) of the next response, None if closed
+    """
+    line = f.readline()
+    if not line:
+        return None
+    headers = {}
+    while True:
+        line2 = f.readline()
+        if line2 in (b'\r\n', b''):
+            break
+        (k, sep, v) = line2.decode().partition(':')
+        headers[k.strip().lower()] = v.strip()
+    data = f.read(int(headers['content-length']))
+    return (int(line.split()[1]), headers, data)
+#
+def connect(port):
+    c = socket.create_connection(('127.0.0.1', port), timeout = 60)
+    return (c, c.makefile('rb'))
+#
+# ------------------------------------------------------------------------
+def test_bad_query(server, body):
+    # a 400 before the body is read, then a valid request
+    (c, f) = connect(server)
+    with c:
+        c.sendall(request('POST', '/stats?foo=1', body) +
+                  request('POST', '/stats', body))
+        (code, headers, data) = readResponse(f)
+        assert code == 400 and b'foo' in data
+        assert headers['connection'] == 'keep-alive'
+        (code, headers, data) = readResponse(f)
+        assert code == 200
+        stats = json.loads(data)
+        assert stats['distance'] > 30
+#
+def test_not_found(server, body):
+    # a 404 w/ a chunked body, a GET, then the same POST twice (cached)
+    (c, f) = connect(server)
+    with c:
+        c.sendall(b'POST /nope HTTP/1.1\r\nTransfer-Encoding: chunked\r\n'
+                  b'\r\n5\r\nhello\r\n6\r\n world\r\n0\r\n\r\n' +
+                  b'GET /status HTTP/1.1\r\n\r\n' +
+                  request('POST', '/stats?velMin=8', body) +
+                  request('POST', '/stats?velMin=8', body))
+        assert readResponse(f)[0] == 404
+        (code, headers, data) = readResponse(f)
+        assert code == 200 and 'requests' in json.loads(data)
+        (code, headers, data) = readResponse(f)
+        assert code == 200
+        (code2, headers2, data2) = readResponse(f)
+        assert code2 == 200 and headers2['x-cache'] == 'hit'
+        assert data2 == data
+#
+def test_wrong_method(server, body):
+    # a 405 w/ a body, then a GET
+    (c, f) = connect(server)
+    with c:
+        c.sendall(request('GET', '/stats', body) +
+                  request('GET', '/status'))
+        assert readResponse(f)[0] == 405
+        assert readResponse(f)[0] == 200
+#
+def test_close(server):
+    # Connection: close, and a malformed request, end the connection
+    for req in (request('GET', '/status', headers = 'Connection: close\r\n'),
+                b'GARBAGE\r\n\r\n'):
+        (c, f) = connect(server)
+        with c:
+            c.sendall(req + request('GET', '/status'))
+            (code, headers, data) = readResponse(f)
+            assert code in (200, 400)
+            assert headers['connection'] == 'close'
+            assert readResponse(f) is None
+#
+def test_not_a_track(server):
+    (c, f) = connect(server)
+    with c:
+        c.sendall(request('POST', '/stats', b'not a track') +
+                  request('GET', '/status'))
+        assert readResponse(f)[0] == 422
+        assert readResponse(f)[0] == 200
@@ -0,0 +1,54 @@
+#
+# tests of the columnar track
+# <- Last updated: Tue Oct 20 07:28:02 2026 -> SGK
+#
+import numpy as np
+import pytest
+#
+from columnlib import makeTrack
+#
+def makeTestTrack(n = 10):
+    t = 1619882013.0 + np.arange(n)
+    return makeTrack(t, np.linspace(-71.1, -71.0, n),
+                     np.linspace(42.3, 42.4, n),
+                     hr = np.where(np.arange(n) % 3, 120, np.nan),
+                     meta = {'format': 'tcx',
+                             'lapStart': np.array([0, 4, 7]),
+                             'activityStart': np.array([0])})
+#
+def test_make():
+    track = makeTestTrack()
+    assert track.names == ['Time', 'Longitude', 'Latitude', 'Altitude',
+                           'HeartRate', 'Cadence']
+    assert track['HeartRate'].dtype == np.int16
+    assert list(track['HeartRate'][:4]) == [0, 120, 120, 0]
+    assert np.all(np.isnan(track['Altitude']))
+    with pytest.raises(ValueError):
+        track.addColumn('Speed', np.zeros(3))
+#
+def test_derived():
+    track = makeTestTrack()
+    calls = []
+    def fcn(track):
+        calls.append(1)
+        return track['Time'] - track['Time'][0]
+    track.addDerived('Elapsed', fcn, 's')
+    assert 'Elapsed' in track and 'Elapsed' in track.names
+    assert track['Elapsed'][-1] == 9
+    track['Elapsed']
+    assert len(calls) == 1
+#
+@pytest.mark.parametrize('i, j, laps, acts', [(0, 10, [0, 4, 7], [0]),
+                                              (2, 8, [2, 5], []),
+                                              (4, 20, [0, 3], []),
+                                              (8, 10, [], [])])
+def test_slice(i, j, laps, acts):
+    track = makeTestTrack()
+    part = track.slice(i, j)
+    assert len(part) == min(j, 10) - i
+    # views, not copies
+    assert np.shares_memory(part['Time'], track['Time'])
+    # the laps that start in the slice, from its 1st pt
+    assert list(part.meta['lapStart']) == laps
+    assert list(part.meta['activityStart']) == acts
+    assert list(track.meta['lapStart']) == [0, 4, 7]
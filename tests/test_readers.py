@@ -0,0 +1,139 @@
+#
+# tests of the readers: TCX (XML and fast scan), GPX, FIT, compressed
+# <- Last updated: Tue Oct 20 07:23:41 2026 -> SGK
+#
+import gzip, bz2, zipfile
+from datetime import datetime, timezone
+import numpy as np
+import pytest
+#
+from readlib  import detectFormat, readFile, iterTracks
+from fitlib   import readFIT, writeFIT, fitCRC
+from tracklib import readTrack
+#
+def sameColumns(track1, track2,
+                atol = None):
+    """
+    assert the raw columns are the same, w/in atol (per column) if given
+    """
+    atol = atol or {}
+    assert len(track1) == len(track2)
+    for name in ('Time', 'Longitude', 'Latitude', 'Altitude',
+                 'HeartRate', 'Cadence'):
+        np.testing.assert_allclose(track1[name], track2[name],
+                                   atol = atol.get(name, 0), rtol = 0,
+                                   equal_nan = True, err_msg = name)
+#
+# ------------------------------------------------------------------------
+# write a track as GPX, w/ the usual HR/cadence extensions
+def writeGPX(track, fn):
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>',
+             '<gpx version="1.1" creator="test"' +
+             ' xmlns="http://www.topografix.com/GPX/1/1"' +
+             ' xmlns:gpxtpx="http://www.garmin.com/xmlschemas/' +
+             'TrackPointExtension/v1">', '<trk>', '<trkseg>']
+    laps = set(track.meta.get('lapStart', [])) - {0}
+    for i in range(len(track)):
+        if i in laps:
+            lines += ['</trkseg>', '<trkseg>']
+        t = datetime.fromtimestamp(track['Time'][i], timezone.utc)
+        pt = '<trkpt lat="{!r}" lon="{!r}">'.format(
+            float(track['Latitude'][i]), float(track['Longitude'][i]))
+        if np.isfinite(track['Altitude'][i]):
+            pt += '<ele>{!r}</ele>'.format(float(track['Altitude'][i]))
+        pt += '<time>'+t.strftime('%Y-%m-%dT%H:%M:%SZ')+'</time>'
+        ext = ''.join(['<gpxtpx:{0}>{1}</gpxtpx:{0}>'.format(tag, v)
+                       for (tag, v) in (('hr', track['HeartRate'][i]),
+                                        ('cad', track['Cadence'][i]))
+                       if v > 0])
+        if ext:
+            pt += '<extensions><gpxtpx:TrackPointExtension>' + ext + \
+                '</gpxtpx:TrackPointExtension></extensions>'
+        lines.append(pt+'</trkpt>')
+    lines += ['</trkseg>', '</trk>', '</gpx>']
+    with open(fn, 'w') as f:
+        f.write('\n'.join(lines))
+#
+# ------------------------------------------------------------------------
+def test_formats():
+    assert detectFormat(b'<?xml version="1.0"?>\n<TrainingCenterDatabase') \
+        == 'tcx'
+    assert detectFormat(b'<?xml version="1.0"?>\n<gpx version="1.1">') \
+        == 'gpx'
+    assert detectFormat(b'\x0e\x10\x00\x00\x00\x00\x00\x00.FIT') == 'fit'
+    assert detectFormat(b'hello') is None
+#
+def test_tcx(sampleFile):
+    track = readTrack(sampleFile, silent = True)
+    assert track.meta['format'] == 'tcx'
+    assert len(track) > 100
+    assert np.all(np.diff(track['Time']) >= 0)
+    assert np.all(np.abs(track['Latitude'][np.isfinite(track['Latitude'])])
+                  <= 90)
+    assert track.meta['lapStart'][0] == 0
+#
+def test_fast_scan(sampleFile):
+    # the byte scan and the XML parser read the same values
+    sameColumns(readTrack(sampleFile, silent = True),
+                readTrack(sampleFile, silent = True, fast = True),
+                atol = {'Longitude': 1e-12, 'Latitude': 1e-12,
+                        'Altitude': 1e-4})
+#
+def test_gpx(sampleFile, tmp_path):
+    track = readTrack(sampleFile, silent = True)
+    fn = str(tmp_path/'ride.gpx')
+    writeGPX(track, fn)
+    gpx = readFile(fn)
+    assert gpx.meta['format'] == 'gpx'
+    sameColumns(track, gpx)
+    np.testing.assert_array_equal(gpx.meta['lapStart'],
+                                  track.meta['lapStart'])
+#
+def test_fit(sampleFile, tmp_path):
+    track = readTrack(sampleFile, silent = True)
+    fn = str(tmp_path/'ride.fit')
+    writeFIT(track, fn)
+    with open(fn, 'rb') as f:
+        buf = f.read()
+    # the file's CRC, then the whole file's, is 0
+    assert fitCRC(buf) == 0
+    fit = readFile(fn)
+    assert fit.meta['format'] == 'fit'
+    # lon/lat in semicircles, the altitude in 1/5 m
+    sameColumns(track, fit,
+                atol = {'Time': 0.5, 'Longitude': 1e-7, 'Latitude': 1e-7,
+                        'Altitude': 0.1 + 1e-3})
+    np.testing.assert_array_equal(fit.meta['lapStart'],
+                                  track.meta['lapStart'])
+    # the same from a file object
+    with open(fn, 'rb') as f:
+        sameColumns(fit, readFIT(f))
+#
+@pytest.mark.parametrize('pack', ['gz', 'bz2'])
+def test_compressed(pack, sampleFiles, tmp_path):
+    fn = sampleFiles[0]
+    track = readTrack(fn, silent = True)
+    with open(fn, 'rb') as f:
+        buf = f.read()
+    out = str(tmp_path/('ride.tcx.'+pack))
+    with (gzip.open if pack == 'gz' else bz2.open)(out, 'wb') as f:
+        f.write(buf)
+    sameColumns(track, readFile(out))
+    # fast falls back to the XML reader
+    sameColumns(track, readFile(out, fast = True))
+#
+def test_archive(sampleFiles, tmp_path):
+    (fn1, fn2) = sampleFiles[:2]
+    track1 = readTrack(fn1, silent = True)
+    fit = str(tmp_path/'ride.fit')
+    writeFIT(track1, fit)
+    out = str(tmp_path/'rides.zip')
+    with zipfile.ZipFile(out, 'w') as z:
+        z.write(fit, 'ride1.fit')
+        z.writestr('notes.txt', 'not a track')
+        z.write(fn2, 'ride2.tcx')
+    tracks = list(iterTracks(out))
+    assert [t.meta['fileName'] for t in tracks] == \
+        [out+'/ride1.fit', out+'/ride2.tcx']
+    assert [t.meta['format'] for t in tracks] == ['fit', 'tcx']
+    sameColumns(readTrack(fn2, silent = True), tracks[1])
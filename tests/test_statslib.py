@@ -0,0 +1,73 @@
+#
+# tests of the masked stats, w/ and w/out pts in the masks
+# <- Last updated: Tue Oct 20 07:29:15 2026 -> SGK
+#
+import warnings
+import numpy as np
+import pytest
+#
+from columnlib import Track
+from statslib  import statTable, maskedStats, RunningStats
+#
+opts = {'velMin': 6.0, 'velMax': 50.0, 'hrMin': 50, 'cadMin': 10}
+#
+def makeRide(vel, hr, cad):
+    ride = Track()
+    for (name, values) in (('Velocity', vel), ('HeartRate', hr),
+                           ('Cadence', cad)):
+        ride.addColumn(name, np.asarray(values, dtype = np.float64))
+    ride.addColumn('XPosition', np.zeros(len(ride)))
+    ride.addColumn('YPosition', np.zeros(len(ride)))
+    return ride
+#
+def test_values():
+    ride = makeRide([2, 10, 20, 30, 60], [0, 120, 140, 160, 170],
+                    [0, 80, 90, 5, 100])
+    stats = maskedStats(ride, opts)
+    # moving: 10, 20, 30, HR and cadence of the moving pts
+    assert (stats['nMVel'], stats['avgMVel'], stats['maxMVel']) == \
+        (3, 20.0, 30.0)
+    assert np.isclose(stats['stdMVel'], np.std([10, 20, 30]))
+    assert stats['p50MVel'] == 20.0
+    assert (stats['nHeartRate'], stats['avgHeartRate']) == (3, 140.0)
+    assert (stats['nCadence'], stats['avgCadence'], stats['maxCadence']) \
+        == (2, 85.0, 90.0)
+    assert set(stats) == set([row[0] for row in statTable])
+#
+@pytest.mark.parametrize('vel, hr, cad', [
+    ([], [], []),                       # no pts
+    ([1, 2, 3], [120]*3, [80]*3),       # not moving
+    ([10, 20, 30], [0]*3, [0]*3)])      # no HR, no cadence
+def test_no_pts(vel, hr, cad):
+    ride = makeRide(vel, hr, cad)
+    running = RunningStats(opts)
+    running.add(ride)
+    # no warning (ie mean of an empty slice), the fill values
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        stats = maskedStats(ride, opts)
+        rstats = running.stats()
+    # the count of each (column, mask)
+    counts = dict([((column, mask), key)
+                   for (key, column, mask, agg, fill) in statTable
+                   if agg == 'count'])
+    for (key, column, mask, agg, fill) in statTable:
+        if stats[counts[(column, mask)]] == 0:
+            assert stats[key] == (0 if agg == 'count' else fill), key
+        if key in rstats:
+            assert rstats[key] == stats[key], key
+    assert stats['nHeartRate'] == 0
+#
+def test_running():
+    rng = np.random.default_rng(1)
+    (vel, hr, cad) = (rng.uniform(0, 40, 1000), rng.integers(0, 180, 1000),
+                      rng.integers(0, 110, 1000))
+    ride = makeRide(vel, hr, cad)
+    stats = maskedStats(ride, opts)
+    running = RunningStats(opts)
+    for i in range(0, 1000, 77):
+        running.add(ride.slice(i, i+77))
+    rstats = running.stats()
+    assert 'p95MVel' not in rstats
+    for (key, v) in rstats.items():
+        assert np.isclose(v, stats[key], rtol = 1e-9), key
@@ -0,0 +1,88 @@
+#
+# tests of the incremental processing: batches of pts vs the whole ride
+# <- Last updated: Tue Oct 20 07:26:12 2026 -> SGK
+#
+import threading, time
+import numpy as np
+import pytest
+#
+from tracklib import readTrack, TrackProcessor, processTrack, followTrack
+#
+def sameStats(stats1, stats2):
+    """
+    assert the stats in stats2 are the same as in stats1 (w/in rounding)
+    """
+    for (k, v) in stats2.items():
+        if isinstance(v, float):
+            assert np.isclose(stats1[k], v, rtol = 1e-9, atol = 1e-12), k
+        else:
+            assert stats1[k] == v, k
+#
+def sameRide(ride1, ride2):
+    assert ride1.names == ride2.names
+    for name in ride1.names:
+        np.testing.assert_allclose(ride1[name], ride2[name], rtol = 1e-6,
+                                   atol = 1e-9, equal_nan = True,
+                                   err_msg = name)
+#
+# ------------------------------------------------------------------------
+@pytest.mark.parametrize('batch', [1, 60, 997])
+def test_batches(sampleFile, batch):
+    track = readTrack(sampleFile, silent = True)
+    (ride, stats) = processTrack(track, silent = True)
+    # w/ the same x/y ref as the whole ride
+    refs = {'lonRef': stats['lonRef'], 'latRef': stats['latRef']}
+    proc = TrackProcessor(**refs)
+    for i in range(0, len(track), batch):
+        proc.update(track.slice(i, i+batch))
+    sameRide(ride, proc.ride)
+    np.testing.assert_array_equal(proc.ride.meta['lapStart'],
+                                  track.meta['lapStart'])
+    # the final stats, and the running ones (w/out the percentiles)
+    sameStats(stats, proc.stats(final = True))
+    running = proc.stats()
+    assert 'p50MVel' not in running
+    sameStats(stats, running)
+#
+def test_running(sampleFile):
+    # the running stats after each batch are those of the pts so far
+    track = readTrack(sampleFile, silent = True)
+    n = len(track)
+    proc = TrackProcessor()
+    for i in range(0, n, n//4):
+        proc.update(track.slice(i, i+n//4))
+        part = TrackProcessor(lonRef = proc.lonRef, latRef = proc.latRef)
+        part.update(track.slice(0, i+n//4))
+        sameStats(part.stats(), proc.stats())
+#
+def test_empty():
+    proc = TrackProcessor()
+    stats = proc.stats()
+    assert (stats['startTime'], stats['distance'], stats['nMVel']) == \
+        ('', 0.0, 0)
+#
+def test_follow(sampleFiles, tmp_path, capsys):
+    # follow a copy of a file written piece by piece
+    fn = sampleFiles[-1]
+    (ride, stats) = processTrack(readTrack(fn, silent = True), silent = True)
+    with open(fn, 'rb') as f:
+        buf = f.read()
+    copy = str(tmp_path/'ride.tcx')
+    open(copy, 'wb').close()
+    def writer():
+        with open(copy, 'ab') as f:
+            for i in range(0, len(buf), 64*1024):
+                f.write(buf[i:i+64*1024])
+                f.flush()
+                time.sleep(0.02)
+    th = threading.Thread(target = writer)
+    th.start()
+    try:
+        (ride2, stats2) = followTrack(copy, poll = 0.01, idle = 10.0,
+                                      lonRef = stats['lonRef'],
+                                      latRef = stats['latRef'])
+    finally:
+        th.join()
+    capsys.readouterr()
+    sameRide(ride, ride2)
+    sameStats(stats, stats2)
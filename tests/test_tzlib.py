@@ -0,0 +1,101 @@
+#
+# tests of the time zones: the zone of a ride, the UTC offsets
+# <- Last updated: Tue Oct 20 07:32:48 2026 -> SGK
+#
+import zoneinfo
+from datetime import datetime
+import numpy as np
+import pytest
+#
+import tzlib
+from tzlib import findZone, zoneCoords, utcOffsets, localTimes, localTimeStr
+#
+# the offsets just before and at some transitions, UTC [s]
+transitions = [
+    ('America/New_York',    1615705200, -5*3600, -4*3600),  # 2021-03-14
+    ('America/New_York',    1636264800, -4*3600, -5*3600),  # 2021-11-07
+    ('America/Chicago',     1615708800, -6*3600, -5*3600),
+    ('America/Denver',      1615712400, -7*3600, -6*3600),
+    ('Europe/Paris',        1616893200,    3600,  2*3600),  # 2021-03-28
+    ('Europe/Paris',        1635642000,  2*3600,    3600),  # 2021-10-31
+    ('Australia/Sydney',    1617465600, 11*3600, 10*3600),  # 2021-04-04
+    ('America/Sao_Paulo',   1550368800, -2*3600, -3*3600)]  # 2019-02-17
+#
+@pytest.mark.parametrize('zone, t, before, after', transitions)
+def test_transitions(zone, t, before, after):
+    offsets = utcOffsets(np.array([t-3600, t-1, t, t+1, t+3600]), zone)
+    assert list(offsets) == [before]*2 + [after]*3
+#
+@pytest.mark.parametrize('zone', ['America/New_York', 'America/Chicago',
+                                  'America/Phoenix', 'Asia/Kolkata',
+                                  'Europe/London', 'Pacific/Auckland',
+                                  'America/Indiana/Indianapolis'])
+def test_offsets(zone):
+    # the same as zoneinfo's, at random times
+    rng = np.random.default_rng(2)
+    t = np.sort(rng.integers(0, 4102444800, 2000))
+    tz = zoneinfo.ZoneInfo(zone)
+    expected = [datetime.fromtimestamp(int(x), tz).utcoffset().
+                total_seconds() for x in t]
+    np.testing.assert_array_equal(utcOffsets(t, zone), expected)
+    np.testing.assert_array_equal(localTimes(t, zone), t + np.array(expected))
+#
+def test_time_str():
+    assert localTimeStr(1619882013, 'America/New_York') == \
+        '2021-05-01 11:13:33 EDT'
+    assert localTimeStr(1614265200, 'America/Chicago') == \
+        '2021-02-25 09:00:00 CST'
+    assert localTimeStr(1619882013, 'Europe/Paris') == \
+        '2021-05-01 17:13:33 CEST'
+    assert localTimeStr(1619882013, 'UTC') == '2021-05-01 15:13:33 UTC'
+#
+def test_unknown(capsys):
+    assert localTimeStr(1619882013, 'Nowhere/Test') == \
+        '2021-05-01 15:13:33 UTC'
+    assert 'Nowhere/Test not found' in capsys.readouterr().err
+    assert findZone(np.nan, 40.0) == 'UTC'
+#
+# ------------------------------------------------------------------------
+# the central US, where the nearest zone location is not the zone
+centralUS = [('Oklahoma City', -97.52, 35.47), ('Lincoln',  -96.70, 40.81),
+             ('Wichita',       -97.34, 37.69), ('Amarillo', -101.83, 35.22),
+             ('Tulsa',         -95.99, 36.15), ('Lubbock',  -101.85, 33.58)]
+#
+@pytest.mark.parametrize('name, lon, lat', centralUS)
+def test_central_us(name, lon, lat):
+    pytest.importorskip('timezonefinder')
+    assert findZone(lon, lat, t = 1619882013) == 'America/Chicago'
+#
+@pytest.mark.parametrize('lon, lat, zone', [(2.35, 48.86, 'Europe/Paris'),
+                                            (-112.07, 33.45,
+                                             'America/Phoenix'),
+                                            (-104.99, 39.74,
+                                             'America/Denver')])
+def test_polygons(lon, lat, zone):
+    pytest.importorskip('timezonefinder')
+    assert findZone(lon, lat) == zone
+#
+@pytest.fixture
+def noFinder(monkeypatch):
+    # as if timezonefinder was not installed
+    monkeypatch.setitem(tzlib.zoneCache, 'finder', None)
+    if len(zoneCoords()[0]) == 0:
+        pytest.skip('no zone1970.tab')
+#
+@pytest.mark.parametrize('name, lon, lat', centralUS)
+def test_central_us_guess(noFinder, capsys, name, lon, lat):
+    # w/out the polygons, not a silent wrong guess: a warning, and -tz
+    zone = findZone(lon, lat, t = 1619882013)
+    err = capsys.readouterr().err
+    assert 'is not clear, using '+zone in err
+    assert '-tz' in err
+#
+@pytest.mark.parametrize('lon, lat, zone', [(2.35, 48.86, 'Europe/Paris'),
+                                            (-104.99, 39.74,
+                                             'America/Denver'),
+                                            (-74.01, 40.71,
+                                             'America/New_York')])
+def test_guess(noFinder, capsys, lon, lat, zone):
+    # near a zone's location, and no zone w/ another offset near
+    assert findZone(lon, lat, t = 1619882013) == zone
+    assert capsys.readouterr().err == ''
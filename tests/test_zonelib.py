@@ -0,0 +1,128 @@
+#
+# tests of the time in zones and of the zone log's totals
+# <- Last updated: Tue Oct 20 07:30:27 2026 -> SGK
+#
+import json
+import numpy as np
+import pytest
+#
+from tracklib import readTrack, processTrack
+from statslib import MaskCache
+from zonelib  import zoneTable, zonesFor, zonesKey, zoneLabels, zoneTimes, \
+    periodKeys, ZoneLog
+#
+opts = {'velMin': 6.0, 'velMax': 50.0, 'hrMin': 50, 'cadMin': 10}
+#
+def test_times(sampleFile):
+    track = readTrack(sampleFile, silent = True)
+    (ride, stats) = processTrack(track, silent = True)
+    zones = zoneTimes(ride, opts)
+    masks = MaskCache(ride, opts)
+    for (column, mask, edges) in zoneTable:
+        t = zones[column]
+        assert t.size == len(edges)+1
+        # the zones add up to the time in the mask
+        assert np.isclose(t.sum(), ride['DeltaTime'][masks(mask)].sum(),
+                          rtol = 1e-6)
+        # and each zone is the time of its pts
+        v = ride[column][masks(mask)]
+        dt = ride['DeltaTime'][masks(mask)]
+        assert np.isclose(t[0], dt[v < edges[0]].sum(), rtol = 1e-6)
+        assert np.isclose(t[-1], dt[v >= edges[-1]].sum(), rtol = 1e-6)
+#
+def test_keys():
+    assert zoneLabels((110, 130)) == ['<110', '110..130', '>=130']
+    assert zonesKey({'HeartRate': (110, 130), 'Grade': (-1.5, 1)}) == \
+        'HeartRate:110,130 Grade:-1.5,1'
+    table = zonesFor({'hrZones': (100, 120, 140)})
+    assert table[0] == ('HeartRate', 'heartRate', (100, 120, 140))
+    assert table[1:] == zoneTable[1:]
+    assert zonesFor({}) == zoneTable
+    # Dec counts for next winter, weeks are ISO weeks
+    assert periodKeys('2021-05-01') == {'week': '2021-W17',
+                                        'month': '2021-05',
+                                        'season': '2021-spring',
+                                        'year': '2021'}
+    assert periodKeys('2020-12-31T10:00:00') == \
+        {'week': '2020-W53', 'month': '2020-12', 'season': '2021-winter',
+         'year': '2020'}
+    assert periodKeys('2021-01-03')['week'] == '2020-W53'
+#
+# ------------------------------------------------------------------------
+def someZones(x, table = zoneTable):
+    return dict([(column, x*np.arange(1, len(edges)+2, dtype = float))
+                 for (column, mask, edges) in table])
+#
+def test_totals(tmp_path):
+    fn = str(tmp_path/'zones.json')
+    log = ZoneLog(fn)
+    log.add('a.tcx', '2021-05-01', someZones(1))
+    log.add('b.tcx', '2021-05-02', someZones(2))
+    log.add('c.tcx', '2021-05-03', someZones(4))
+    weeks = log.totals('week')
+    assert sorted(weeks) == ['2021-W17', '2021-W18']
+    np.testing.assert_allclose(weeks['2021-W17']['Cadence'],
+                               someZones(3)['Cadence'])
+    np.testing.assert_allclose(log.totals('month')['2021-05']['Grade'],
+                               someZones(7)['Grade'])
+    # a ride added again replaces the previous one, even on another day
+    log.add('a.tcx', '2021-06-01', someZones(10))
+    np.testing.assert_allclose(log.totals('week')['2021-W17']['HeartRate'],
+                               someZones(2)['HeartRate'])
+    np.testing.assert_allclose(log.totals('month')['2021-06']['Velocity'],
+                               someZones(10)['Velocity'])
+    np.testing.assert_allclose(log.totals('season')['2021-spring']
+                               ['Velocity'], someZones(6)['Velocity'])
+    # saved and read back
+    log.save()
+    log2 = ZoneLog(fn)
+    for period in ('week', 'month', 'season', 'year'):
+        t1 = log.totals(period)
+        t2 = log2.totals(period)
+        assert sorted(t1) == sorted(t2)
+        for k in t1:
+            for column in t1[k]:
+                np.testing.assert_allclose(t1[k][column], t2[k][column])
+#
+def test_hr_zones(tmp_path):
+    # the rides w/ other HR zones are kept, not summed w/ these
+    fn = str(tmp_path/'zones.json')
+    table = zonesFor({'hrZones': (100, 120)})
+    log = ZoneLog(fn)
+    log.add('a.tcx', '2021-05-01', someZones(1))
+    log.save()
+    log = ZoneLog(fn, table)
+    assert log.totals('year') == {}
+    log.add('b.tcx', '2021-05-02', someZones(2, table))
+    assert log.totals('year')['2021']['HeartRate'].size == 3
+    np.testing.assert_allclose(log.totals('year')['2021']['Cadence'],
+                               someZones(2)['Cadence'])
+    log.save()
+    log = ZoneLog(fn)
+    np.testing.assert_allclose(log.totals('year')['2021']['Cadence'],
+                               someZones(1)['Cadence'])
+    # a ride added w/ other zones moves to these
+    log.add('b.tcx', '2021-05-02', someZones(5))
+    np.testing.assert_allclose(log.totals('year')['2021']['Cadence'],
+                               someZones(6)['Cadence'])
+    log.save()
+    log = ZoneLog(fn, table)
+    assert log.totals('year')['2021']['Cadence'].sum() == 0
+#
+def test_old_log(tmp_path):
+    # a log made before -hrzones: its edges, and the times in 'zones'
+    fn = str(tmp_path/'zones.json')
+    log = ZoneLog(fn)
+    log.add('a.tcx', '2021-05-01', someZones(1))
+    old = {'edges': log.edges,
+           'rides': {'a.tcx': {'day': '2021-05-01',
+                               'zones': log.rides['a.tcx']['times']}},
+           'totals': log.sums[log.key]}
+    with open(fn, 'w') as f:
+        json.dump(old, f)
+    log = ZoneLog(fn)
+    np.testing.assert_allclose(log.totals('week')['2021-W17']['Grade'],
+                               someZones(1)['Grade'])
+    log.add('a.tcx', '2021-05-01', someZones(3))
+    np.testing.assert_allclose(log.totals('week')['2021-W17']['Grade'],
+                               someZones(3)['Grade'])
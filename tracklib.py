@@ -1,375 +1,578 @@
 #
-# track lib: read and process a TCX file
+# track lib: read and process a track file (TCX, GPX or FIT)
 #  readTrack()
+#  readTracks()
+#  startTimeStr()
+#  deriveColumns()
+#  TrackProcessor
+#  printStats()
 #  processTrack()
-# <- Last updated: Sun May  2 15:11:00 2021 -> SGK
+#  followTrack()
+# <- Last updated: Tue Oct 20 06:49:02 2026 -> SGK
 #
-import re
-import xml.etree.ElementTree as ET
-import pandas as pd
 import numpy as np
-from datetime import datetime
-from math import cos,sin,atan,pi,sqrt
 #
 # get some of my utiliies
-from utilslib import formatTime, findIfDST
+from utilslib import formatTime
+from tzlib    import findZone, localTimes, localTimeStr
+from geolib   import earthRad, stepDist, stepXY, refPoint, projectXY
+from geolib   import km2mi, mtr2feet
+from readlib  import readFile, iterTracks
+from columnlib import Track
+from scanlib  import tailTCX
+from statslib import maskedStats, RunningStats
+from elevlib  import smoothAlt, smoothGrade, smoothWidth, GainLoss
 #
 # ---------------------------------------------------------------------------
-# read a TCX file, using xml.etree.ElementTree to parse the xml
-#   found how to do this by googling
+# read a track file, TCX, GPX or FIT, see readlib.py
 def readTrack(fn,
-              silent = False):
+              silent = False,
+              fast   = False,
+              nProcs = 1):
     """
-    read a TCX file (fn) and returns a Data Frame (pandas)
+    read a track file (fn) and returns it as a columnlib.Track
+      the format (TCX, GPX or FIT) is determined from the file content,
+      and it can be compressed (gzip, bzip2 or xz)
+      fast: scan a plain TCX file's bytes instead of parsing the XML
+        (see scanlib.py), falls back to parsing it if that fails
+      nProcs: if > 1 the fast scan is split among nProcs processes
     """
-    #
-    # data array of values
-    data = []
     if not silent:
         print('reading', fn)
     #
-    with open(fn) as xml_file:
-        # get the xml string
-        xml_str = xml_file.read()
-        #
-        # do some parsing
-        xml_str = re.sub(' xmlns="[^"]+"', '', xml_str, count=1)
-        root = ET.fromstring(xml_str)
-        activities = root.findall('.//Activity')
-        for activity in activities:
-            # assume that tha activity is biking
-            ## print('-- {} --'.format(activity.attrib['Sport']))
-            #
-            # get the tracking points
-            tracking_points = activity.findall('.//Trackpoint')
-            # loop on them
-            for tracking_point in list(tracking_points):
-                children = list(tracking_point)
-                ## str was to help debugging this
-                ## str = ''
-                # get this point values
-                vals = {}
-                for i in children:
-                    #
-                    # position -> lat/lon
-                    if i.tag == 'Position':
-                        for c in list(i):
-                            ## str += c.tag+'='+c.text+' '
-                            vals[c.tag] = c.text
-                    #
-                    # HR, need to get the value
-                    elif i.tag == 'HeartRateBpm':
-                        for c in list(i):
-                            ## str += 'HR='+c.text+' '
-                            vals['HeartRateBpm'] = c.text
-                    #
-                    # other info line cadence
-                    else:
-                        ## str += i.tag+'='+i.text+' '
-                        vals[i.tag] = i.text
-                        ## print(str)
-                    data.append(vals)
-    #
-    ## print('data read')
-    # stuff it in a pandas DataFrame
-    df = pd.DataFrame(data)
-    #
-    # return that data frame
-    return (df)
+    return readFile(fn, fast = fast, nProcs = nProcs)
+#
+# ---------------------------------------------------------------------------
+# read all the tracks in a file, ie an archive of exported rides
+def readTracks(fn,
+               silent = False,
+               fast   = False,
+               nProcs = 1):
+    """
+    for track in readTracks(fn):
+      yields each track in fn, a track file or a zip/tar archive of them,
+      compressed or not; each ride is read as the archive is streamed,
+      nothing is extracted to disk
+      fast, nProcs: see readTrack()
+    """
+    for track in iterTracks(fn, silent = silent, fast = fast,
+                            nProcs = nProcs):
+        if not silent:
+            print('reading', track.meta['fileName'])
+        yield track
 #
 # ------------------------------------------------------------------------
-# process (analyze) the track, passed as a data frame
-#   return a numpy data array,
-#         with info (which column hold what var and units)
-#         and the stats
-def processTrack(trackDF,
-                 useTable = False, # print stats as a table
-                 velMin =  6.0,    # min vel to be moving [mph]
-                 velMax = 50.0,    # max valid velocity
-                 grdMax = 15.0,    # max valid grade
-                 cadMin = 10,      # min cadence for stats
-                 hrMin  = 50,      # min HR      for stats
-                 lonRef = -71.3646464, # some lon/lat ref locations
-                 latRef =  42.4358983,
-                 silent = False):
+# the columns of a processed ride: name, dtype and units
+#  float32 is precise enough for all but the time and lon/lat
+rideColumns = (('Time',           np.float64, 'min'),
+               ('Longitude',      np.float64, 'o'),
+               ('Latitude',       np.float64, 'o'),
+               ('Altitude',       np.float32, 'ft'),
+               ('SmoothAltitude', np.float32, 'ft'),
+               ('HeartRate',      np.int16,   'bpm'),
+               ('Cadence',        np.int16,   'rpm'),
+               ('XPosition',      np.float32, 'mi'),
+               ('YPosition',      np.float32, 'mi'),
+               ('DeltaXPos',      np.float32, 'mi'),
+               ('DeltaYPos',      np.float32, 'mi'),
+               ('DeltaDist',      np.float32, 'km'),
+               ('DeltaTime',      np.float32, 'min'),
+               ('Velocity',       np.float32, 'mph'),
+               ('Grade',          np.float32, '%'),
+               ('MeanMVel',       np.float32, 'mph'),
+               ('Distance',       np.float32, 'mi'),
+               ('MovingDistance', np.float32, 'mi'),
+               ('MovingTime',     np.float32, 'min'),
+               ('LocalTime',      np.float64, 'min'))
+#
+# the ones computed (and kept) as the points are added, the stats only
+#  need these, the others are derived when first accessed
+baseColumns = ('Time', 'Longitude', 'Latitude', 'Altitude',
+               'HeartRate', 'Cadence', 'DeltaDist', 'DeltaTime', 'Velocity')
+#
+# ------------------------------------------------------------------------
+# start time (Unix epoch) -> string, in the ride's time zone
+def startTimeStr(tz,
+                 zone = 'UTC'):
     """
-    process/analyze the track, return a data array and print some stats
-        as read in the trackDF data frame
-    options:
-        useTable    print stats as a table if True
-        velMin      min vel to be moving [mph]
-        velMax      max valid velocity
-        grdMax      max valid abs(grade)
-        cadMin      min cadence for stats
-        hrMin       min HR      for stats
-        lonRef = -71.3646464    # some lon/lat ref locations
-        latRef =  42.4358983
+    return the local time string for tz, a Unix epoch time, in zone
+      ie '2021-05-01 09:12:34 EDT', see tzlib.py
     """
+    return localTimeStr(tz, zone)
+#
+# ------------------------------------------------------------------------
+# how to compute the derived columns of a ride
+def deriveColumns(ride, altM, moving,
+                  lonRef, latRef,
+                  velMin = 6.0, grdMax = 15.0,
+                  start = 0.0, zone = 'UTC'):
+    """
+    derived = deriveColumns(ride, altM, moving, lonRef, latRef, velMin, grdMax,
+                            start, zone)
+      ride   - a Track w/ the baseColumns
+      altM   - the altitudes in meters
+      moving - the moving flags (velocity > velMin)
+      start  - the start time (Unix epoch), zone the ride's time zone
+      returns {name: fcn} to pass to ride.addDerived(), fcn(ride) computes
+      the column from the whole ride, the x/y positions (or steps) are
+      computed once for both, the grade is from the smoothed altitude
+      (see elevlib.py)
+    """
+    rad = lambda: earthRad + np.nan_to_num(altM.astype(np.float64))/1000.0
+    cache = {}
     #
-    # format of time stamps
-    timeFormat = '%Y-%m-%dT%H:%M:%S'
+    def positions(i):
+        if 'xy' not in cache:
+            cache['xy'] = projectXY(ride['Longitude'], ride['Latitude'],
+                                    lonRef, latRef, rad())
+        return cache['xy'][i]*km2mi
     #
-    # start time, convert to Unix time (seconds elaspsed since 1970)
-    t0 = trackDF['Time'][0]
-    # adjust time stamp format for diff TCX
-    if ('Z' in t0):
-        timeFormat += 'Z'
-        tz = datetime.strptime(t0, timeFormat).timestamp()
-    elif ('+00:00' in t0):
-        timeFormat += '+00:00'
-        tz = datetime.strptime(t0, timeFormat).timestamp()
-    else:
-        tz = datetime.strptime(t0, timeFormat).timestamp()
+    def steps(i):
+        if 'dxy' not in cache:
+            cache['dxy'] = stepXY(ride['Longitude'], ride['Latitude'], rad())
+        return cache['dxy'][i]*km2mi
     #
-    # how many lines and columns
-    nLines = len(trackDF)
-    nCols  = 20
-    # create an empy numpy array
-    data   = np.empty((nCols, nLines))
+    def altS():
+        # the smoothed altitude [m], vs the distance [km]
+        if 'altS' not in cache:
+            cache['dist'] = np.cumsum(np.nan_to_num(ride['DeltaDist']),
+                                      dtype = np.float64)
+            cache['altS'] = smoothAlt(cache['dist'], altM)
+        return cache['altS']
     #
-    # some constants and conversion factors
-    earthRad = 6367.449 # km
-    deg2rad  = pi/180.0
-    km2mi    = 0.621371
-    mtr2feet = 3.28084
+    def grade(ride):
+        # the slope of the smoothed altitude, w/in +/- grdMax
+        return smoothGrade(ride['Distance']/km2mi, altS(), grdMax = grdMax)
     #
-    # initialize some accumulators
-    distance    = 0.0
-    mvgDistance = 0.0
-    mvgTime     = 0.0
-    vsum        = 0.0
-    nsum        = 0
+    def meanMVel(ride):
+        # the mean avg velocity so far,
+        #  set it to be at least to velMin at begining
+        vsum = np.cumsum(np.where(moving, ride['Velocity'], 0.0),
+                         dtype = np.float64)
+        nsum = np.cumsum(moving)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            v = np.where(nsum > 1, vsum/nsum, velMin)
+        return np.maximum(v, velMin)
     #
-    velMinKmh = velMin/km2mi
+    def localTime(ride):
+        # the local time [min] since the midnight the ride started after
+        t = localTimes(start + ride['Time']*60.0, zone)
+        return (t - (t[0]//86400)*86400)/60.0 if t.size > 0 else t
     #
-    # loop on the lines of the data frame
-    for i in range(nLines):
-        # time
-        tt = trackDF['Time'][i]
-        t0 = datetime.strptime(tt, timeFormat).timestamp()
+    return {'XPosition': lambda ride: positions(0),
+            'YPosition': lambda ride: positions(1),
+            'DeltaXPos': lambda ride: steps(0),
+            'DeltaYPos': lambda ride: steps(1),
+            'SmoothAltitude': lambda ride: altS()*mtr2feet,
+            'Grade':     grade,
+            'MeanMVel':  meanMVel,
+            'Distance':  lambda ride: np.cumsum(
+                np.nan_to_num(ride['DeltaDist'], nan = 0.0),
+                dtype = np.float64)*km2mi,
+            'MovingDistance': lambda ride: np.cumsum(
+                np.where(moving, ride['DeltaDist'], 0.0),
+                dtype = np.float64)*km2mi,
+            'MovingTime': lambda ride: np.cumsum(
+                np.where(moving, ride['DeltaTime'], 0.0),
+                dtype = np.float64),
+            'LocalTime': localTime}
+#
+# ------------------------------------------------------------------------
+# process a track incrementally
+class TrackProcessor:
+    """
+    process (analyze) a track, one batch of points at a time:
+      proc = TrackProcessor(velMin = 6.0, ...)
+      proc.update(track1)     # a columnlib.Track w/ the first points
+      proc.update(track2)     # the next ones, ...
+      proc.ride               # the processed ride so far
+      proc.stats()            # the stats so far
+      proc.stats(final = True)  # w/ the percentiles, over all the pts
+    the running sums (distance, moving time, the masked stats' sums, etc)
+    and the previous point are kept between calls, so each update() and
+    stats() cost O(new points); the percentiles cost O(all the points),
+    they are only computed for the final stats
+    the smoothed altitude is final for the points more than a smoothing
+    window away from the end, they are added to the gain/loss (see
+    elevlib.GainLoss), only the ones near the end are smoothed again
+    proc.ride is a columnlib.Track w/ the rideColumns, the baseColumns
+    are views of the processor's buffers, that grow as needed, the
+    others (x/y positions, grade, cumulative sums...) are derived from
+    them when first accessed, so the stats alone do not compute them
+    proc.ride.meta['lapStart'] has the laps' 1st pt, from the tracks' meta
+    options: see processTrack()
+      if lonRef/latRef are None, the center of the 1st batch is used
+      if zone is None, the zone of the 1st located pt, see tzlib.findZone()
+    """
+    #
+    def __init__(self,
+                 velMin = 6.0, velMax = 50.0, grdMax = 15.0,
+                 cadMin = 10,  hrMin  = 50,
+                 lonRef = None, latRef = None,
+                 distMethod = 'haversine',
+                 zone = None):
+        self.velMin = velMin
+        self.velMax = velMax
+        self.grdMax = grdMax
+        self.cadMin = cadMin
+        self.hrMin  = hrMin
+        self.lonRef = lonRef
+        self.latRef = latRef
+        self.distMethod = distMethod
+        self.zone   = zone
         #
-        data[0, i] = (t0 - tz)/3600.                  # delta t
-        data[1, i] = float(trackDF['LongitudeDegrees'][i]) # lon
-        data[2, i] = float(trackDF['LatitudeDegrees'][i])  # lat
+        self.nPts  = 0
+        self.size  = 0
+        # the base columns, plus the altitude [m] and the moving flag
+        dtypes = dict([(name, dtype) for (name, dtype, unit) in rideColumns])
+        self.buffers = dict([(name, np.zeros(0, dtype = dtypes[name]))
+                             for name in baseColumns])
+        self.buffers['altM']   = np.zeros(0, dtype = np.float32)
+        self.buffers['moving'] = np.zeros(0, dtype = bool)
+        self.buffers['dist']   = np.zeros(0, dtype = np.float64)
+        self.tz    = None     # start time
+        self.prev  = None     # prev pt (time [hr], lon, lat, alt, rad)
+        self.laps  = []       # index of the 1st pt of each lap
         #
-        # alt, hr, cad if present and valid
-        try:
-            alt = float(trackDF['AltitudeMeters'][i])
-        except:
-            alt = 0.0
-        try:
-            hr  = float(trackDF['HeartRateBpm'][i])
-        except:
-            hr  = 0.0
-        try:
-            cad = float(trackDF['Cadence'][i])
-        except:
-            cad = 0.0
+        # initialize some accumulators
+        self.distance    = 0.0
+        self.mvgDistance = 0.0
+        self.mvgTime     = 0.0
+        # and the masked stats' ones (avg, max... of velocity, HR, cadence)
+        self.opts = {'velMin': velMin, 'velMax': velMax,
+                     'hrMin':  hrMin,  'cadMin': cadMin}
+        self.running = RunningStats(self.opts)
+        # and the gain/loss': the smoothed altitude of the pts before
+        #  altDone is final, the one of the pts after is altTail
+        self.gainLoss  = GainLoss()
+        self.altDone   = 0
+        self.altTail   = np.zeros(0)
+        self.lastValid = -1   # the last pt w/ an altitude
+    #
+    @property
+    def ride(self):
+        """
+        the ride so far, a columnlib.Track w/ views of the buffers
+          and the derived columns
+        """
+        n = self.nPts
+        zone = self.zone or 'UTC'
+        ride = Track({'lonRef': self.lonRef, 'latRef': self.latRef,
+                      'lapStart': np.array(self.laps, dtype = np.int64),
+                      'timeZone': zone})
+        derived = deriveColumns(ride, self.buffers['altM'][:n],
+                                self.buffers['moving'][:n],
+                                self.lonRef, self.latRef,
+                                self.velMin, self.grdMax,
+                                self.tz or 0.0, zone)
+        for (name, dtype, unit) in rideColumns:
+            if name in derived:
+                ride.addDerived(name, derived[name], unit, dtype)
+            else:
+                ride.addColumn(name, self.buffers[name][:n], unit)
+        return ride
+    #
+    def grow(self, n):
+        """
+        make room for n more points, doubling the buffers' size as needed
+        """
+        if self.nPts + n > self.size:
+            self.size = max(self.nPts + n, 2*self.size)
+            for (name, buf) in self.buffers.items():
+                new = np.zeros(self.size, dtype = buf.dtype)
+                new[:self.nPts] = buf[:self.nPts]
+                self.buffers[name] = new
+    #
+    def update(self, track):
+        """
+        process the new points in track (a columnlib.Track),
+          returns how many were added
+        """
+        n = len(track)
+        if n == 0:
+            return 0
         #
-        # minor radius correction, alt is in meters
-        rad = earthRad + alt/1000.0
+        # start time, Unix time (seconds elaspsed since 1970)
+        #  and x,y ref location, the ride's center unless specified
+        if self.tz is None:
+            self.tz = track['Time'][0]
+            if (self.lonRef is None) or (self.latRef is None):
+                (lon0, lat0) = refPoint(track['Longitude'],
+                                        track['Latitude'])
+                if self.lonRef is None:
+                    self.lonRef = lon0
+                if self.latRef is None:
+                    self.latRef = lat0
         #
-        # ii is prev pt, ii=0 for i=0
-        if i == 0:
-            ii = 0
-            rdx = rad*cos(data[2, i]*deg2rad) # rho = rad*cos(lat)
-        else:
-            ii = i-1
-        # x,y positions in km
+        # the time zone, where the ride started
+        if self.zone is None:
+            ok = np.flatnonzero(np.isfinite(track['Longitude']) &
+                                np.isfinite(track['Latitude']))
+            if ok.size > 0:
+                self.zone = findZone(track['Longitude'][ok[0]],
+                                     track['Latitude'][ok[0]],
+                                     t = track['Time'][ok[0]])
         #
-        xpos = rdx * atan( (data[1, i]-lonRef)*deg2rad )
-        ypos = rad * atan( (data[2, i]-latRef)*deg2rad )
+        velMinKmh = self.velMin/km2mi
         #
-        dx = rdx * atan( (data[1, i]-data[1, ii])*deg2rad )
-        dy = rad * atan( (data[2, i]-data[2, ii])*deg2rad )
+        # time -> elapsed time in hr
+        t   = (track['Time'] - self.tz)/3600.
+        lon = track['Longitude']
+        lat = track['Latitude']
+        alt = np.asarray(track['Altitude'], dtype = np.float64)
         #
-        delta_dist = sqrt(dx**2+dy**2)          # in km
-        delta_time = (data[0, i] - data[0, ii]) # in hr
-        if (delta_time > 0):
-            velocity = delta_dist/delta_time    # km/h
-        else:
-            velocity = 0
-        # grade, remember alt is in meter
-        if (delta_dist > 0) and not np.isnan(delta_dist):
-            grade = (alt - data[3, ii])/(delta_dist*1000.0)*100 # [%]
-            # ignore crazy grades
-            if (grade > grdMax) or (grade < -grdMax):
-                grade = 0
-        else:
-            grade = 0
+        # minor radius correction, alt is in meters
+        rad = earthRad + np.nan_to_num(alt)/1000.0
         #
-        # save the values
-        data[3, i] = alt
-        data[4, i] = hr
-        data[5, i] = cad
-        data[6, i] = xpos
-        data[7, i] = ypos
-        data[8, i] = dx
-        data[9, i] = dy
+        # prepend the prev pt, the 1st pt is its own prev pt
+        if self.prev is None:
+            self.prev = (t[0], lon[0], lat[0], alt[0], rad[0])
+        (tp, lonp, latp, altp, radp) = self.prev
+        lonE = np.concatenate(([lonp], lon))
+        latE = np.concatenate(([latp], lat))
+        radE = np.concatenate(([radp], rad))
         #
-        data[10, i] = delta_dist 
-        data[11, i] = delta_time
-        data[12, i] = velocity 
-        data[13, i] = grade
+        # step (prev pt to this pt) dist and time
+        deltaDist = stepDist(lonE, latE, self.distMethod, radE)[1:] # in km
+        deltaTime = np.diff(np.concatenate(([tp], t)))              # in hr
         #
-        # accumulate traveled disk
-        if not np.isnan(delta_dist):
-            distance += delta_dist
+        with np.errstate(invalid='ignore', divide='ignore'):
+            velocity = np.where(deltaTime > 0, deltaDist/deltaTime, 0.0) # km/h
         #
-        # accumuate moving time and dist and sum(veloc)
-        if (velocity > velMinKmh):
-            mvgDistance += delta_dist
-            mvgTime     += delta_time*3600. # back in sec
-            vsum += velocity
-            nsum += 1
+        # accumulate traveled dist, moving time and dist
+        #  summed in sequence, like the cumulative columns
+        moving = velocity > velMinKmh
+        self.distance    = (self.distance +
+                            np.cumsum(np.nan_to_num(deltaDist)))[-1]
+        self.mvgDistance = (self.mvgDistance +
+                            np.cumsum(np.where(moving, deltaDist, 0.0)))[-1]
+        self.mvgTime     = (self.mvgTime +
+                            np.cumsum(np.where(moving, deltaTime*3600., 0.0)))[-1]
         #
-        # compute the mean avg velocity so far
-        if (nsum > 1):
-            meanMVel = vsum/nsum
-            # set it to be at least to velMin at begining
-            if meanMVel < velMinKmh:
-                meanMVel = velMinKmh
-        else:
-            meanMVel = velMinKmh
+        # save the values, converted to minutes, mph, feet
+        values = {'Time':           t*60.0,
+                  'Longitude':      lon,
+                  'Latitude':       lat,
+                  'Altitude':       alt*mtr2feet,
+                  'HeartRate':      track['HeartRate'],
+                  'Cadence':        track['Cadence'],
+                  'DeltaDist':      deltaDist,
+                  'DeltaTime':      deltaTime*60.0,
+                  'Velocity':       velocity*km2mi,
+                  'altM':           alt,
+                  'moving':         moving}
+        k = self.nPts
+        self.grow(n)
+        self.laps += [k+i for i in track.meta.get('lapStart', [])]
+        for (name, v) in values.items():
+            self.buffers[name][k:k+n] = v
+        self.nPts += n
         #
-        # more vars
-        data[14, i] = meanMVel
-        data[15, i] = distance 
-        data[16, i] = mvgDistance 
-        data[17, i] = mvgTime 
-    #
-    # convert data to minutes, mph, feet
-    data[ 0, :] *= 60.0
-    data[ 3, :] *= mtr2feet
-    #
-    data[ 6, :] *= km2mi
-    data[ 7, :] *= km2mi
-    data[ 8, :] *= km2mi
-    data[ 9, :] *= km2mi
-    #
-    data[11, :] *= 60.0
-    data[12, :] *= km2mi
-    data[14, :] *= km2mi
-    data[15, :] *= km2mi
-    data[16, :] *= km2mi
-    data[17, :] *= 60.0
-    #
-    totalTime    = data[0, -1]
-    mvgTime     /= 60.0
-    distance    *= km2mi
-    mvgDistance *= km2mi
-    #
-    if not silent:
-        print('data decoded')
-    #
-    # saves which col is what:unit as a space sep string
-    infos = 'Time:min Longitude:o Latitude:o Altitude:ft ' + \
-              'HeartRate:bpm Cadence:rpm ' + \
-              'XPosition:x YPosition:y DeltaXPos:x DeltaYPos:y ' + \
-              'DeltaDist:d DeltaTime:min ' + \
-              'Velocity:mph Grade:% MeanMVel:mph' + \
-              'Distance:mi MovingDistance:mi MovingTime:min '
-    #
-    # covert infos -> index[] and units[]
-    index = {}
-    units = {}
-    i = 0
-    for wx in infos.split():
-        w = wx.split(':')
-        index[w[0]] = i
-        units[w[0]] = w[1]
-        i += 1
-    #
-    # compute some more stats, properly masked
-    mask1 = data[index['Velocity'],  :] > velMin
-    mask2 = data[index['Velocity'],  :] < velMax
-    mask3 = data[index['HeartRate'], :] > hrMin
-    mask4 = data[index['Cadence'],   :] > cadMin
-    #
-    # moving vel stats
-    mask    = mask1 & mask2
-    avgMVel = sum(data[index['Velocity'],  mask])/sum(mask)
-    maxMVel = max(data[index['Velocity'],  mask])
-    #
-    # HR stats
-    mask    = mask1 & mask2 & mask3
-    sumMask = sum(mask)
-    if (sumMask > 0):
-        avgHR   = sum(data[index['HeartRate'], mask])/sumMask
-        maxHR   = max(data[index['HeartRate'], mask])
-    else:
-        avgHR = 0.0
-        maxHR = 0.0
-    #
-    # cadence stats
-    mask    = mask1 & mask2 & mask4
-    sumMask = sum(mask)
-    if (sumMask > 0):
-        avgCad  = sum(data[index['Cadence'],   mask])/sumMask
-        maxCad  = max(data[index['Cadence'],   mask])
-    else:
-        avgCad = 0.0
-        maxCad = 0.0
+        # the masked stats of the new pts
+        part = Track()
+        for name in baseColumns:
+            part.addColumn(name, self.buffers[name][k:k+n])
+        self.running.add(part)
         #
+        # the cumulative distance [km], summed in sequence like the
+        #  Distance column, and the smoothed altitude near the end
+        prev = self.buffers['dist'][k-1] if k > 0 else 0.0
+        self.buffers['dist'][k:k+n] = np.cumsum(np.concatenate((
+            [prev], np.nan_to_num(self.buffers['DeltaDist'][k:k+n]))),
+                                                dtype = np.float64)[1:]
+        self.smoothTail()
+        #
+        # keep the last pt
+        self.prev = (t[-1], lon[-1], lat[-1], alt[-1], rad[-1])
+        return n
     #
-    # are we in DST?
-    isDST = findIfDST(tz);
-    # convert time to EST or EDT
-    if isDST:
-        tz -= 4*3600
-        xtz = ' EDT'
-    else:
-        tz -= 5*3600
-        xtz = ' EST'
-    #
-    # tz -> string representing time
-    tz = str(datetime.fromtimestamp(tz))+xtz
-    #
-    stats = {}
-    stats['startTime']    = tz
-    stats['totalTime']    = totalTime
-    stats['movingTime']   = mvgTime
-    stats['distance']     = distance
-    stats['mvgDistance']  = mvgDistance
-    stats['avgMVel']      = avgMVel
-    stats['maxMVel']      = maxMVel
-    stats['avgHeartRate'] = avgHR
-    stats['maxHeartRate'] = maxHR
-    stats['avgCadence']   = avgCad
-    stats['maxCadence']   = maxCad
+    def smoothTail(self):
+        """
+        smooth the altitude of the pts whose smoothing window changed,
+          the ones now more than a window from the end (or from the
+          altitudes missing at the end) are added to the gain/loss
+        """
+        n = self.nPts
+        dist = self.buffers['dist'][:n]
+        alt  = self.buffers['altM'][:n]
+        ok = np.flatnonzero(np.isfinite(alt[self.altDone:]))
+        if ok.size > 0:
+            self.lastValid = self.altDone + ok[-1]
+        if self.lastValid < 0:
+            self.altTail = np.zeros(0)
+            return
+        #
+        # the pts whose window reaches the end, or a missing altitude
+        #  after the last valid one (they are interpolated) can change
+        w = smoothWidth/2
+        end = dist[min(self.lastValid+1, n-1)]
+        done = max(int(np.searchsorted(dist, end - w, 'left')),
+                   self.altDone)
+        #
+        # smooth from the window of the 1st pt not done, w/ the last
+        #  valid altitude before it (the gaps are interpolated)
+        s = int(np.searchsorted(dist, dist[self.altDone] - w, 'left'))
+        j = s
+        while j > 0 and not np.isfinite(alt[s]):
+            i = max(j-256, 0)
+            ok = np.flatnonzero(np.isfinite(alt[i:j]))
+            if ok.size > 0:
+                s = i + ok[-1]
+            j = i
+        altS = smoothAlt(dist[s:], alt[s:])
+        self.gainLoss.add(altS[self.altDone-s:done-s])
+        self.altTail = altS[done-s:]
+        self.altDone = done
     #
-    # print ride stats
+    def stats(self,
+              final = False):
+        """
+        return the stats so far, as a dict, times in min, dist in mi
+          final: compute the masked stats over the whole ride, w/ the
+          percentiles (p50MVel...), otherwise from the running sums
+        """
+        stats = {}
+        zone = self.zone or 'UTC'
+        stats['startTime']    = startTimeStr(self.tz, zone) \
+            if self.nPts > 0 else ''
+        stats['startEpoch']   = float(self.tz) if self.nPts > 0 else 0.0
+        stats['timeZone']     = zone
+        stats['totalTime']    = self.buffers['Time'][self.nPts-1] \
+            if self.nPts > 0 else 0.0
+        stats['movingTime']   = self.mvgTime/60.0
+        stats['distance']     = self.distance*km2mi
+        stats['mvgDistance']  = self.mvgDistance*km2mi
+        # the gain/loss of the smoothed altitude, w/ a hysteresis
+        (gain, loss) = self.gainLoss.totals(self.altTail)
+        stats['elevGain']     = gain*mtr2feet
+        stats['elevLoss']     = loss*mtr2feet
+        # the masked stats (avg, max... of velocity, HR, cadence)
+        if final:
+            stats.update(maskedStats(self.ride, self.opts))
+        else:
+            stats.update(self.running.stats())
+        stats['lonRef']       = self.lonRef
+        stats['latRef']       = self.latRef
+        return stats
+#
+# ------------------------------------------------------------------------
+# print the stats
+def printStats(stats,
+               useTable = False,
+               velMin = 6.0, velMax = 50.0):
+    """
+    print the ride stats, as a table (one line) if useTable is True
+    """
+    totalTime = stats['totalTime']
+    mvgTime   = stats['movingTime']
     if useTable:
         fmtStr = '{} {:8s} {:8s} {:7s} ' + \
             '{:6.2f} {:6.2f} {:6.2f} {:6.2f} '   + \
             '{:6.2f} {:6.2f} {:6.2f} {:6.2f} ' 
-        print(fmtStr.format(tz,
+        print(fmtStr.format(stats['startTime'],
                             formatTime(totalTime),
                             formatTime(mvgTime),
                             formatTime(totalTime-mvgTime),
-                            distance, mvgDistance,
-                            avgMVel, maxMVel,
-                            avgCad, maxCad,
-                            avgHR, maxHR))
+                            stats['distance'], stats['mvgDistance'],
+                            stats['avgMVel'], stats['maxMVel'],
+                            stats['avgCadence'], stats['maxCadence'],
+                            stats['avgHeartRate'], stats['maxHeartRate']))
         
     else:
         fmtStr = 'moving velocity range: [{:.2f}, {:.2f}] mph'
         print(fmtStr.format(velMin, velMax))
         fmtStr = 'Started  {}'
-        print(fmtStr.format(tz))
+        print(fmtStr.format(stats['startTime']))
         #
         fmtStr = 'Time     total={} moving={} paused={}'
         print(fmtStr.format(formatTime(totalTime),
                             formatTime(mvgTime),
                             formatTime(totalTime-mvgTime)))
         fmtStr = 'Distance total={:6.2f} moving={:6.2f} mi'
-        print(fmtStr.format(distance, mvgDistance))
+        print(fmtStr.format(stats['distance'], stats['mvgDistance']))
+        fmtStr = 'Altitude gain={:6.0f} loss={:6.0f} ft'
+        print(fmtStr.format(stats['elevGain'], stats['elevLoss']))
         fmtStr = 'Velocity average={:6.2f} max={:6.2f} mph'
-        print(fmtStr.format(avgMVel, maxMVel))
+        print(fmtStr.format(stats['avgMVel'], stats['maxMVel']))
         fmtStr = 'Cadence  average={:6.2f} max={:6.2f} rpm'
-        print(fmtStr.format(avgCad, maxCad))
+        print(fmtStr.format(stats['avgCadence'], stats['maxCadence']))
         fmtStr = 'HR       average={:6.2f} max={:6.2f} bpm'
-        print(fmtStr.format(avgHR, maxHR))
+        print(fmtStr.format(stats['avgHeartRate'], stats['maxHeartRate']))
+#
+# ------------------------------------------------------------------------
+# process (analyze) the track, passed as a columnlib.Track
+#   return the processed ride (a columnlib.Track, see rideColumns)
+#         and the stats
+def processTrack(track,
+                 useTable = False, # print stats as a table
+                 velMin =  6.0,    # min vel to be moving [mph]
+                 velMax = 50.0,    # max valid velocity
+                 grdMax = 15.0,    # max valid grade
+                 cadMin = 10,      # min cadence for stats
+                 hrMin  = 50,      # min HR      for stats
+                 lonRef = None,    # lon/lat ref location for x/y,
+                 latRef = None,    #   None -> ride's center
+                 distMethod = 'haversine', # or 'equirect', 'vincenty'
+                 zone   = None,    # time zone, None -> where it started
+                 silent = False):
+    """
+    process/analyze the track, return the ride and print some stats
+        as read by readTrack() in track (a columnlib.Track)
+    options:
+        useTable    print stats as a table if True
+        velMin      min vel to be moving [mph]
+        velMax      max valid velocity
+        grdMax      max valid abs(grade)
+        cadMin      min cadence for stats
+        hrMin       min HR      for stats
+        lonRef      lon/lat ref location for the x/y positions,
+        latRef        None means use the ride's center
+        distMethod  how to compute distances, see geolib.stepDist()
+        zone        the time zone (ie 'Europe/Paris'), None means the
+                      zone where the ride started, see tzlib.findZone()
+
+    the ref location used is returned in stats['lonRef'], stats['latRef']
+    this is a TrackProcessor fed w/ the whole track at once,
+    (ride, stats) are its ride and stats()
+    """
+    #
+    proc = TrackProcessor(velMin = velMin, velMax = velMax, grdMax = grdMax,
+                          cadMin = cadMin, hrMin  = hrMin,
+                          lonRef = lonRef, latRef = latRef,
+                          distMethod = distMethod, zone = zone)
+    proc.update(track)
+    ride  = proc.ride
+    stats = proc.stats(final = True)
+    #
+    if not silent:
+        print('data decoded')
+    #
+    # print ride stats
+    printStats(stats, useTable = useTable, velMin = velMin, velMax = velMax)
+    #
+    # return the ride and the stats
+    return (ride, stats)
+#
+# ------------------------------------------------------------------------
+# process a TCX file as it is being written
+def followTrack(fn,
+                useTable = False,
+                poll = 1.0,
+                idle = 60.0,
+                **kwargs):
+    """
+    follow the TCX file fn as it grows, w/ scanlib.tailTCX(), process the
+      new points and print the updated stats after each batch (w/out the
+      percentiles, so each batch costs O(its points)),
+      stops when the file is complete or after idle seconds w/out new pts
+      kwargs are passed to TrackProcessor (velMin, velMax, ...)
+    return (ride, stats) like processTrack()
+    """
+    #
+    proc = TrackProcessor(**kwargs)
+    for track in tailTCX(fn, poll = poll, idle = idle):
+        proc.update(track)
+        printStats(proc.stats(), useTable = useTable,
+                   velMin = proc.velMin, velMax = proc.velMax)
     #
-    # return data, infos and stats
-    return (data, infos, stats)
+    return (proc.ride, proc.stats(final = True))
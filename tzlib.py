@@ -0,0 +1,226 @@
+#
+# tz lib: time zones, offline, from the tz database
+#  findZone()
+#  zoneTable()
+#  utcOffsets()
+#  localTimes()
+#  localTimeStr()
+# <- Last updated: Tue Oct 20 06:48:37 2026 -> SGK
+#
+# the zone of a ride is the one whose boundary holds its start, from the
+# polygons of the timezonefinder package (offline) when it is installed;
+# w/out it, it is the one whose location (in zone1970.tab) is the nearest,
+# a guess, w/ a warning that asks for -tz unless the start is near that
+# location and no zone w/ another UTC offset is about as near
+#
+# a zone's transitions (UTC time, offset, abbreviation) are zoneinfo's,
+# from its offset each day from firstYear to lastYear, each change then
+# bisected to the second; they are kept per zone, so converting a column
+# is a np.searchsorted() and an add
+#
+# zoneinfo reads the system's tz database (zoneinfo.TZPATH), or else the
+# tzdata package's (ie on Windows), zone1970.tab is read the same way;
+# w/out either, or for an unknown zone, the zone is UTC, w/ a warning
+#
+import os, sys, zoneinfo
+import importlib.resources
+from datetime import datetime, timezone
+import numpy as np
+#
+from geolib import earthRad
+#
+# the transitions are looked for from/up to those years
+firstYear = 1970
+lastYear  = 2100
+#
+# w/out timezonefinder, the nearest zone is clear only within zoneNear
+#  [km] of its location, and if no zone w/ another offset is less than
+#  zoneRatio times as far
+zoneNear  = 100.0
+zoneRatio = 2.0
+#
+# the zones' locations, the zone finder and the zones' tables, read once
+zoneCache = {}
+#
+# the table of a zone not found: UTC
+utcTable = (np.zeros(0, dtype = np.int64), np.zeros(1, dtype = np.int64),
+            ['UTC'])
+#
+# ------------------------------------------------------------------------
+# read a file of the tz database
+def tzData(name):
+    """
+    data = tzData(name)
+      the bytes of the file name (ie 'zone1970.tab') of the system's tz
+      database, or of the tzdata package's, None if not found
+    """
+    if os.path.isabs(name) or '..' in name.split('/'):
+        return None
+    for path in zoneinfo.TZPATH:
+        fn = os.path.join(path, name)
+        if os.path.isfile(fn):
+            with open(fn, 'rb') as f:
+                return f.read()
+    try:
+        res = importlib.resources.files('tzdata.zoneinfo')
+        for part in name.split('/'):
+            res = res.joinpath(part)
+        return res.read_bytes()
+    except (ImportError, OSError, ValueError):
+        return None
+#
+# ------------------------------------------------------------------------
+# the zones' locations, from zone1970.tab (or zone.tab)
+def zoneCoords():
+    """
+    (names, lon, lat) = zoneCoords()
+      the zones' names and locations [deg], empty if no table is found
+    """
+    if 'coords' in zoneCache:
+        return zoneCache['coords']
+    (names, coords) = ([], [])
+    data = tzData('zone1970.tab') or tzData('zone.tab') or b''
+    for line in data.decode('utf-8').splitlines():
+        if line.startswith('#'):
+            continue
+        fields = line.split('\t')
+        if len(fields) < 3:
+            continue
+        # +DDMM+DDDMM or +DDMMSS+DDDMMSS
+        c = fields[1]
+        k = max(c.find('+', 1), c.find('-', 1))
+        coords.append((dms(c[k:]), dms(c[:k])))
+        names.append(fields[2])
+    coords = np.array(coords, dtype = np.float64).reshape(-1, 2)
+    zoneCache['coords'] = (names, coords[:, 0], coords[:, 1])
+    return zoneCache['coords']
+#
+def dms(s):
+    # +DDMM[SS] or +DDDMM[SS] -> deg
+    n = 3 if len(s) in (6, 8) else 2
+    (d, m, sec) = (int(s[1:n+1]), int(s[n+1:n+3]), int(s[n+3:] or 0))
+    return (d + m/60.0 + sec/3600.0)*(-1 if s[0] == '-' else 1)
+#
+# ------------------------------------------------------------------------
+# the zone of a location
+def findZone(lon, lat,
+             t = None):
+    """
+    zone = findZone(lon, lat, t)
+      the name of the zone at lon/lat [deg], from timezonefinder's
+      polygons, or else the one whose location is the nearest, w/ a
+      warning unless it is within zoneNear and no zone w/ another UTC
+      offset at t (Unix epoch [s], now if None) is about as near; 'UTC'
+      if lon/lat is not valid or there is no zone table
+    """
+    if not (np.isfinite(lon) and np.isfinite(lat)):
+        return 'UTC'
+    if 'finder' not in zoneCache:
+        try:
+            from timezonefinder import TimezoneFinder
+            zoneCache['finder'] = TimezoneFinder()
+        except ImportError:
+            zoneCache['finder'] = None
+    if zoneCache['finder'] is not None:
+        zone = zoneCache['finder'].timezone_at(lng = float(lon),
+                                               lat = float(lat))
+        if zone is not None:
+            return zone
+    #
+    (names, zLon, zLat) = zoneCoords()
+    if len(names) == 0:
+        return 'UTC'
+    (lon, lat) = np.radians((lon, lat))
+    (zLon, zLat) = (np.radians(zLon), np.radians(zLat))
+    # the angular distances, the nearest and the ones about as near
+    c = np.sin(lat)*np.sin(zLat) + np.cos(lat)*np.cos(zLat)*np.cos(zLon-lon)
+    d = np.arccos(np.clip(c, -1.0, 1.0))
+    k = int(np.argmin(d))
+    near = np.flatnonzero(d <= d[k]*zoneRatio)
+    t = datetime.now(timezone.utc).timestamp() if t is None else float(t)
+    offsets = set([int(utcOffsets(t, names[i])) for i in near])
+    if (d[k]*earthRad > zoneNear) or (len(offsets) > 1):
+        print(('tzlib: the time zone at {:.3f}, {:.3f} is not clear, ' +
+               'using {}, set it w/ -tz (or pip install timezonefinder)').
+              format(np.degrees(lat), np.degrees(lon), names[k]),
+              file = sys.stderr)
+    return names[k]
+#
+# ------------------------------------------------------------------------
+# a zone's transitions
+def zoneTable(zone):
+    """
+    (times, offsets, abbrevs) = zoneTable(zone)
+      times   - the transitions, UTC [s], from firstYear to lastYear
+      offsets - the UTC offset [s] before the 1st transition, then after
+                each one, abbrevs the abbreviations
+      read once per zone; a zone not found (unknown, or no tz database)
+      is UTC, w/ a warning
+    """
+    key = 'zone:'+zone
+    if key in zoneCache:
+        return zoneCache[key]
+    try:
+        tz = zoneinfo.ZoneInfo(zone)
+    except (zoneinfo.ZoneInfoNotFoundError, ValueError):
+        print('tzlib: time zone '+zone+' not found, using UTC',
+              file = sys.stderr)
+        zoneCache[key] = utcTable
+        return utcTable
+    #
+    def state(t):
+        # the offset [s] and the abbreviation at t
+        d = datetime.fromtimestamp(t, tz)
+        return (int(d.utcoffset().total_seconds()), d.tzname())
+    #
+    # each day, then each change bisected, to the 1st second after it
+    t0 = int(datetime(firstYear, 1, 1, tzinfo = timezone.utc).timestamp())
+    t1 = int(datetime(lastYear+1, 1, 1, tzinfo = timezone.utc).timestamp())
+    days = range(t0, t1, 86400)
+    states = [state(t) for t in days]
+    (times, offsets, abbrevs) = ([], [states[0][0]], [states[0][1]])
+    for k in range(1, len(states)):
+        if states[k] == states[k-1]:
+            continue
+        (lo, hi) = (days[k-1], days[k])
+        while hi - lo > 1:
+            mid = (lo + hi)//2
+            (lo, hi) = (mid, hi) if state(mid) == states[k-1] else (lo, mid)
+        times.append(hi)
+        offsets.append(states[k][0])
+        abbrevs.append(states[k][1])
+    #
+    zoneCache[key] = (np.array(times, dtype = np.int64),
+                      np.array(offsets, dtype = np.int64), abbrevs)
+    return zoneCache[key]
+#
+# ------------------------------------------------------------------------
+# UTC offsets and local times, of a column
+def utcOffsets(t, zone):
+    """
+    offsets = utcOffsets(t, zone)
+      the UTC offsets [s] in zone at the times t (Unix epoch [s])
+    """
+    (times, offsets, abbrevs) = zoneTable(zone)
+    return offsets[np.searchsorted(times, t, side = 'right')]
+#
+def localTimes(t, zone):
+    """
+    tLocal = localTimes(t, zone)
+      the times t (Unix epoch [s]) as local times in zone, ie w/ the
+      offsets added, [s] since 1970-01-01 00:00 local
+    """
+    return np.asarray(t, dtype = np.float64) + utcOffsets(t, zone)
+#
+# ------------------------------------------------------------------------
+# a time, as a local time string
+def localTimeStr(t, zone):
+    """
+    str = localTimeStr(t, zone)
+      t (Unix epoch [s]) as 'YYYY-MM-DD HH:MM:SS ABR', ABR the zone's
+      abbreviation then, ie EDT
+    """
+    (times, offsets, abbrevs) = zoneTable(zone)
+    i = int(np.searchsorted(times, t, side = 'right'))
+    return datetime.fromtimestamp(t + offsets[i], timezone.utc).\
+        strftime('%Y-%m-%d %H:%M:%S')+' '+abbrevs[i]
@@ -2,10 +2,9 @@
 # utilities:
 #  formatTime()
 #  formatTimeLabels()
-#  findIfDST()
 #  putID()
 #  saveFig()
-# <- Last updated: Sun May  2 09:43:59 2021 -> SGK
+# <- Last updated: Tue Oct 20 03:42:05 2026 -> SGK
 #
 from datetime import datetime
 import sys, os
@@ -43,56 +42,6 @@ def formatTimeLabels(t, pos):
     return '{:02d}:{:02d}'.format(h, m)
 #
 # ------------------------------------------------------------------------
-# find out if tz (Unix epoch time) corresponds to DST in US
-def findIfDST(tz):
-    """
-    return True or False if it is DST for tz (Unix epoch) in the US 
-    """
-    #
-    # grabbed from
-    # https://en.wikipedia.org/wiki/Daylight_saving_time_in_the_United_States
-    dstInfo = {}
-    dstInfo[2015] = 'March 8:November 1'
-    dstInfo[2016] = 'March 13:November 6'
-    dstInfo[2017] = 'March 12:November 5'
-    dstInfo[2018] = 'March 11:November 4'
-    dstInfo[2019] = 'March 10:November 3'
-    dstInfo[2020] = 'March 8:November 1'
-    dstInfo[2021] = 'March 14:November 7'
-    dstInfo[2022] = 'March 13:November 6'
-    dstInfo[2023] = 'March 12:November 5'
-    dstInfo[2024] = 'March 10:November 3'
-    dstInfo[2025] = 'March 9:November 2'
-    dstInfo[2026] = 'March 8:November 1'
-    dstInfo[2027] = 'March 14:November 7'
-    dstInfo[2028] = 'March 12:November 5'
-    dstInfo[2029] = 'March 11:November 4'
-    #
-    # what year
-    dateTime = datetime.fromtimestamp(tz)
-    year = dateTime.year
-    #
-    # get the DST limits
-    (t0,t1) = dstInfo[year].split(':')
-    t0 += ' '+str(year)
-    t1 += ' '+str(year)
-    #
-    # convert to Unix epoch time (sec since 1970)
-    timeFormat = '%B %d %Y'
-    tFr = datetime.strptime(t0, timeFormat).timestamp()
-    tTo = datetime.strptime(t1, timeFormat).timestamp()
-    #
-    # simple test if inside DST limits
-    if (tz > tFr and tz < tTo):
-        isDST = True
-    else:
-        isDST = False
-    #
-    ### print ('>>', dstInfo[year], isDST)
-    #
-    return isDST;
-#
-# ------------------------------------------------------------------------
 # put an identifier on a figure
 def putID(plt):
     """
@@ -0,0 +1,218 @@
+#
+# view lib: interactive viewer of a ride, for long rides
+#  Pyramid
+#  RideViewer
+#  viewRide()
+# <- Last updated: Tue Oct 20 03:07:45 2026 -> SGK
+#
+# the route map and the ride's properties are in one figure, the panels
+# share their x-axis (time or distance) and are linked: moving the mouse
+# over a panel or the map moves a cursor on all of them, drawn w/
+# blitting (only the cursor is redrawn, on top of a saved background,
+# the map image is not); each property is kept as a pyramid of min/max
+# decimations (levels of 2, 4, 8... pts per bucket), and when the x-range
+# changes (zoom or pan) each panel shows the level w/ no more than maxPts
+# pts in that range, so the no. of pts drawn does not depend on the
+# ride's length, and the peaks are kept
+#
+import numpy as np
+import matplotlib.pyplot as plt
+from matplotlib.ticker import FuncFormatter
+#
+from utilslib  import formatTime, formatTimeLabels
+from statslib  import MaskCache
+from plottrack import getGMapImage
+#
+# the max no. of pts drawn per panel, and on the route
+viewPts  = 4000
+routePts = 20000
+#
+# the panels: column, mask
+viewPanels = (('Velocity',       'located'),
+              ('HeartRate',      'heartRate'),
+              ('SmoothAltitude', 'located'),
+              ('Cadence',        'cadence'),
+              ('Grade',          'located'))
+#
+# ------------------------------------------------------------------------
+# min/max decimations of y(x)
+class Pyramid:
+    """
+    pyr = Pyramid(x, y, maxPts)
+      x increasing, y w/ NaN where missing
+    (xv, yv) = pyr.view(x0, x1)
+      the pts in [x0, x1], at the finest level w/ no more than maxPts
+      there; level k keeps the min and max of y in each bucket of 2^k pts
+    """
+    #
+    def __init__(self, x, y,
+                 maxPts = viewPts):
+        self.maxPts = maxPts
+        (x, y) = (np.asarray(x), np.asarray(y, dtype = np.float64))
+        self.levels = [(x, y)]
+        n = x.size
+        b = 2
+        while 2*n/b > maxPts/4 and b <= n:
+            nb = n//b
+            yy = y[:nb*b].reshape(nb, b)
+            lo = np.argmin(np.where(np.isnan(yy), np.inf, yy), axis = 1)
+            hi = np.argmax(np.where(np.isnan(yy), -np.inf, yy), axis = 1)
+            idx = np.sort(np.column_stack((lo, hi)), axis = 1) + \
+                (np.arange(nb)*b)[:, None]
+            idx = np.concatenate((idx.ravel(), np.arange(nb*b, n)))
+            self.levels.append((x[idx], y[idx]))
+            b *= 2
+    #
+    def view(self, x0, x1):
+        (x, y) = self.levels[0]
+        count = np.searchsorted(x, x1) - np.searchsorted(x, x0)
+        k = 0
+        if count > self.maxPts:
+            k = min(int(np.ceil(np.log2(2.0*count/self.maxPts))),
+                    len(self.levels)-1)
+        (x, y) = self.levels[k]
+        i = max(np.searchsorted(x, x0)-1, 0)
+        j = np.searchsorted(x, x1)+1
+        return (x[i:j], y[i:j])
+#
+# ------------------------------------------------------------------------
+# the viewer
+class RideViewer:
+    """
+    viewer = RideViewer(ride, stats, plotVS, useRoad, velMin, velMax,
+                        cadMin, plotSize, maxPts, panels)
+    plt.show()
+      ride and stats as returned by tracklib.processTrack()
+      panels - the (column, mask) panels, viewPanels by default
+    """
+    #
+    def __init__(self, ride, stats,
+                 plotVS   = 'Time',
+                 useRoad  = True,
+                 velMin   = 6.0,
+                 velMax   = 100.0,
+                 cadMin   = 10,
+                 plotSize = (12, 8),
+                 maxPts   = viewPts,
+                 panels   = viewPanels):
+        self.ride = ride
+        masks = MaskCache(ride, {'velMin': velMin, 'velMax': velMax,
+                                 'cadMin': cadMin, 'hrMin': 0})
+        located = masks('located')
+        xName = 'Time' if plotVS == 'Time' else 'MovingDistance'
+        x = ride[xName]
+        #
+        # the located pts, where the cursor can be
+        self.idx = np.flatnonzero(located)
+        self.x = x[located]
+        self.xPos = ride['XPosition'][located]
+        self.yPos = ride['YPosition'][located]
+        #
+        self.fig = fig = plt.figure(figsize = plotSize)
+        gs = fig.add_gridspec(len(panels), 2)
+        #
+        # the route on the map, drawn once
+        self.axMap = fig.add_subplot(gs[:, 0])
+        (gmapImage, xMin, xMax, yMin, yMax,
+         marker, color) = getGMapImage(useRoad, lonRef = stats['lonRef'],
+                                       latRef = stats['latRef'])
+        self.axMap.imshow(gmapImage, extent = [xMin, xMax, yMin, yMax])
+        step = max(self.xPos.size//routePts, 1)
+        self.axMap.plot(self.xPos[::step], self.yPos[::step], marker,
+                        markersize = 1.0)
+        self.axMap.set_title('Route')
+        self.axMap.set_xlabel('x-position [mi]')
+        self.axMap.set_ylabel('y-position [mi]')
+        #
+        # the panels, w/ a shared x-axis
+        (self.axes, self.lines, self.pyramids, self.cursors) = ([], [], [], [])
+        for (k, (column, mask)) in enumerate(panels):
+            ax = fig.add_subplot(gs[k, 1],
+                                 sharex = self.axes[0] if self.axes else None)
+            m = masks(mask)
+            pyr = Pyramid(x[m], ride[column][m], maxPts)
+            (xv, yv) = pyr.view(-np.inf, np.inf)
+            (line, ) = ax.plot(xv, yv, '-', linewidth = 0.5)
+            ax.set_ylabel(column+' ['+ride.units[column]+']', fontsize = 8)
+            if k < len(panels)-1:
+                ax.tick_params(labelbottom = False)
+            self.axes.append(ax)
+            self.lines.append(line)
+            self.pyramids.append(pyr)
+            self.cursors.append(ax.axvline(np.nan, color = 'r',
+                                           linewidth = 0.8, animated = True))
+        ax = self.axes[-1]
+        if xName == 'Time':
+            ax.xaxis.set_major_formatter(FuncFormatter(formatTimeLabels))
+            ax.set_xlabel('Time [hh:mm]')
+        else:
+            ax.set_xlabel(xName+' ['+ride.units[xName]+']')
+        #
+        # the cursor on the map and the values
+        (self.marker, ) = self.axMap.plot([np.nan], [np.nan], 'o', color = 'r',
+                                          markersize = 6, animated = True)
+        self.text = self.axes[0].text(0.01, 0.95, '', fontsize = 8,
+                                      va = 'top', animated = True,
+                                      transform = self.axes[0].transAxes)
+        self.animated = self.cursors + [self.marker, self.text]
+        self.background = None
+        fig.tight_layout()
+        #
+        fig.canvas.mpl_connect('draw_event', self.onDraw)
+        fig.canvas.mpl_connect('motion_notify_event', self.onMove)
+        self.axes[0].callbacks.connect('xlim_changed', self.onZoom)
+    #
+    # the x-range changed, show the pts at the right level
+    def onZoom(self, ax):
+        (x0, x1) = ax.get_xlim()
+        for (line, pyr) in zip(self.lines, self.pyramids):
+            line.set_data(*pyr.view(x0, x1))
+    #
+    # after a full redraw, save the background and redraw the cursor
+    def onDraw(self, event):
+        self.background = self.fig.canvas.copy_from_bbox(self.fig.bbox)
+        for a in self.animated:
+            self.fig.draw_artist(a)
+    #
+    # the mouse moved, over a panel or the map
+    def onMove(self, event):
+        if (event.inaxes is None) or (self.x.size == 0):
+            return
+        if event.inaxes is self.axMap:
+            i = np.argmin((self.xPos - event.xdata)**2 +
+                          (self.yPos - event.ydata)**2)
+        elif event.inaxes in self.axes:
+            i = min(np.searchsorted(self.x, event.xdata), self.x.size-1)
+        else:
+            return
+        self.moveCursor(i)
+    #
+    def moveCursor(self, i):
+        """
+        put the cursor on the i-th located pt, blit it
+        """
+        j = self.idx[i]
+        for c in self.cursors:
+            c.set_xdata([self.x[i], self.x[i]])
+        self.marker.set_data([self.xPos[i]], [self.yPos[i]])
+        ride = self.ride
+        self.text.set_text('{} {:.2f} mi  {:.1f} mph  {} bpm  {} rpm'.format(
+            formatTime(ride['Time'][j]), ride['Distance'][j],
+            ride['Velocity'][j], ride['HeartRate'][j], ride['Cadence'][j]))
+        if self.background is None:
+            return
+        canvas = self.fig.canvas
+        canvas.restore_region(self.background)
+        for a in self.animated:
+            self.fig.draw_artist(a)
+        canvas.blit(self.fig.bbox)
+#
+# ------------------------------------------------------------------------
+# view a ride
+def viewRide(ride, stats, **kwargs):
+    """
+    show the ride in a RideViewer, kwargs are passed to it
+    """
+    viewer = RideViewer(ride, stats, **kwargs)
+    plt.show()
+    return viewer
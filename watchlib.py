@@ -0,0 +1,125 @@
+#
+# watch lib: watch a directory for new or changed track files
+#  scanDir()
+#  DirWatcher
+#  watchDir()
+# <- Last updated: Mon Oct 19 19:16:30 2026 -> SGK
+#
+# the directory is polled w/ os.scandir(), which works everywhere (no
+# inotify needed), and only looks at the files' size and mtime;
+# a file is queued once it has not changed for a poll, so files still
+# being copied are not read half written
+#
+import os, time
+from collections import deque
+#
+# the files that can hold tracks, see readlib.py
+trackExts = ('.tcx', '.gpx', '.fit',
+             '.gz', '.bz2', '.xz', '.zip', '.tar', '.tgz')
+#
+# ------------------------------------------------------------------------
+# list the track files in a directory
+def scanDir(dirName):
+    """
+    files = scanDir(dirName)
+      returns {path: (size, mtime_ns)} for the track files in dirName
+      (not recursive, hidden files are ignored)
+    """
+    files = {}
+    with os.scandir(dirName) as it:
+        for e in it:
+            if e.name.startswith('.') or \
+               not e.name.lower().endswith(trackExts):
+                continue
+            try:
+                if not e.is_file():
+                    continue
+                st = e.stat()
+            except OSError:
+                # removed in between
+                continue
+            files[e.path] = (st.st_size, st.st_mtime_ns)
+    return files
+#
+# ------------------------------------------------------------------------
+# keep track of what changed in a directory
+class DirWatcher:
+    """
+    watcher = DirWatcher(dirName)
+    files = watcher.changes()
+      the files that are new or changed since the last call, and that did
+      not change since the previous look (ie are completely written),
+      oldest first; the first call returns the ones already there if
+      skipExisting is False
+    watcher.unsettled is the no. of files changed but not yet settled
+    """
+    #
+    def __init__(self, dirName,
+                 skipExisting = False):
+        self.dirName = dirName
+        self.done    = {}  # path -> (size, mtime) when queued
+        self.last    = {}  # path -> (size, mtime) at the last look
+        self.unsettled = 0
+        if skipExisting:
+            self.done = scanDir(dirName)
+            self.last = dict(self.done)
+    #
+    def changes(self):
+        files = scanDir(self.dirName)
+        changed = [fn for (fn, sig) in files.items()
+                   if self.done.get(fn) != sig]
+        new = [fn for fn in changed if self.last.get(fn) == files[fn]]
+        self.unsettled = len(changed) - len(new)
+        self.last = files
+        for fn in new:
+            self.done[fn] = files[fn]
+        # forget the removed ones
+        for fn in list(self.done):
+            if fn not in files:
+                del self.done[fn]
+        return sorted(new, key = lambda fn: files[fn][1])
+#
+# ------------------------------------------------------------------------
+# process the files dropped in a directory
+def watchDir(dirName, process,
+             poll = 2.0,
+             once = False,
+             skipExisting = False,
+             silent = False):
+    """
+    watch dirName, and call process(fn) for each new or changed file
+      poll          how often to look [s]
+      once          process what is there and return
+      skipExisting  only process the files added (or changed) after start
+    an exception in process(fn) is reported and the file is skipped
+    (until it changes again)
+    returns the number of files processed, runs until interrupted
+    unless once is True
+    """
+    watcher = DirWatcher(dirName, skipExisting = skipExisting)
+    queue   = deque()
+    nDone   = 0
+    #
+    # the 1st look only sets the sizes/mtimes
+    watcher.changes()
+    while True:
+        time.sleep(poll)
+        queue.extend([fn for fn in watcher.changes() if fn not in queue])
+        if once and (len(queue) == 0) and (watcher.unsettled == 0):
+            return nDone
+        #
+        while queue:
+            fn = queue.popleft()
+            t0 = time.perf_counter()
+            try:
+                process(fn)
+            except KeyboardInterrupt:
+                raise
+            except Exception as e:
+                print('watchDir(): failed to process', fn, '-',
+                      type(e).__name__+':', e)
+                continue
+            nDone += 1
+            if not silent:
+                print('processed {} in {:.2f} s'.format(
+                    fn, time.perf_counter()-t0))
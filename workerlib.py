@@ -0,0 +1,82 @@
+#
+# worker lib: run a function in a worker process, w/ a timeout and a
+#  memory limit, so a bad input cannot hang or crash the caller
+#  runWorker()
+# <- Last updated: Tue Oct 20 03:58:14 2026 -> SGK
+#
+# the worker is a new process (forked where possible, so nothing has to
+# be imported again), its address space is limited w/ setrlimit(), and
+# it sends back its result, or the error, through a pipe; the caller
+# waits at most timeout seconds for it, then kills the worker
+#
+import os, traceback
+import multiprocessing as mp
+try:
+    import resource
+except ImportError:
+    # not on Windows, no memory limit then
+    resource = None
+#
+# ------------------------------------------------------------------------
+# what the worker does
+def workerMain(conn, fcn, args, memLimit):
+    if memLimit > 0 and resource is not None:
+        size = memLimit << 20
+        resource.setrlimit(resource.RLIMIT_AS, (size, size))
+    try:
+        conn.send(('ok', fcn(*args)))
+    except MemoryError:
+        conn.send(('error', 'MemoryError: over the {} MB limit'.
+                   format(memLimit)))
+    except Exception as e:
+        where = traceback.extract_tb(e.__traceback__)[-1]
+        conn.send(('error', '{}: {} ({}:{})'.
+                   format(type(e).__name__, e,
+                          os.path.basename(where.filename), where.lineno)))
+    conn.close()
+#
+# ------------------------------------------------------------------------
+# run fcn(*args) in a worker
+def runWorker(fcn,
+              args     = (),
+              timeout  = None,
+              memLimit = 0):
+    """
+    (status, value) = runWorker(fcn, args, timeout, memLimit)
+      fcn(*args) is run in a worker process, fcn must be a module level
+        function, args and its result must be picklable
+      timeout  - kill the worker after timeout [s], None to wait
+      memLimit - the worker's max address space [MB], 0 for no limit
+      status   - 'ok':      value is fcn(*args)
+                 'error':   fcn raised an exception, value describes it
+                 'timeout': the worker was killed
+                 'died':    the worker exited w/out a result (killed,
+                            crashed), value has its exit code
+    """
+    ctx = mp.get_context('fork' if 'fork' in mp.get_all_start_methods()
+                         else None)
+    (recv, send) = ctx.Pipe(duplex = False)
+    proc = ctx.Process(target = workerMain,
+                       args = (send, fcn, args, memLimit), daemon = True)
+    proc.start()
+    send.close()
+    try:
+        # poll() is also True when the worker exits w/out sending
+        if not recv.poll(timeout):
+            proc.kill()
+            proc.join()
+            return ('timeout', 'no result after {:g} s'.format(timeout))
+        try:
+            result = recv.recv()
+        except EOFError:
+            result = None
+        proc.join()
+        if result is None:
+            return ('died', 'worker exited, exit code {}'.
+                    format(proc.exitcode))
+        return result
+    finally:
+        recv.close()
+        if proc.is_alive():
+            proc.kill()
+            proc.join()
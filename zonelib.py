@@ -0,0 +1,207 @@
+#
+# zone lib: time spent in zones (HR, cadence, velocity, grade)
+#  zoneTable
+#  zonesFor()
+#  zonesKey()
+#  zoneLabels()
+#  zoneTimes()
+#  printZones()
+#  periodKeys()
+#  ZoneLog
+# <- Last updated: Tue Oct 20 06:12:50 2026 -> SGK
+#
+# the time in each zone is a histogram of the column weighted by
+# DeltaTime, over the pts selected by a mask (see statMasks); the
+# per-ride histograms are kept in a ZoneLog (a JSON file) w/ running
+# totals per week, month, season and year, updated as rides are added,
+# so the totals never need the rides to be read again
+#
+# the HR zones are the rider's (opts['hrZones'], -hrzones), the log keeps
+# the zones each ride was added w/, and its totals per set of zones, so
+# rides w/ different zones are never summed together
+#
+import os, json
+from datetime import date
+import numpy as np
+from statslib import MaskCache
+#
+# the zones: (column, mask, edges), the edges are the boundaries between
+#  the zones, ie (110, 130) -> < 110, [110, 130), >= 130
+zoneTable = (('HeartRate', 'heartRate', (110, 130, 150, 165)),
+             ('Cadence',   'cadence',   (60, 75, 85, 95)),
+             ('Velocity',  'moving',    (10, 14, 17, 20, 24)),
+             ('Grade',     'moving',    (-6, -3, -1, 1, 3, 6)))
+#
+# the periods the totals are kept for
+periodNames = ('week', 'month', 'season', 'year')
+#
+# ------------------------------------------------------------------------
+# the zones, w/ the rider's HR zones
+def zonesFor(opts,
+             table = zoneTable):
+    """
+    table = zonesFor(opts, table)
+      table w/ the HeartRate edges set to opts['hrZones'], if any
+    """
+    hr = tuple(opts.get('hrZones') or ())
+    return tuple([(column, mask, hr if (column == 'HeartRate') and hr
+                   else edges) for (column, mask, edges) in table])
+#
+# a set of zones, as a string
+def zonesKey(edges):
+    """
+    key = zonesKey(edges)
+      edges - {column: edges}, ie {'HeartRate': (110, 130)}
+      key   - ie 'HeartRate:110,130'
+    """
+    return ' '.join([column+':'+','.join(['{:g}'.format(x) for x in e])
+                     for (column, e) in edges.items()])
+#
+# ------------------------------------------------------------------------
+# the zones' labels
+def zoneLabels(edges):
+    """
+    labels = zoneLabels(edges)
+      ie (110, 130) -> ['<110', '110..130', '>=130']
+    """
+    e = ['{:g}'.format(x) for x in edges]
+    return ['<'+e[0]] + [e[i]+'..'+e[i+1] for i in range(len(e)-1)] + \
+        ['>='+e[-1]]
+#
+# ------------------------------------------------------------------------
+# time spent in each zone
+def zoneTimes(ride, opts,
+              table = zoneTable,
+              masks = None):
+    """
+    zones = zoneTimes(ride, opts, table, masks)
+      ride  - a columnlib.Track w/ the rideColumns
+      opts  - dict w/ velMin, velMax, hrMin, cadMin
+      table - the zones, see zoneTable
+      masks - a MaskCache to reuse, if any
+      returns {column: array of the time in each zone [min]}
+    """
+    if masks is None:
+        masks = MaskCache(ride, opts)
+    dt = ride['DeltaTime']
+    zones = {}
+    for (column, mask, edges) in table:
+        m = masks(mask)
+        idx = np.digitize(ride[column][m], edges)
+        zones[column] = np.bincount(idx, weights = dt[m],
+                                    minlength = len(edges)+1)
+    return zones
+#
+# ------------------------------------------------------------------------
+# print the time in zones
+def printZones(zones,
+               table = zoneTable,
+               title = 'Zones'):
+    """
+    print the time in zones [min] and the %, one line per column
+    """
+    print(title)
+    for (column, mask, edges) in table:
+        t = np.asarray(zones[column], dtype = np.float64)
+        total = t.sum()
+        pct = 100*t/total if total > 0 else np.zeros(t.size)
+        print('{:9s} '.format(column) + ' '.join(
+            ['{}:{:.1f}({:.0f}%)'.format(l, v, p)
+             for (l, v, p) in zip(zoneLabels(edges), t, pct)]))
+#
+# ------------------------------------------------------------------------
+# the week, month, season and year of a date
+def periodKeys(day):
+    """
+    keys = periodKeys('2021-05-01')
+      returns {'week': '2021-W17', 'month': '2021-05',
+               'season': '2021-spring', 'year': '2021'}
+      the seasons are Dec-Feb, Mar-May, etc, Dec counts for next winter
+    """
+    d = date.fromisoformat(day[:10])
+    (isoYear, isoWeek, isoDay) = d.isocalendar()
+    seasons = ('winter', 'spring', 'summer', 'fall')
+    (year, k) = (d.year, (d.month % 12)//3)
+    if d.month == 12:
+        year += 1
+    return {'week':   '{}-W{:02d}'.format(isoYear, isoWeek),
+            'month':  '{}-{:02d}'.format(d.year, d.month),
+            'season': '{}-{}'.format(year, seasons[k]),
+            'year':   '{}'.format(d.year)}
+#
+# ------------------------------------------------------------------------
+# the per-ride time in zones, and the totals per period
+class ZoneLog:
+    """
+    log = ZoneLog('zones.json', table)
+    log.add(key, '2021-05-01', zones)   # zones from zoneTimes(table)
+    log.save()
+    log.totals('week')                  # {'2021-W17': zones, ...}
+    a ride added again (same key) replaces the previous one; the rides
+    added w/ other zones (ie other -hrzones) are kept, and their totals
+    apart, totals() is of the rides w/ table's zones
+    """
+    #
+    def __init__(self, fileName,
+                 table = zoneTable):
+        self.fileName = fileName
+        self.edges = dict([(column, list(edges))
+                           for (column, mask, edges) in table])
+        self.key = zonesKey(self.edges)
+        self.rides = {}     # key -> {'day', 'zones' key, 'times'}
+        self.sums  = {}     # zones key -> {period: {period key: times}}
+        if os.path.exists(fileName):
+            with open(fileName) as f:
+                log = json.load(f)
+            self.rides = log['rides']
+            self.sums  = log['totals']
+            if 'edges' in log:
+                # a log of a single set of zones, made before -hrzones
+                old = zonesKey(log['edges'])
+                self.sums = {old: log['totals']}
+                for ride in self.rides.values():
+                    ride['times'] = ride['zones']
+                    ride['zones'] = old
+    #
+    def addTo(self, day, zones, sign, key):
+        sums = self.sums.setdefault(key, dict([(p, {}) for p in periodNames]))
+        for (period, k) in periodKeys(day).items():
+            if k not in sums[period]:
+                sums[period][k] = dict([(c, [0.0]*len(t))
+                                        for (c, t) in zones.items()])
+            s = sums[period][k]
+            for (column, t) in zones.items():
+                s[column] = [x + sign*v for (x, v) in zip(s[column], t)]
+    #
+    def add(self, key, day, zones):
+        """
+        add (or replace) a ride's time in zones, day is YYYY-MM-DD...
+        """
+        if key in self.rides:
+            old = self.rides[key]
+            self.addTo(old['day'], old['times'], -1, old['zones'])
+        zones = dict([(column, [float(v) for v in zones[column]])
+                      for column in self.edges])
+        self.rides[key] = {'day': day[:10], 'zones': self.key,
+                           'times': zones}
+        self.addTo(day, zones, +1, self.key)
+    #
+    def totals(self, period):
+        """
+        the time in zones for each week, month, season or year, of the
+          rides w/ the log's zones
+        """
+        sums = self.sums.get(self.key, {}).get(period, {})
+        return dict([(key, dict([(c, np.asarray(t))
+                                 for (c, t) in zones.items()]))
+                     for (key, zones) in sorted(sums.items())])
+    #
+    def save(self):
+        """
+        write the log, to a temp file renamed when complete
+        """
+        tmp = self.fileName+'.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({'rides':  self.rides,
+                       'totals': self.sums}, f, indent = 1)
+        os.replace(tmp, self.fileName)